@@ -15,3 +15,11 @@ python -m nuitka \
   --include-module=kivy.core.clipboard.clipboard_sdl2 \
   --include-module=kivy.core.clipboard.clipboard_dummy \
   src/main.py
+
+python -m nuitka \
+  --standalone \
+  --follow-imports \
+  --output-dir=.build \
+  --include-module=colorlog \
+  --output-filename=loradio-daemon \
+  src/daemon.py
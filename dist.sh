@@ -26,6 +26,10 @@ echo "copy dist"
 cp -r .build/main.dist release || exit
 mv release/main.dist release/dist || exit
 
+echo "copy daemon dist"
+cp -r .build/daemon.dist release || exit
+mv release/daemon.dist release/daemon-dist || exit
+
 echo "zip"
 filename=$(date +"${APP}-%Y-%m-%d.zip")
 rm -f filename
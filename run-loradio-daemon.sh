@@ -0,0 +1,14 @@
+#!/usr/bin/env sh
+
+# headless run (repeater): PTT from stdin or the unix socket, stats to the log
+
+DIR=$(dirname "$0")
+cd "${DIR}" || exit
+
+if [ -f daemon-dist/loradio-daemon ]; then
+  # compiled daemon
+  daemon-dist/loradio-daemon --device /dev/ttyUSB0 --socket /tmp/loradio.sock "$@"
+else
+  # from source
+  src/daemon.py --device /dev/ttyUSB0 --socket /tmp/loradio.sock "$@"
+fi
@@ -278,7 +278,7 @@ class MainApp(MDApp):
         )
 
     def _cleanup(self):
-        self._model.stop()
+        self._model.close()
 
     @handle_error
     def _request_close(self, *_, **__):
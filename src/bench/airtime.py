@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+# air bytes per second of speech for each vocoder mode:
+# current bit-packed packet format vs the old one
+#
+# run from src:
+#   python -m bench.airtime
+
+import argparse
+
+from codec.bitpack import pack_frames
+from codec.modes import VocoderMode
+from processes.packet import encode_stream_frame, encode_stream_frame_body
+
+LEGACY_OVERHEAD = len('PaCkEt') + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='bytes on air per second of speech')
+    parser.add_argument('--chunks', type=int, nargs='+', default=[1, 5, 10])
+    parser.add_argument('--sound-rate', type=int, default=8_000)
+    args = parser.parse_args()
+
+    print(f'{"mode":>6} {"chunks":>6} {"legacy B/s":>10} {"current B/s":>11} {"saved":>6}')
+    for mode in VocoderMode:
+        for chunks in args.chunks:
+            packet = encode_stream_frame(
+                test=False,
+                stream_id=0,
+                mode=mode,
+                seq=0,
+                body=encode_stream_frame_body(
+                    test=False,
+                    data=pack_frames(bytes(chunks * mode.encoded_len), mode),
+                    duration=0,
+                    packet_index=None,
+                ),
+            )
+            payload_size = 1 + chunks * mode.encoded_len
+            legacy_size = LEGACY_OVERHEAD + payload_size
+            duration = chunks * mode.samples_per_frame / args.sound_rate
+
+            legacy = legacy_size / duration
+            current = len(packet) / duration
+            print(f'{mode.rate:6d} {chunks:6d} {legacy:10.1f} {current:11.1f} {1 - current / legacy:6.1%}')
+
+
+if __name__ == '__main__':
+    main()
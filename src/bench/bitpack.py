@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# codec2 frame bit pack/unpack cost, us per frame
+#
+# run from src:
+#   python -m bench.bitpack
+
+import argparse
+import time
+
+import numpy as np
+
+from codec.bitpack import pack_frames, unpack_frames
+from codec.modes import VocoderMode
+
+
+def main():
+    parser = argparse.ArgumentParser(description='bit packing cost per frame')
+    parser.add_argument('--chunks', type=int, default=10, help='frames per packet')
+    parser.add_argument('--repeat', type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    print(f'{"mode":>6} {"padded":>6} {"packed":>6} {"pack us/frame":>13} {"unpack us/frame":>15}')
+    for mode in VocoderMode:
+        bits = rng.integers(0, 2, (args.chunks, mode.bits), dtype=np.uint8)
+        data = np.packbits(bits, axis=1).tobytes()
+
+        t = time.perf_counter()
+        for _ in range(args.repeat):
+            packed = pack_frames(data, mode)
+        pack_time = (time.perf_counter() - t) / args.repeat / args.chunks
+
+        t = time.perf_counter()
+        for _ in range(args.repeat):
+            frames = unpack_frames(packed, mode)
+        unpack_time = (time.perf_counter() - t) / args.repeat / args.chunks
+
+        assert frames.tobytes() == data
+        print(f'{mode.rate:6d} {len(data):6d} {len(packed):6d} {pack_time * 1e6:13.2f} {unpack_time * 1e6:15.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+# codec2 frames/s per mode: batched CodecEngine vs a Codec2 per stream
+# with frame-by-frame decoding
+#
+# run from src:
+#   python -m bench.codec
+
+import argparse
+import time
+
+import numpy as np
+from pycodec2 import Codec2
+
+from codec.audio import generate_tone
+from codec.engine import CodecEngine
+from codec.modes import VocoderMode
+
+
+def legacy_decode(mode: VocoderMode, block: bytes) -> np.ndarray:
+    # old decoding: new Codec2 per stream, bytes slices and np.concatenate
+    vocoder = Codec2(mode.rate)
+    frames = []
+    while len(block):
+        chunk, block = block[:mode.encoded_len], block[mode.encoded_len:]
+        frames.append(vocoder.decode(chunk))
+    return np.concatenate(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='codec2 throughput per mode')
+    parser.add_argument('--chunks', type=int, default=10, help='frames per packet')
+    parser.add_argument('--packets', type=int, default=200)
+    parser.add_argument('--sound-rate', type=int, default=8_000)
+    args = parser.parse_args()
+
+    engine = CodecEngine()
+    print(f'{"mode":>6} {"encode fps":>10} {"decode fps":>10} {"legacy decode fps":>17}')
+    for mode in VocoderMode:
+        samples = generate_tone(
+            sr=args.sound_rate,
+            freq=440,
+            duration=args.chunks * mode.samples_per_frame / args.sound_rate,
+            amplitude=0.3,
+        )
+
+        for _ in range(args.packets):
+            encoded = engine.encode(mode, samples)
+            engine.decode(mode, np.frombuffer(encoded, dtype=np.uint8).reshape(-1, mode.encoded_len))
+
+        t = time.perf_counter()
+        for _ in range(args.packets):
+            legacy_decode(mode, encoded)
+        legacy_fps = args.packets * args.chunks / (time.perf_counter() - t)
+
+        print(f'{mode.rate:6d} {engine.encode_fps(mode):10.0f} {engine.decode_fps(mode):10.0f} {legacy_fps:17.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+
+# end to end over simulated modems: a tx pipeline fed with a sine, an rx pipeline up to the decoder,
+# for each vocoder mode and frames per packet (auto - packetizer):
+#   first ms - PTT to the first frame at the rx decoder
+#   p50/p95 ms - first sample of a packet recorded to the packet parsed at the rx decoder
+#   goodput - speech bit/s delivered, PTT to the last packet
+#   loss % - lost frame packets
+#   load % - air utilization by the transmitter
+#   switches - mid-stream mode switches (--adaptive-rate)
+#
+# run from src:
+#   python -m bench.e2e --loss 0.02
+
+import argparse
+import logging
+import time
+from dataclasses import replace
+from pathlib import Path
+from queue import Empty
+
+import numpy as np
+
+from codec.jobs import StopJob, StreamFrameJob, StreamStartJob, StreamStopJob, TaskRole
+from codec.modes import VocoderMode
+from config import Config, load_config
+from pipeline import Pipeline
+from processes.base_process import BaseProcess
+from simulator import Link, ModemSimulator, SimulatorConfig
+
+TX_ROLES = [TaskRole.SERIAL, TaskRole.ENCODER, TaskRole.RECORDER]
+RX_ROLES = [TaskRole.SERIAL, TaskRole.DECODER]
+TIMEOUT = 5.0
+POLL_INTERVAL = 0.001
+
+
+class ScriptedRecorderProcess(BaseProcess):
+    # a real-time sine instead of the microphone
+
+    FREQ = 440
+
+    def _run(self):
+        encoder_queue = self._queues[TaskRole.ENCODER]
+        recorder_queue = self._queues[TaskRole.RECORDER]
+        encoder_ring, = self._rings.get(TaskRole.ENCODER, [None])
+
+        sound_rate = self._config.vocoder.sound_rate
+        size = self._config.vocoder.frames_per_buffer
+        period = size / sound_rate
+
+        streaming = False
+        next_time = 0.0
+        index = 0
+        while True:
+            timeout = max(0.0, next_time - time.perf_counter()) if streaming else None
+            try:
+                job = recorder_queue.get(block=True, timeout=timeout)
+            except Empty:
+                job = None
+
+            if isinstance(job, StopJob):
+                break
+            if isinstance(job, StreamStartJob):
+                streaming = True
+                next_time = time.perf_counter()
+            elif isinstance(job, StreamStopJob):
+                streaming = False
+
+            if streaming and time.perf_counter() >= next_time:
+                t = (np.arange(size) + index * size) / sound_rate
+                frame = (np.sin(2 * np.pi * self.FREQ * t) * 8_000).astype(np.int16)
+                if encoder_ring is None:
+                    encoder_queue.put(StreamFrameJob(frame=frame))
+                else:
+                    encoder_ring.write(frame)
+                    encoder_queue.put(StreamFrameJob(frame=None))
+                index += 1
+                next_time += period
+
+
+class ScriptedPipeline(Pipeline):
+    TARGETS = [
+        (role, ScriptedRecorderProcess if role == TaskRole.RECORDER else cls)
+        for role, cls in Pipeline.TARGETS
+    ]
+
+
+def poll(pipeline: Pipeline, predicate, timeout: float = TIMEOUT):
+    t = time.perf_counter()
+    while not predicate(stats := pipeline.get_stats()):
+        if time.perf_counter() - t > timeout:
+            raise TimeoutError()
+        time.sleep(POLL_INTERVAL)
+    return stats
+
+
+def run(
+        config: Config,
+        simulator_config: SimulatorConfig,
+        mode: VocoderMode,
+        chunks: int,
+        talk: float,
+        drain: float,
+        adaptive_rate: bool,
+):
+    config = replace(
+        config,
+        vocoder=replace(config.vocoder, mode=mode, chunks=chunks or config.vocoder.chunks),
+        packetizer=replace(config.packetizer, adaptive=not chunks),
+        rate=replace(config.rate, adaptive=adaptive_rate),
+    )
+
+    with ModemSimulator(simulator_config) as simulator:
+        tx_node, rx_node = simulator.device_nodes
+        tx = ScriptedPipeline(config=config, device_node=tx_node, roles=TX_ROLES)
+        rx = Pipeline(config=config, device_node=rx_node, roles=RX_ROLES)
+        try:
+            for pipeline, roles in [(tx, [TaskRole.SERIAL, TaskRole.ENCODER]), (rx, RX_ROLES)]:
+                pipeline.open()
+                poll(pipeline, lambda s: all(role in s for role in roles))
+                pipeline.start()
+            time.sleep(0.2)
+
+            ptt_time = time.perf_counter()
+            tx.stream_start(mode=mode, test=True)
+            poll(rx, lambda s: s[TaskRole.DECODER].rx_packets >= 1)
+            rx_start_time = time.perf_counter()
+            stats = poll(rx, lambda s: s[TaskRole.DECODER].rx_packets >= 2)
+            first = time.perf_counter() - ptt_time
+
+            delays = []
+            packets = stats[TaskRole.DECODER].rx_packets
+            last = time.perf_counter()
+            stop_time = None
+            # after PTT release wait until the receiver goes quiet for two max-size air packets
+            idle = 2 * (Link.PACKET_SIZE + Link.AIR_OVERHEAD) * 8 / simulator_config.air_rate
+            idle += simulator_config.latency + 0.5
+            while stop_time is None or (time.perf_counter() - stop_time < drain and time.perf_counter() - last < idle):
+                if stop_time is None and time.perf_counter() - ptt_time >= talk:
+                    tx.stream_stop()
+                    stop_time = time.perf_counter()
+                stat = rx.get_stats()[TaskRole.DECODER]
+                if stat.rx_packets != packets:
+                    packets = stat.rx_packets
+                    last = time.perf_counter()
+                    if stat.rx_delay is not None:
+                        encoder_stat = tx.get_stats()[TaskRole.ENCODER]
+                        packet_chunks = chunks or encoder_stat.tx_chunks
+                        tx_mode = encoder_stat.tx_mode or mode
+                        accumulation = packet_chunks * tx_mode.samples_per_frame / config.vocoder.sound_rate
+                        delays.append(stat.rx_delay + (rx_start_time - ptt_time) + accumulation)
+                time.sleep(POLL_INTERVAL)
+
+            tx_stats = tx.get_stats()
+            tx_frames = tx_stats[TaskRole.ENCODER].tx_packets - 2
+            rx_frames = max(0, packets - 2)
+            loss = max(0.0, 1 - rx_frames / tx_frames) if tx_frames else 0.0
+            encoder_stat = tx_stats[TaskRole.ENCODER]
+            speech = sum(m.rate * t for m, t in encoder_stat.tx_mode_time.items())
+            goodput = speech * (1 - loss) / (last - ptt_time)
+            load = tx_stats[TaskRole.SERIAL].tx_total * 8 / talk / simulator_config.air_rate
+            switches = encoder_stat.tx_mode_switches
+        finally:
+            tx.close()
+            rx.close()
+
+    delays = np.array(delays or [np.nan]) * 1e3
+    print(
+        f'{mode.rate:6d} {chunks or "auto":>6} {first * 1e3:10.1f} {np.median(delays):10.1f} {np.percentile(delays, 95):10.1f}'
+        f' {goodput:10.0f} {loss * 100:8.1f} {load * 100:8.1f} {switches:8d}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='end-to-end latency, goodput and loss over simulated modems')
+    parser.add_argument('--mode', type=int, nargs='+', default=[mode.rate for mode in VocoderMode])
+    parser.add_argument('--chunks', type=int, nargs='+', default=[1, 2, 5, 10, 0], help='0 - adaptive')
+    parser.add_argument('--talk', type=float, default=3.0, help='PTT duration, seconds')
+    parser.add_argument('--drain', type=float, default=10.0, help='max wait after PTT release, seconds')
+    parser.add_argument('--air-rate', type=int, default=None, help='air data rate (default - from config)')
+    parser.add_argument('--loss', type=float, default=0.0)
+    parser.add_argument('--ber', type=float, default=0.0)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--adaptive-rate', action='store_true', help='switch vocoder mode mid-stream')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = load_config(Path(__file__).resolve().parents[2] / 'config' / 'config.yml')
+    simulator_config = SimulatorConfig(
+        air_rate=args.air_rate or config.serial.air_rate,
+        modem_buffer=config.serial.modem_buffer,
+        loss=args.loss,
+        ber=args.ber,
+        latency=args.latency,
+        seed=args.seed,
+    )
+    if args.air_rate:
+        config = replace(config, serial=replace(config.serial, air_rate=args.air_rate))
+
+    print(
+        f'{"mode":>6} {"chunks":>6} {"first ms":>10} {"p50 ms":>10} {"p95 ms":>10}'
+        f' {"goodput":>10} {"loss %":>8} {"load %":>8} {"switches":>8}'
+    )
+    for rate in args.mode:
+        for chunks in args.chunks:
+            run(config, simulator_config, VocoderMode.from_rate(rate), chunks, args.talk, args.drain, args.adaptive_rate)
+
+
+if __name__ == '__main__':
+    main()
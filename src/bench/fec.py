@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+# FEC over simulated modems with air packet loss, for each group size (0 - off), with and without interleaving:
+#   air loss % - packets lost on air
+#   loss % - frame packets neither delivered nor recovered
+#   recovered - recovered from parity
+#   p50/p95 ms - frame packet sent to parsed at the rx decoder
+#   load % - air utilization by the transmitter
+#
+# run from src:
+#   python -m bench.fec --loss 0.05
+
+import argparse
+import logging
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+from bench.e2e import RX_ROLES, TX_ROLES, ScriptedPipeline, poll
+from codec.jobs import TaskRole
+from codec.modes import VocoderMode
+from config import Config, load_config
+from pipeline import Pipeline
+from simulator import Link, ModemSimulator, SimulatorConfig
+
+POLL_INTERVAL = 0.001
+
+
+def run(
+        config: Config,
+        simulator_config: SimulatorConfig,
+        group: int,
+        interleave: bool,
+        talk: float,
+):
+    config = replace(
+        config,
+        fec=replace(config.fec, group=group, interleave=interleave),
+        rate=replace(config.rate, adaptive=False),
+    )
+
+    with ModemSimulator(simulator_config) as simulator:
+        tx_node, rx_node = simulator.device_nodes
+        tx = ScriptedPipeline(config=config, device_node=tx_node, roles=TX_ROLES)
+        rx = Pipeline(config=config, device_node=rx_node, roles=RX_ROLES)
+        try:
+            for pipeline, roles in [(tx, [TaskRole.SERIAL, TaskRole.ENCODER]), (rx, RX_ROLES)]:
+                pipeline.open()
+                poll(pipeline, lambda s: all(role in s for role in roles))
+                pipeline.start()
+            time.sleep(0.2)
+
+            ptt_time = time.perf_counter()
+            tx.stream_start(mode=config.vocoder.mode, test=True)
+            poll(rx, lambda s: s[TaskRole.DECODER].rx_packets >= 1)
+            # START may be lost, then the clock offset is unknown
+            offset = time.perf_counter() - ptt_time
+
+            delays = []
+            packets = 0
+            last = time.perf_counter()
+            stop_time = None
+            idle = 2 * (Link.PACKET_SIZE + Link.AIR_OVERHEAD) * 8 / simulator_config.air_rate
+            idle += simulator_config.latency + 0.5
+            while stop_time is None or time.perf_counter() - last < idle:
+                if stop_time is None and time.perf_counter() - ptt_time >= talk:
+                    tx.stream_stop()
+                    stop_time = time.perf_counter()
+                stat = rx.get_stats()[TaskRole.DECODER]
+                if stat.rx_packets != packets:
+                    packets = stat.rx_packets
+                    last = time.perf_counter()
+                    if stat.rx_delay is not None:
+                        delays.append(stat.rx_delay + offset)
+                time.sleep(POLL_INTERVAL)
+
+            tx_stats = tx.get_stats()
+            rx_stat = rx.get_stats()[TaskRole.DECODER]
+            encoder_stat = tx_stats[TaskRole.ENCODER]
+            frames = encoder_stat.tx_packets - 2 - encoder_stat.tx_parity
+            loss = (rx_stat.rx_lost or 0) / frames if frames else 0.0
+            load = tx_stats[TaskRole.SERIAL].tx_total * 8 / talk / simulator_config.air_rate
+            link = simulator.links[0].stat
+            air_loss = link.lost / link.packets if link.packets else 0.0
+        finally:
+            tx.close()
+            rx.close()
+
+    delays = np.array(delays or [np.nan]) * 1e3
+    print(
+        f'{group:6d} {"yes" if interleave else "no":>6} {air_loss * 100:10.1f} {loss * 100:8.1f}'
+        f' {rx_stat.rx_recovered:10d} {np.median(delays):10.1f} {np.percentile(delays, 95):10.1f} {load * 100:8.1f}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FEC effective loss and added latency over simulated modems')
+    parser.add_argument('--group', type=int, nargs='+', default=[0, 2, 4, 8], help='0 - no FEC')
+    parser.add_argument('--interleave', action='store_true', help='also run with frame interleaving')
+    parser.add_argument('--mode', type=int, default=700)
+    parser.add_argument('--chunks', type=int, default=3)
+    parser.add_argument('--talk', type=float, default=10.0, help='PTT duration, seconds')
+    parser.add_argument('--loss', type=float, default=0.05)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = load_config(Path(__file__).resolve().parents[2] / 'config' / 'config.yml')
+    config = replace(
+        config,
+        vocoder=replace(config.vocoder, mode=VocoderMode.from_rate(args.mode), chunks=args.chunks),
+        packetizer=replace(config.packetizer, adaptive=False),
+    )
+    simulator_config = SimulatorConfig(
+        air_rate=config.serial.air_rate,
+        modem_buffer=config.serial.modem_buffer,
+        loss=args.loss,
+        latency=args.latency,
+        seed=args.seed,
+    )
+
+    print(
+        f'{"group":>6} {"inter":>6} {"air loss %":>10} {"loss %":>8}'
+        f' {"recovered":>10} {"p50 ms":>10} {"p95 ms":>10} {"load %":>8}'
+    )
+    for group in args.group:
+        for interleave in [False, True] if args.interleave and group > 1 else [False]:
+            run(config, simulator_config, group, interleave, args.talk)
+
+
+if __name__ == '__main__':
+    main()
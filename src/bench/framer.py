@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# packet parsing, packets/s on a clean and a noisy stream
+#
+# run from src:
+#   python -m bench.framer
+
+import argparse
+import random
+import time
+
+from processes.framer import Framer
+from processes.packet import encode_payload
+
+LEGACY_MAGIC_WORD = 'PaCkEt'.encode()
+
+
+def legacy_encode_payload(payload: bytes):
+    # old format: MAGIC_WORD | payload size | payload
+    return LEGACY_MAGIC_WORD + bytes((len(payload),)) + payload
+
+
+def legacy_yield_blocks(buffer: bytearray):
+    # old parser: searches from the start and rebuilds the buffer per packet
+    while True:
+        index = buffer.find(LEGACY_MAGIC_WORD)
+        if index < 0:
+            break
+        index += len(LEGACY_MAGIC_WORD)
+        if index + 2 > len(buffer):
+            break
+        payload_size = buffer[index]
+        index += 1
+        if index + payload_size > len(buffer):
+            break
+        payload = buffer[index: index + payload_size]
+        index += payload_size
+        buffer[:] = buffer[index:]
+        yield bytes(payload)
+
+
+def make_stream(
+        encode,
+        packets: int,
+        payload_size: int,
+        noise: int,
+        seed: int = 1,
+) -> bytes:
+    rnd = random.Random(seed)
+    packet = encode(rnd.randbytes(payload_size))
+    stream = bytearray()
+    for _ in range(packets):
+        if noise:
+            stream.extend(rnd.randbytes(rnd.randrange(noise)))
+        stream.extend(packet)
+    return bytes(stream)
+
+
+def chunked(stream: bytes, size: int):
+    return [stream[i: i + size] for i in range(0, len(stream), size)]
+
+
+def run_framer(chunks: list[bytes]) -> tuple[int, int]:
+    framer = Framer()
+    count = 0
+    for chunk in chunks:
+        for _ in framer.feed(chunk):
+            count += 1
+    return count, len(framer._buffer)
+
+
+def run_legacy(chunks: list[bytes]) -> tuple[int, int]:
+    buffer = bytearray()
+    count = 0
+    for chunk in chunks:
+        buffer.extend(chunk)
+        for _ in legacy_yield_blocks(buffer):
+            count += 1
+    return count, len(buffer)
+
+
+def measure(name: str, f, chunks: list[bytes]):
+    size = sum(map(len, chunks))
+    t = time.perf_counter()
+    count, memory = f(chunks)
+    elapsed = time.perf_counter() - t
+    print(
+        f'  {name:8} {count:8d} packets {count / elapsed:12.0f} packets/s'
+        f' {size / elapsed / 1e6:8.1f} MB/s  buffer {memory:8d} bytes'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='framer micro-benchmark')
+    parser.add_argument('--packets', type=int, default=20_000)
+    parser.add_argument('--payload', type=int, default=40)
+    parser.add_argument('--chunk', type=int, default=4_000, help='serial read size')
+    args = parser.parse_args()
+
+    for title, noise in [('clean', 0), ('noisy', 200)]:
+        print(f'{title}:')
+        stream = make_stream(encode_payload, args.packets, args.payload, noise)
+        measure('framer', run_framer, chunked(stream, args.chunk))
+        stream = make_stream(legacy_encode_payload, args.packets, args.payload, noise)
+        measure('legacy', run_legacy, chunked(stream, args.chunk))
+
+    # noise only: the old buffer grows without bound
+    chunks = chunked(random.Random(2).randbytes(args.packets * args.payload), args.chunk)
+    print('noise only:')
+    measure('framer', run_framer, chunks)
+    measure('legacy', run_legacy, chunks)
+
+
+if __name__ == '__main__':
+    main()
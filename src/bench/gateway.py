@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+# gateway (gateway.py) over N simulated modem pairs, every transmitter talks at once, no player:
+#   packets/s - frame packets parsed by all gateway decoders
+#   loss % - lost frame packets
+#   concealed - frames of lost packets filled by concealment
+#   cpu % - gateway processes CPU while talking (100 - one core)
+#   cpu/device % - per modem, flat when scaling is linear
+#
+# run from src:
+#   python -m bench.gateway --devices 1 2 4
+
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from contextlib import ExitStack
+from dataclasses import replace
+from pathlib import Path
+
+from bench.e2e import TX_ROLES, ScriptedPipeline, poll
+from codec.jobs import TaskRole
+from codec.modes import VocoderMode
+from config import Config, PipelineMode, load_config
+from gateway import Gateway
+from simulator import ModemSimulator, SimulatorConfig
+
+TIMEOUT = 5.0
+POLL_INTERVAL = 0.01
+
+
+def cpu_time(pids: list[int]) -> float:
+    # utime + stime, seconds
+    ticks = os.sysconf('SC_CLK_TCK')
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as file:
+                # comm may contain spaces
+                values = file.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        total += int(values[11]) + int(values[12])
+    return total / ticks
+
+
+def poll_devices(gateway: Gateway, predicate, timeout: float = TIMEOUT):
+    t = time.perf_counter()
+    while True:
+        device_stats = gateway.get_device_stats()
+        if all(predicate(stats) for stats in device_stats.values()):
+            return device_stats
+        if time.perf_counter() - t > timeout:
+            raise TimeoutError()
+        time.sleep(POLL_INTERVAL)
+
+
+def run(
+        config: Config,
+        simulator_config: SimulatorConfig,
+        devices: int,
+        talk: float,
+        drain: float,
+):
+    with ExitStack() as stack:
+        simulators = [stack.enter_context(ModemSimulator(simulator_config)) for _ in range(devices)]
+        txs = []
+        gateway = Gateway(config=config, player=False)
+        stack.callback(gateway.close)
+        try:
+            for simulator in simulators:
+                tx_node, _ = simulator.device_nodes
+                tx = ScriptedPipeline(config=config, device_node=tx_node, roles=TX_ROLES)
+                txs.append(tx)
+                tx.open()
+                poll(tx, lambda s: TaskRole.SERIAL in s and TaskRole.ENCODER in s)
+                tx.start()
+
+            gateway.open()
+            for simulator in simulators:
+                _, rx_node = simulator.device_nodes
+                gateway.attach(rx_node)
+            poll_devices(gateway, lambda s: TaskRole.SERIAL in s and TaskRole.DECODER in s)
+            time.sleep(0.2)
+
+            pids = [worker.pid for worker in gateway.workers if isinstance(worker, multiprocessing.Process)]
+            for tx in txs:
+                tx.stream_start(mode=config.vocoder.mode, test=False)
+            poll_devices(gateway, lambda s: s[TaskRole.DECODER].rx_packets >= 1)
+            t = time.perf_counter()
+            cpu = cpu_time(pids)
+            time.sleep(talk)
+            cpu = cpu_time(pids) - cpu
+            wall = time.perf_counter() - t
+            for tx in txs:
+                tx.stream_stop()
+            time.sleep(drain)
+
+            rx_stats = [stats[TaskRole.DECODER] for stats in gateway.get_device_stats().values()]
+        finally:
+            for tx in txs:
+                tx.close()
+
+    packets = sum(stat.rx_packets for stat in rx_stats)
+    lost = sum(stat.rx_lost or 0 for stat in rx_stats)
+    concealed = sum(stat.rx_concealed for stat in rx_stats)
+    load = cpu / wall * 100
+    print(
+        f'{devices:8d} {packets / (wall + drain):10.1f} {lost / max(packets + lost, 1) * 100:7.1f}'
+        f' {concealed:10d} {load:7.1f} {load / devices:13.1f}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='multi-modem gateway scaling over simulated modems')
+    parser.add_argument('--devices', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--mode', type=int, default=1600)
+    parser.add_argument('--talk', type=float, default=5.0, help='seconds')
+    parser.add_argument('--drain', type=float, default=1.0, help='seconds after PTT release')
+    parser.add_argument('--loss', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = load_config(Path(__file__).resolve().parents[2] / 'config' / 'config.yml')
+    config = replace(
+        config,
+        vocoder=replace(config.vocoder, mode=VocoderMode.from_rate(args.mode)),
+        rate=replace(config.rate, adaptive=False),
+        gateway=replace(config.gateway, max_devices=max(args.devices)),
+        pipeline=replace(config.pipeline, mode=PipelineMode.PROCESS),
+    )
+    simulator_config = SimulatorConfig(
+        air_rate=config.serial.air_rate,
+        modem_buffer=config.serial.modem_buffer,
+        loss=args.loss,
+        seed=args.seed,
+    )
+
+    print(f'{"devices":>8} {"packets/s":>10} {"loss %":>7} {"concealed":>10} {"cpu %":>7} {"cpu/device %":>13}')
+    for devices in args.devices:
+        run(config, simulator_config, devices, args.talk, args.drain)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+# late join over simulated modems: the receiver is out of range for the first join seconds
+# and misses STREAM_START (join 0 - hears the whole stream):
+#   joined - stream picked up without STREAM_START
+#   first ms - link up to the first audio to the player
+#   playout ms - of that, since the first packet heard (jitter buffer delay)
+#   concealed - frames of lost packets filled by concealment
+#
+# run from src:
+#   python -m bench.join --join 0 0.5 2
+
+import argparse
+import logging
+import time
+from dataclasses import replace
+from pathlib import Path
+
+from bench.e2e import RX_ROLES, TX_ROLES, ScriptedPipeline, poll
+from codec.jobs import TaskRole
+from codec.modes import VocoderMode
+from config import Config, load_config
+from pipeline import Pipeline
+from simulator import ModemSimulator, SimulatorConfig
+
+
+def run(
+        config: Config,
+        simulator_config: SimulatorConfig,
+        join: float,
+        talk: float,
+):
+    with ModemSimulator(simulator_config) as simulator:
+        tx_node, rx_node = simulator.device_nodes
+        tx = ScriptedPipeline(config=config, device_node=tx_node, roles=TX_ROLES)
+        rx = Pipeline(config=config, device_node=rx_node, roles=RX_ROLES)
+        try:
+            for pipeline, roles in [(tx, [TaskRole.SERIAL, TaskRole.ENCODER]), (rx, RX_ROLES)]:
+                pipeline.open()
+                poll(pipeline, lambda s: all(role in s for role in roles))
+                pipeline.start()
+            time.sleep(0.2)
+
+            link = simulator.links[0]
+            link.muted = join > 0
+            tx.stream_start(mode=config.vocoder.mode, test=False)
+            time.sleep(join)
+            link.muted = False
+            join_time = time.perf_counter()
+
+            stats = poll(rx, lambda s: s[TaskRole.DECODER].rx_first_audio is not None, timeout=talk)
+            first = time.perf_counter() - join_time
+            rx_stat = stats[TaskRole.DECODER]
+
+            tx.stream_stop()
+        finally:
+            tx.close()
+            rx.close()
+
+    print(
+        f'{join:6.1f} {"yes" if rx_stat.rx_joins else "no":>6} {first * 1e3:10.1f}'
+        f' {rx_stat.rx_first_audio * 1e3:10.1f} {rx_stat.rx_concealed:10d}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='time to first audio for receivers joining mid-stream')
+    parser.add_argument('--join', type=float, nargs='+', default=[0.0, 0.5, 1.0, 2.0], help='seconds after PTT')
+    parser.add_argument('--mode', type=int, default=700)
+    parser.add_argument('--talk', type=float, default=3.0, help='max wait for audio after join, seconds')
+    parser.add_argument('--loss', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = load_config(Path(__file__).resolve().parents[2] / 'config' / 'config.yml')
+    config = replace(
+        config,
+        vocoder=replace(config.vocoder, mode=VocoderMode.from_rate(args.mode)),
+        rate=replace(config.rate, adaptive=False),
+    )
+    simulator_config = SimulatorConfig(
+        air_rate=config.serial.air_rate,
+        modem_buffer=config.serial.modem_buffer,
+        loss=args.loss,
+        seed=args.seed,
+    )
+
+    print(f'{"join s":>6} {"joined":>6} {"first ms":>10} {"playout ms":>10} {"concealed":>10}')
+    for join in args.join:
+        run(config, simulator_config, join, args.talk)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+# audio frames between processes: queue vs shm ring,
+# per-frame latency and CPU time of both sides
+#
+# run from src:
+#   python -m bench.pcm_ipc
+
+import argparse
+import time
+from multiprocessing import Process, Queue
+
+import numpy as np
+
+from codec.ring import SampleRing
+
+
+def consumer(
+        queue: Queue,
+        result_queue: Queue,
+        ring: SampleRing | None,
+        frames: int,
+        frame_size: int,
+):
+    latencies = []
+    received = 0
+    cpu = time.process_time()
+    while received < frames * frame_size:
+        sent, frame = queue.get()
+        if ring is not None:
+            frame = ring.read()
+        latencies.append(time.perf_counter() - sent)
+        received += len(frame)
+    result_queue.put((latencies, time.process_time() - cpu))
+
+
+def run(
+        transport: str,
+        frames: int,
+        frame_size: int,
+        interval: float,
+):
+    queue = Queue()
+    result_queue = Queue()
+    ring = SampleRing.shared(capacity=64 * frame_size) if transport == 'shm' else None
+    try:
+        process = Process(
+            target=consumer,
+            args=(queue, result_queue, ring, frames, frame_size),
+        )
+        process.start()
+
+        frame = np.arange(frame_size, dtype=np.int16)
+        cpu = time.process_time()
+        for _ in range(frames):
+            if ring is None:
+                queue.put((time.perf_counter(), frame))
+            else:
+                ring.write(frame)
+                queue.put((time.perf_counter(), None))
+            if interval:
+                time.sleep(interval)
+        producer_cpu = time.process_time() - cpu
+
+        latencies, consumer_cpu = result_queue.get()
+        process.join()
+    finally:
+        if ring is not None:
+            ring.close(unlink=True)
+
+    latencies = np.array(latencies) * 1e6
+    print(
+        f'{transport:6} {frame_size:6d} {np.median(latencies):10.1f} {np.percentile(latencies, 99):10.1f}'
+        f' {producer_cpu / frames * 1e6:12.1f} {consumer_cpu / frames * 1e6:12.1f}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PCM IPC latency and CPU per frame')
+    parser.add_argument('--frames', type=int, default=2_000)
+    parser.add_argument('--frame-size', type=int, nargs='+', default=[160, 320, 1280])
+    parser.add_argument('--interval', type=float, default=0.001, help='pause between frames, seconds')
+    args = parser.parse_args()
+
+    print(f'{"mode":6} {"frame":>6} {"p50 us":>10} {"p99 us":>10} {"put cpu us":>12} {"get cpu us":>12}')
+    for frame_size in args.frame_size:
+        for transport in ['queue', 'shm']:
+            run(transport, args.frames, frame_size, args.interval)
+
+
+if __name__ == '__main__':
+    main()
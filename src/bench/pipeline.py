@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+# process vs inproc pipeline: worker startup, START to first byte with warm workers,
+# memory and rx/tx latency; a pty instead of the modem, no player/recorder (they need a sound card)
+#
+# run from src:
+#   python -m bench.pipeline
+
+import argparse
+import logging
+import multiprocessing
+import os
+import select
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+from codec.jobs import TaskRole
+from codec.modes import VocoderMode
+from config import load_config, PipelineMode
+from pipeline import Pipeline
+from processes.packet import encode_stream_start, encode_stream_frame, encode_stream_frame_body
+
+ROLES = [TaskRole.SERIAL, TaskRole.ENCODER, TaskRole.DECODER]
+TIMEOUT = 5.0
+
+
+def memory_kb(pid: int) -> int:
+    # PSS counts pages shared after fork once
+    for filename, key in [(f'/proc/{pid}/smaps_rollup', 'Pss:'), (f'/proc/{pid}/status', 'VmRSS:')]:
+        try:
+            with open(filename) as file:
+                for line in file:
+                    if line.startswith(key):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+    return 0
+
+
+def wait_stats(pipeline: Pipeline, stats: dict, predicate) -> float:
+    t = time.perf_counter()
+    while not predicate(stats):
+        if time.perf_counter() - t > TIMEOUT:
+            raise TimeoutError()
+        stats.update(pipeline.get_stats())
+        time.sleep(0.0005)
+    return time.perf_counter() - t
+
+
+def run(config, mode: PipelineMode, count: int):
+    config = replace(config, pipeline=replace(config.pipeline, mode=mode))
+    master, slave = os.openpty()
+    pipeline = Pipeline(
+        config=config,
+        device_node=os.ttyname(slave),
+        roles=ROLES,
+    )
+
+    stats = {}
+    t = time.perf_counter()
+    pipeline.open()
+    wait_stats(pipeline, stats, lambda s: all(role in s for role in ROLES))
+    open_time = time.perf_counter() - t
+
+    pids = [os.getpid()] + [worker.pid for worker in pipeline.workers if isinstance(worker, multiprocessing.Process)]
+    memory = sum(map(memory_kb, pids))
+
+    # --- START to the first byte out, workers already running ---
+
+    start = []
+    for _ in range(count):
+        t = time.perf_counter()
+        pipeline.start()
+        pipeline.stream_start(mode=VocoderMode.MODE_700, test=True)
+        if not select.select([master], [], [], TIMEOUT)[0]:
+            raise TimeoutError()
+        start.append(time.perf_counter() - t)
+        pipeline.stop()
+        time.sleep(0.05)
+        os.read(master, 4096)
+
+    pipeline.start()
+    time.sleep(0.2)
+
+    # --- rx: modem write to decoder ---
+
+    rx = []
+    os.write(master, encode_stream_start(test=True, stream_id=0, mode=VocoderMode.MODE_700))
+    wait_stats(pipeline, stats, lambda s: s[TaskRole.DECODER].rx_packets >= 1)
+    for i in range(count):
+        t = time.perf_counter()
+        os.write(master, encode_stream_frame(
+            test=True,
+            stream_id=0,
+            mode=VocoderMode.MODE_700,
+            seq=i,
+            body=encode_stream_frame_body(test=True, data=bytes(8), duration=0, packet_index=i + 1),
+        ))
+        rx.append(wait_stats(pipeline, stats, lambda s: s[TaskRole.DECODER].rx_packets >= i + 2))
+
+    # --- tx: PTT to the first byte out ---
+
+    tx = []
+    for _ in range(count):
+        t = time.perf_counter()
+        pipeline.stream_start(mode=VocoderMode.MODE_700, test=True)
+        if not select.select([master], [], [], TIMEOUT)[0]:
+            raise TimeoutError()
+        tx.append(time.perf_counter() - t)
+        pipeline.stream_stop()
+        time.sleep(0.05)
+        os.read(master, 4096)
+
+    pipeline.close()
+    os.close(master)
+    os.close(slave)
+
+    print(
+        f'{mode.value:8} {open_time * 1e3:10.1f} {np.median(start) * 1e3:10.2f} {memory / 1024:10.1f}'
+        f' {np.median(rx) * 1e3:10.2f} {np.median(tx) * 1e3:10.2f}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='process vs inproc pipeline')
+    parser.add_argument('--count', type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = load_config(Path(__file__).resolve().parents[2] / 'config' / 'config.yml')
+
+    print(f'{"mode":8} {"open ms":>10} {"start ms":>10} {"mem MB":>10} {"rx ms":>10} {"tx ms":>10}')
+    for mode in PipelineMode:
+        run(config, mode, args.count)
+
+
+if __name__ == '__main__':
+    main()
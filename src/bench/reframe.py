@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+# reframing capture buffers into codec2 frames: frame collection delay by capture buffer size
+# (model time: a buffer arrives when its last sample is captured) and cost per buffer
+#
+# run from src:
+#   python -m bench.reframe
+
+import argparse
+import time
+
+import numpy as np
+
+from codec.modes import VocoderMode
+from codec.reframer import Reframer
+
+SOUND_RATE = 8_000
+
+
+def run(mode: VocoderMode, buffer_size: int, duration: float):
+    reframer = Reframer()
+    reframer.reset(mode.samples_per_frame)
+    spf = mode.samples_per_frame
+
+    blocks = int(duration * SOUND_RATE) // buffer_size
+    block = np.arange(buffer_size, dtype=np.int16)
+
+    latencies = []
+    frame_index = 0
+    elapsed = 0.0
+    for i in range(blocks):
+        arrival = (i + 1) * buffer_size / SOUND_RATE
+        t = time.perf_counter()
+        count = sum(len(samples) for samples in reframer.feed(block)) // spf
+        elapsed += time.perf_counter() - t
+        for j in range(frame_index, frame_index + count):
+            latencies.append(arrival - j * spf / SOUND_RATE)
+        frame_index += count
+
+    latencies = np.array(latencies) * 1e3
+    print(
+        f'{mode.rate:6d} {spf:6d} {buffer_size:8d} {np.mean(latencies):10.1f} {np.max(latencies):10.1f}'
+        f' {elapsed / blocks * 1e6:10.2f}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='capture buffer re-framing latency')
+    parser.add_argument('--buffer-size', type=int, nargs='+', default=[80, 160, 320, 640])
+    parser.add_argument('--duration', type=float, default=60.0, help='audio seconds per run')
+    args = parser.parse_args()
+
+    print(f'{"mode":>6} {"frame":>6} {"buffer":>8} {"mean ms":>10} {"max ms":>10} {"us/buf":>10}')
+    for mode in [VocoderMode.MODE_700, VocoderMode.MODE_3200]:
+        for buffer_size in args.buffer_size:
+            run(mode, buffer_size, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+# cold start of main.py (kivy/kivymd) vs daemon.py (no UI):
+# interpreter start to entry point imports done, and peak RSS
+#
+# run from src:
+#   python -m bench.startup
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ENTRIES = {
+    'gui': ['main', 'app'],
+    'daemon': ['daemon'],
+}
+
+CHILD = '''
+import importlib, json, resource, sys, time
+t = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+import_time = time.perf_counter() - t
+print(json.dumps(dict(
+    import_time=import_time,
+    rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    kivy='kivy' in sys.modules,
+)))
+'''
+
+
+def run(name: str, modules: list[str], repeat: int):
+    wall, imports, rss = [], [], []
+    kivy = False
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD, *modules],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            error = result.stderr.strip().splitlines()[-1]
+            print(f'{name:8} n/a: {error}')
+            return
+        wall.append(time.perf_counter() - t)
+        stat = json.loads(result.stdout.strip().splitlines()[-1])
+        imports.append(stat['import_time'])
+        rss.append(stat['rss'])
+        kivy = stat['kivy']
+
+    print(
+        f'{name:8} {np.median(wall) * 1e3:10.1f} {np.median(imports) * 1e3:10.1f}'
+        f' {np.median(rss) / 1024:10.1f} {"yes" if kivy else "no":>6}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GUI vs daemon cold start')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"entry":8} {"start ms":>10} {"import ms":>10} {"RSS MB":>10} {"kivy":>6}')
+    for name, modules in ENTRIES.items():
+        run(name, modules, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
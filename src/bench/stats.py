@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+# stats publish/read cost: shm block vs queue
+#
+# run from src:
+#   python -m bench.stats
+
+import argparse
+import time
+from multiprocessing import Queue
+
+import numpy as np
+
+from codec.jobs import TaskRole
+from processes.decoder_process import DecoderProcessStat
+from processes.stats import StatsBlock, StatLayout
+
+
+def per_call(f, repeat: int) -> float:
+    t = time.perf_counter()
+    for _ in range(repeat):
+        f()
+    return (time.perf_counter() - t) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='stats publish/read cost')
+    parser.add_argument('--repeat', type=int, default=100_000)
+    args = parser.parse_args()
+
+    layout = StatLayout(DecoderProcessStat)
+    stat = layout.decode(TaskRole.DECODER, np.zeros(len(layout)))
+
+    block = StatsBlock.shared(len(TaskRole))
+    queue = Queue()
+    try:
+        values = layout.encode(stat)
+        print(f'encode          {per_call(lambda: layout.encode(stat), args.repeat):8.2f} us')
+        print(f'publish         {per_call(lambda: block.publish(0, values), args.repeat):8.2f} us')
+        print(f'encode+publish  {per_call(lambda: block.publish(0, layout.encode(stat)), args.repeat):8.2f} us')
+        print(f'snapshot+decode {per_call(lambda: layout.decode(TaskRole.DECODER, block.snapshot(0, len(layout))), args.repeat):8.2f} us')
+        print(f'queue put       {per_call(lambda: queue.put(stat), args.repeat // 10):8.2f} us')
+        count = args.repeat // 10
+        t = time.perf_counter()
+        for _ in range(count):
+            queue.get()
+        print(f'queue get       {(time.perf_counter() - t) / count * 1e6:8.2f} us')
+        # put alone hides the pickling done by the queue feeder thread
+        print(f'queue put+get   {per_call(lambda: queue.put(stat) or queue.get(), count):8.2f} us')
+    finally:
+        block.close(unlink=True)
+
+
+if __name__ == '__main__':
+    main()
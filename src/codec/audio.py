@@ -12,3 +12,20 @@ def generate_tone(
     s = np.sin(2 * np.pi * freq * t)
     s = amplitude * s * 2**15
     return s.astype(np.int16)
+
+
+def level_db(
+        frames: np.ndarray,
+) -> np.ndarray:
+    # dBFS per row
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=-1))
+    return 20 * np.log10(np.maximum(rms, 1) / 2**15)
+
+
+def generate_noise(
+        n: int,
+        level: float,  # dBFS
+        rng: np.random.Generator,
+):
+    s = rng.normal(0, 10 ** (level / 20) * 2**15, n)
+    return np.clip(s, -2**15, 2**15 - 1).astype(np.int16)
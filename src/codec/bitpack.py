@@ -0,0 +1,30 @@
+import numpy as np
+
+from codec.modes import VocoderMode
+
+
+def pack_frames(
+        data: bytes | bytearray,
+        mode: VocoderMode,
+) -> bytes:
+    # byte-padded codec2 frames packed back to back at mode.bits each
+    if mode.bits == mode.encoded_len * 8:
+        return bytes(data)
+
+    frames = np.frombuffer(data, dtype=np.uint8).reshape(-1, mode.encoded_len)
+    bits = np.unpackbits(frames, axis=1)[:, :mode.bits]
+    return np.packbits(bits).tobytes()
+
+
+def unpack_frames(
+        block: bytes | memoryview,
+        mode: VocoderMode,
+) -> np.ndarray:
+    # the tail is shorter than a byte, so the frame count is unambiguous
+    data = np.frombuffer(block, dtype=np.uint8)
+    if mode.bits == mode.encoded_len * 8:
+        return data.reshape(-1, mode.encoded_len)
+
+    count = len(data) * 8 // mode.bits
+    bits = np.unpackbits(data)[:count * mode.bits].reshape(count, mode.bits)
+    return np.packbits(bits, axis=1)
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+from pycodec2 import Codec2
+
+from codec.modes import VocoderMode
+
+
+class CodecEngine:
+    # batch codec2 encode/decode, one Codec2 instance per mode shared by all streams
+
+    def __init__(self):
+        self._vocoders: dict[VocoderMode, Codec2] = {}
+        # mode -> (frames, seconds)
+        self._encoded: dict[VocoderMode, tuple[int, float]] = {}
+        self._decoded: dict[VocoderMode, tuple[int, float]] = {}
+
+    def vocoder(self, mode: VocoderMode) -> Codec2:
+        if (vocoder := self._vocoders.get(mode)) is None:
+            vocoder = self._vocoders[mode] = Codec2(mode.rate)
+        return vocoder
+
+    def encode(
+            self,
+            mode: VocoderMode,
+            samples: np.ndarray,
+    ) -> bytes:
+        vocoder = self.vocoder(mode)
+        spf = mode.samples_per_frame
+        count = len(samples) // spf
+
+        t = time.perf_counter()
+        encoded = b''.join(vocoder.encode(samples[i * spf: (i + 1) * spf]) for i in range(count))
+        self._account(self._encoded, mode, count, time.perf_counter() - t)
+        return encoded
+
+    def decode(
+            self,
+            mode: VocoderMode,
+            frames: np.ndarray | list[np.ndarray],
+            out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        vocoder = self.vocoder(mode)
+        spf = mode.samples_per_frame
+        count = len(frames)
+        if out is None:
+            out = np.empty(count * spf, dtype=np.int16)
+
+        t = time.perf_counter()
+        for i, frame in enumerate(frames):
+            out[i * spf: (i + 1) * spf] = vocoder.decode(frame.tobytes())
+        self._account(self._decoded, mode, count, time.perf_counter() - t)
+        return out
+
+    @staticmethod
+    def _account(
+            counters: dict[VocoderMode, tuple[int, float]],
+            mode: VocoderMode,
+            count: int,
+            elapsed: float,
+    ):
+        frames, seconds = counters.get(mode, (0, 0.0))
+        counters[mode] = (frames + count, seconds + elapsed)
+
+    @staticmethod
+    def _fps(
+            counters: dict[VocoderMode, tuple[int, float]],
+            mode: VocoderMode,
+    ) -> float | None:
+        frames, seconds = counters.get(mode, (0, 0.0))
+        return frames / seconds if seconds else None
+
+    def encode_fps(self, mode: VocoderMode) -> float | None:
+        return self._fps(self._encoded, mode)
+
+    def decode_fps(self, mode: VocoderMode) -> float | None:
+        return self._fps(self._decoded, mode)
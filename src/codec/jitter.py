@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class JitterBuffer:
+    # adaptive playout: the first packet after a gap waits for a target delay that follows
+    # the jitter estimate, later packets go out at once; player fill is tracked by the clock
+
+    JITTER_FACTOR = 4.0
+    # RFC 3550 smoothing
+    JITTER_GAIN = 1 / 16
+
+    def __init__(
+            self,
+            sound_rate: int,
+            min_delay: float,
+            max_delay: float,
+    ):
+        self._sound_rate = sound_rate
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+
+        self.jitter = 0.0
+        self.delay = min_delay
+        self.underruns = 0
+        self.overflow_drops = 0
+
+        self._pending: list[np.ndarray] = []
+        self._deadline: float | None = None
+        self._playing = False
+        self._play_start = 0.0
+        self._released = 0
+
+        self._last_arrival: float | None = None
+        self._last_sent: float | None = None
+        self._last_duration: float | None = None
+
+    def reset(self):
+        # the jitter estimate belongs to the link and is kept
+        self._pending.clear()
+        self._deadline = None
+        self._playing = False
+        self._last_arrival = None
+        self._last_sent = None
+        self._last_duration = None
+
+    def level(self, now: float) -> float:
+        if not self._playing:
+            return 0.0
+        return max(0.0, self._released / self._sound_rate - (now - self._play_start))
+
+    def timeout(self, now: float) -> float | None:
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - now)
+
+    def observe(
+            self,
+            now: float,
+            sent: float | None = None,
+            duration: float | None = None,
+    ):
+        # sender spacing from test frame timestamps, otherwise the previous packet's duration
+        if self._last_arrival is not None:
+            if sent is not None and self._last_sent is not None:
+                interval = sent - self._last_sent
+            else:
+                interval = self._last_duration or 0.0
+            d = (now - self._last_arrival) - interval
+            self.jitter += (abs(d) - self.jitter) * self.JITTER_GAIN
+            self.delay = min(self._max_delay, max(self._min_delay, self.JITTER_FACTOR * self.jitter))
+
+        self._last_arrival = now
+        self._last_sent = sent
+        self._last_duration = duration
+
+    def push(
+            self,
+            samples: np.ndarray,
+            now: float,
+    ) -> list[np.ndarray]:
+        duration = len(samples) / self._sound_rate
+        self.observe(now, duration=duration)
+
+        if self._playing:
+            level = self.level(now)
+            if level <= 0:
+                # late, the player ran dry: build up the delay again
+                self.underruns += 1
+                self._playing = False
+            elif level + duration > self._max_delay:
+                # max_delay of audio is already queued: drop, do not grow the delay
+                self.overflow_drops += 1
+                return []
+            else:
+                self._released += len(samples)
+                return [samples]
+
+        if self._deadline is None:
+            self._deadline = now + self.delay
+        self._pending.append(samples)
+        return self.poll(now)
+
+    def poll(self, now: float) -> list[np.ndarray]:
+        if self._deadline is None or now < self._deadline:
+            return []
+        return self.flush(now)
+
+    def flush(self, now: float) -> list[np.ndarray]:
+        released, self._pending = self._pending, []
+        if released:
+            self._playing = True
+            self._play_start = now
+            self._released = sum(map(len, released))
+        self._deadline = None
+        return released
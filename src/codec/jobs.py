@@ -1,10 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
 
 import numpy as np
 
 from codec.modes import VocoderMode
 from common.enums import LowerEnum
+from utils import timestamp_now
 
 
 class TaskRole(LowerEnum):
@@ -23,6 +24,9 @@ class PacketKind(Enum):
     STREAM_START = 1
     STREAM_STOP = 2
     STREAM_FRAME = 3
+    STREAM_MODE = 4
+    STREAM_PARITY = 5
+    STREAM_SILENCE = 6
 
     @staticmethod
     def from_job(job: 'Job'):
@@ -47,10 +51,27 @@ class StopJob(Job):
     pass
 
 
+@dataclass(frozen=True)
+class AttachJob(Job):
+    device_node: str
+
+
+@dataclass(frozen=True)
+class DetachJob(Job):
+    pass
+
+
+@dataclass(frozen=True)
+class ResetJob(Job):
+    # reset stream state, keep the worker running
+    pass
+
+
 @dataclass(frozen=True)
 class SendJob(Job):
     kind: PacketKind
     data: bytes
+    timestamp: float = field(default_factory=timestamp_now)
 
 
 @dataclass(frozen=True)
@@ -62,6 +83,7 @@ class RecvJob(Job):
 class StreamStartJob(Job):
     mode: VocoderMode
     test: bool
+    timestamp: float = field(default_factory=timestamp_now)
 
 
 @dataclass(frozen=True)
@@ -71,9 +93,12 @@ class StreamStopJob(Job):
 
 @dataclass(frozen=True)
 class StreamFrameJob(Job):
-    frame: np.ndarray
+    # None - samples are in the shared ring
+    frame: np.ndarray | None
 
 
 @dataclass(frozen=True)
 class PlayJob(Job):
     samples: np.ndarray
+    # decoder stream slot
+    channel: int = 0
@@ -6,42 +6,49 @@ class VocoderMode(ExtraEnum):
         1,
         700,
         4,
+        28,
         320,
     )
     MODE_1200 = (
         2,
         1200,
         6,
+        48,
         320,
     )
     MODE_1300 = (
         3,
         1300,
         7,
+        52,
         320,
     )
     MODE_1400 = (
         4,
         1400,
         7,
+        56,
         320,
     )
     MODE_1600 = (
         5,
         1600,
         8,
+        64,
         320,
     )
     MODE_2400 = (
         6,
         2400,
         6,
+        48,
         160,
     )
     MODE_3200 = (
         7,
         3200,
         8,
+        64,
         160,
     )
 
@@ -50,10 +57,12 @@ class VocoderMode(ExtraEnum):
             _: int,  # value
             rate: int,
             encoded_len: int,
+            bits: int,
             samples_per_frame: int,
     ):
         self.rate = rate
         self.encoded_len = encoded_len
+        self.bits = bits
         self.samples_per_frame = samples_per_frame
 
     @staticmethod
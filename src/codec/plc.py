@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class Concealer:
+    # fills lost frames by repeating the last pitch period with a linear fade out
+
+    # seconds
+    MIN_PITCH = 1 / 400
+    MAX_PITCH = 1 / 50
+    # seconds
+    FADE = 0.1
+
+    def __init__(
+            self,
+            sound_rate: int,
+    ):
+        self._min_lag = round(self.MIN_PITCH * sound_rate)
+        self._max_lag = round(self.MAX_PITCH * sound_rate)
+        self._fade = round(self.FADE * sound_rate)
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(0, dtype=np.float64)
+        self._cycle: np.ndarray | None = None
+        self._position = 0
+
+    def observe(
+            self,
+            samples: np.ndarray,
+    ):
+        self._history = np.concatenate([self._history, samples])[-2 * self._max_lag:]
+        self._cycle = None
+        self._position = 0
+
+    def _pitch_cycle(self) -> np.ndarray:
+        # silence until something was decoded
+        if len(self._history) <= self._min_lag:
+            return np.zeros(1)
+        x = self._history - self._history.mean()
+        corr = np.correlate(x, x, mode='full')[len(x) - 1:]
+        lags = np.arange(self._min_lag, min(self._max_lag, len(x) - 1) + 1)
+        # normalize by overlap, or short lags always win
+        lag = lags[np.argmax(corr[lags] / (len(x) - lags))]
+        return self._history[-lag:]
+
+    def conceal(
+            self,
+            n: int,
+    ) -> np.ndarray:
+        # consecutive calls continue the same fade
+        if self._cycle is None:
+            self._cycle = self._pitch_cycle()
+        t = self._position + np.arange(n)
+        gain = np.clip(1 - t / self._fade, 0, 1)
+        samples = self._cycle[t % len(self._cycle)] * gain
+        self._position += n
+        return samples.astype(np.int16)
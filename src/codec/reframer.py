@@ -0,0 +1,64 @@
+from typing import Iterator
+
+import numpy as np
+
+
+class Reframer:
+    # collects capture buffers into whole codec2 frames; the leftover of a partial frame
+    # moves to the start of a buffer allocated once
+
+    def __init__(
+            self,
+            capacity: int = 4096,
+    ):
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._size = 0
+        self._frame_size = 1
+
+    @property
+    def pending(self) -> int:
+        return self._size
+
+    def reset(
+            self,
+            frame_size: int | None = None,
+    ):
+        if frame_size is not None:
+            self.resize(frame_size)
+        self._size = 0
+
+    def resize(
+            self,
+            frame_size: int,
+    ):
+        # frame size change mid-stream keeps collected samples
+        if frame_size > len(self._buffer):
+            raise ValueError(f'frame size {frame_size} exceeds capacity {len(self._buffer)}')
+        self._frame_size = frame_size
+
+    def feed(
+            self,
+            samples: np.ndarray,
+    ) -> Iterator[np.ndarray]:
+        # views into the internal buffer, valid until the next iteration
+        capacity = len(self._buffer)
+        while len(samples):
+            n = min(len(samples), capacity - self._size)
+            self._buffer[self._size:self._size + n] = samples[:n]
+            self._size += n
+            samples = samples[n:]
+
+            count = self._size - self._size % self._frame_size
+            if count:
+                yield self._buffer[:count]
+                rest = self._size - count
+                self._buffer[:rest] = self._buffer[count:self._size]
+                self._size = rest
+
+    def flush(self) -> np.ndarray | None:
+        # pad the last partial frame with silence
+        if not self._size:
+            return None
+        self._buffer[self._size:self._frame_size] = 0
+        self._size = 0
+        return self._buffer[:self._frame_size]
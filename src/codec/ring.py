@@ -0,0 +1,132 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+class SampleRing:
+    # fixed-size int16 ring for one writer and one reader, optionally in shared memory;
+    # positions only grow and each is changed by its own side only, so no locking
+
+    WRITE = 0
+    READ = 1
+    OVERRUNS = 2
+    UNDERRUNS = 3
+
+    STATE_SIZE = 4 * np.dtype(np.int64).itemsize
+
+    def __init__(
+            self,
+            capacity: int,
+            shm: SharedMemory | None = None,
+    ):
+        self._shm = shm
+        if shm is None:
+            self._data = np.zeros(capacity, dtype=np.int16)
+            self._state = np.zeros(4, dtype=np.int64)
+        else:
+            self._state = np.ndarray(4, dtype=np.int64, buffer=shm.buf)
+            self._data = np.ndarray(capacity, dtype=np.int16, buffer=shm.buf, offset=self.STATE_SIZE)
+        self._dry = True
+
+    @staticmethod
+    def shared(capacity: int) -> 'SampleRing':
+        shm = SharedMemory(create=True, size=SampleRing.STATE_SIZE + capacity * np.dtype(np.int16).itemsize)
+        shm.buf[:SampleRing.STATE_SIZE] = bytes(SampleRing.STATE_SIZE)
+        return SampleRing(capacity, shm)
+
+    def __getstate__(self):
+        if self._shm is None:
+            return self.__dict__
+        return dict(capacity=self.capacity, name=self._shm.name)
+
+    def __setstate__(self, state):
+        if 'name' in state:
+            self.__init__(state['capacity'], SharedMemory(name=state['name']))
+        else:
+            self.__dict__.update(state)
+
+    def close(
+            self,
+            unlink: bool = False,
+    ):
+        if self._shm is None:
+            return
+        # numpy views must go first, or the memory cannot be closed
+        self._data = self._state = None
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+        self._shm = None
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    @property
+    def available(self) -> int:
+        return int(self._state[self.WRITE] - self._state[self.READ])
+
+    @property
+    def overruns(self) -> int:
+        return int(self._state[self.OVERRUNS])
+
+    @property
+    def underruns(self) -> int:
+        return int(self._state[self.UNDERRUNS])
+
+    def write(
+            self,
+            samples: np.ndarray,
+    ) -> int:
+        # drops what does not fit, returns samples written
+        write = int(self._state[self.WRITE])
+        free = self.capacity - (write - int(self._state[self.READ]))
+        n = min(len(samples), free)
+        if n < len(samples):
+            self._state[self.OVERRUNS] += 1
+
+        start = write % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start: start + first] = samples[:first]
+        self._data[:n - first] = samples[first:n]
+
+        self._state[self.WRITE] = write + n
+        return n
+
+    def read(
+            self,
+            count: int | None = None,
+    ) -> np.ndarray:
+        available = self.available
+        out = np.empty(available if count is None else min(count, available), dtype=np.int16)
+        self.read_into(out)
+        return out
+
+    def read_into(
+            self,
+            out: np.ndarray,
+    ) -> int:
+        # zero-fills the rest, returns samples read
+        read = int(self._state[self.READ])
+        n = min(len(out), int(self._state[self.WRITE]) - read)
+        if n == 0:
+            out.fill(0)
+        else:
+            start = read % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._data[start: start + first]
+            out[first:n] = self._data[:n - first]
+            out[n:] = 0
+            self._state[self.READ] = read + n
+
+        # one underrun per gap
+        if n < len(out):
+            if not self._dry:
+                self._state[self.UNDERRUNS] += 1
+            self._dry = True
+        else:
+            self._dry = False
+        return n
+
+    def clear(self):
+        self._state[self.READ] = self._state[self.WRITE]
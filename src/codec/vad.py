@@ -0,0 +1,44 @@
+import numpy as np
+
+from codec.audio import level_db
+
+
+class VoiceDetector:
+    # energy VAD with a hangover so word endings are not cut;
+    # the smoothed silence level describes comfort noise
+
+    NOISE_GAIN = 0.1
+
+    def __init__(
+            self,
+            threshold: float,  # dBFS
+    ):
+        self._threshold = threshold
+        self._hangover = 0
+        self._remaining = 0
+        self.noise_level = threshold
+
+    def reset(
+            self,
+            hangover: int,  # frames
+    ):
+        self._hangover = hangover
+        self._remaining = hangover
+
+    def detect(
+            self,
+            frames: np.ndarray,
+    ) -> np.ndarray:
+        levels = level_db(frames)
+        speech = np.empty(len(frames), dtype=bool)
+        for i, level in enumerate(levels):
+            if level > self._threshold:
+                self._remaining = self._hangover
+            elif self._remaining:
+                self._remaining -= 1
+            else:
+                self.noise_level += (level - self.noise_level) * self.NOISE_GAIN
+                speech[i] = False
+                continue
+            speech[i] = True
+        return speech
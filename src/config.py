@@ -1,10 +1,28 @@
 from dataclasses import dataclass
+from enum import auto
 from pathlib import Path
 
 from codec.modes import VocoderMode
+from common.enums import LowerEnum
+from processes.packet import FEC_INTERLEAVE
 from utils import load_yaml
 
 
+class SerialEngine(LowerEnum):
+    POLL = auto()
+    EVENT = auto()
+
+
+class PipelineMode(LowerEnum):
+    PROCESS = auto()
+    INPROC = auto()
+
+
+class PcmTransport(LowerEnum):
+    QUEUE = auto()
+    SHM = auto()
+
+
 @dataclass(frozen=True)
 class AppConfig:
     font_scale: float
@@ -18,10 +36,84 @@ class VocoderConfig:
     frames_per_buffer: int
 
 
+@dataclass(frozen=True)
+class SerialConfig:
+    engine: SerialEngine
+    pacing: bool
+    air_rate: int
+    modem_buffer: int
+
+
+@dataclass(frozen=True)
+class PacketizerConfig:
+    adaptive: bool
+    latency_budget: float
+    utilization: float
+
+
+@dataclass(frozen=True)
+class FecConfig:
+    group: int
+    interleave: bool
+
+
+@dataclass(frozen=True)
+class RateConfig:
+    adaptive: bool
+    min_mode: VocoderMode
+    max_mode: VocoderMode
+    hold: float
+
+
+@dataclass(frozen=True)
+class DtxConfig:
+    enabled: bool
+    threshold: float
+    hangover: float
+    sid_interval: float
+
+
+@dataclass(frozen=True)
+class RecorderConfig:
+    preroll: float
+
+
+@dataclass(frozen=True)
+class JitterConfig:
+    min_delay: float
+    max_delay: float
+
+
+@dataclass(frozen=True)
+class StreamsConfig:
+    max_streams: int
+
+
+@dataclass(frozen=True)
+class GatewayConfig:
+    max_devices: int
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    mode: PipelineMode
+    transport: PcmTransport
+
+
 @dataclass(frozen=True)
 class Config:
     app: AppConfig
     vocoder: VocoderConfig
+    serial: SerialConfig
+    packetizer: PacketizerConfig
+    rate: RateConfig
+    fec: FecConfig
+    dtx: DtxConfig
+    recorder: RecorderConfig
+    jitter: JitterConfig
+    streams: StreamsConfig
+    gateway: GatewayConfig
+    pipeline: PipelineConfig
 
 
 def load_config(
@@ -43,7 +135,84 @@ def load_config(
         frames_per_buffer=d['frames_per_buffer'],
     )
 
+    d = cfg.get('serial', {})
+    serial = SerialConfig(
+        engine=SerialEngine(d.get('engine', SerialEngine.EVENT.value)),
+        pacing=d.get('pacing', True),
+        air_rate=d.get('air_rate', 2_400),
+        modem_buffer=d.get('modem_buffer', 1_000),
+    )
+
+    d = cfg.get('packetizer', {})
+    packetizer = PacketizerConfig(
+        adaptive=d.get('adaptive', False),
+        latency_budget=d.get('latency_budget', 0.2),
+        utilization=d.get('utilization', 0.9),
+    )
+
+    d = cfg.get('rate', {})
+    rate = RateConfig(
+        adaptive=d.get('adaptive', False),
+        min_mode=VocoderMode.from_rate(d.get('min_mode', 700)),
+        max_mode=VocoderMode.from_rate(d.get('max_mode', 3200)),
+        hold=d.get('hold', 2.0),
+    )
+
+    d = cfg.get('fec', {})
+    fec = FecConfig(
+        group=d.get('group', 0),
+        interleave=d.get('interleave', False),
+    )
+    # the group shares the STREAM_START byte with the interleave bit
+    if not 0 <= fec.group < FEC_INTERLEAVE:
+        raise ValueError(f'fec.group must be 0..{FEC_INTERLEAVE - 1}, got {fec.group}')
+
+    d = cfg.get('dtx', {})
+    dtx = DtxConfig(
+        enabled=d.get('enabled', False),
+        threshold=d.get('threshold', -45.0),
+        hangover=d.get('hangover', 0.2),
+        sid_interval=d.get('sid_interval', 0.4),
+    )
+
+    d = cfg.get('recorder', {})
+    recorder = RecorderConfig(
+        preroll=d.get('preroll', 0.2),
+    )
+
+    d = cfg.get('jitter', {})
+    jitter = JitterConfig(
+        min_delay=d.get('min_delay', 0.1),
+        max_delay=d.get('max_delay', 1.0),
+    )
+
+    d = cfg.get('streams', {})
+    streams = StreamsConfig(
+        max_streams=d.get('max_streams', 4),
+    )
+
+    d = cfg.get('gateway', {})
+    gateway = GatewayConfig(
+        max_devices=d.get('max_devices', 4),
+    )
+
+    d = cfg.get('pipeline', {})
+    pipeline = PipelineConfig(
+        mode=PipelineMode(d.get('mode', PipelineMode.PROCESS.value)),
+        transport=PcmTransport(d.get('transport', PcmTransport.SHM.value)),
+    )
+
     return Config(
         app=app,
         vocoder=vocoder,
+        serial=serial,
+        packetizer=packetizer,
+        rate=rate,
+        fec=fec,
+        dtx=dtx,
+        recorder=recorder,
+        jitter=jitter,
+        streams=streams,
+        gateway=gateway,
+        pipeline=pipeline,
     )
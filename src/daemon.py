@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+
+# headless LoRaDio, e.g. on a repeater: no kivy, PTT from stdin or a unix socket, stats to the log
+#
+# commands, one per line:
+#   ptt [rate]   - start voice, rate - vocoder rate (700, 1200, ... 3200)
+#   test [rate]  - start test data
+#   stop         - stop transmitting
+#   stats        - print stats
+#   quit         - exit
+#
+# --gateway: one pipeline group per attached modem (gateway.py), PTT via --device
+
+import argparse
+import logging
+import os
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+from dataclasses import fields, replace
+from enum import Enum
+from pathlib import Path
+
+from codec.modes import VocoderMode
+from config import Config, load_config, SerialEngine
+from gateway import Gateway
+from monitor import Device, DeviceMonitor, DEVICE_VENDOR_ID, DEVICE_MODEL_ID
+from pipeline import Pipeline
+from processes.base_process import BaseProcessStat
+from utils import init_logging
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='LoRaDio daemon',
+        description='LoRa Radio without UI',
+    )
+    parser.add_argument(
+        '-d', '--device',
+        dest='device',
+        help='USB device',
+        default='/dev/ttyUSB0',
+    )
+    parser.add_argument(
+        '--gateway',
+        dest='gateway',
+        nargs='*',
+        metavar='DEVICE',
+        help='gateway for all attached modems (with --no-monitor - for --device and listed devices)',
+        default=None,
+    )
+    parser.add_argument(
+        '--no-monitor',
+        action='store_true',
+        dest='no_monitor',
+        help='start at once without waiting for udev device (pty, simulator)',
+        default=False,
+    )
+    parser.add_argument(
+        '--socket',
+        dest='socket',
+        help='control unix socket path',
+        default=None,
+    )
+    parser.add_argument(
+        '--stat-interval',
+        dest='stat_interval',
+        help='stats log interval, seconds (0 - only by command)',
+        type=float,
+        default=5.0,
+    )
+    parser.add_argument(
+        '--serial-engine',
+        dest='serial_engine',
+        help='serial engine (overrides config)',
+        choices=[engine.value for engine in SerialEngine],
+        default=None,
+    )
+    args = parser.parse_args()
+    return args
+
+
+def format_stat(stat: BaseProcessStat) -> str:
+    values = []
+    for f in fields(stat):
+        if f.name == 'role':
+            continue
+        value = getattr(stat, f.name)
+        if isinstance(value, Enum):
+            value = value.name
+        elif isinstance(value, dict):
+            value = ','.join(f'{mode.rate}:{v:.3g}' for mode, v in value.items())
+        elif isinstance(value, float):
+            value = f'{value:.3g}'
+        values.append(f'{f.name}={value}')
+    return ' '.join(values)
+
+
+class Daemon:
+    NAME = 'daemon'
+
+    LINE_SIZE = 256
+    # seconds
+    SUPERVISE_INTERVAL = 1.0
+
+    def __init__(
+            self,
+            config: Config,
+            monitor: DeviceMonitor | None,
+            device_node: str,
+            control_path: str | None,
+            stat_interval: float,
+            gateway: list[str] | None = None,
+    ):
+        self._logger = logging.getLogger(self.NAME)
+        self._config = config
+        self._monitor = monitor
+        self._device_node = device_node
+        self._control_path = control_path
+        self._stat_interval = stat_interval
+
+        self._gateway_devices = gateway
+        self._pipeline = Pipeline(
+            config=config,
+            device_node=device_node,
+        ) if gateway is None else Gateway(
+            config=config,
+            tx_device=device_node,
+        )
+        # the monitor calls handlers from its own thread
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._buffers: dict[int, bytes] = {}
+        self._running = False
+
+        if monitor is not None:
+            monitor.bind(
+                on_attached=self._on_device_attached,
+                on_detached=self._on_device_detached,
+            )
+
+    def _on_device_attached(self, _, device: Device):
+        if isinstance(self._pipeline, Gateway):
+            self._logger.info('attached: %s %s %s', device.device_node, device.hex_id, device.model)
+            with self._lock:
+                self._pipeline.attach(device.device_node)
+        elif device.device_node == self._device_node:
+            self._logger.info('attached: %s %s', device.hex_id, device.model)
+            with self._lock:
+                if not self._pipeline.active:
+                    self._pipeline.start()
+
+    def _on_device_detached(self, _, device: Device):
+        if isinstance(self._pipeline, Gateway):
+            self._logger.info('detached: %s %s', device.device_node, device.hex_id)
+            with self._lock:
+                self._pipeline.detach(device.device_node)
+        elif device.device_node == self._device_node:
+            self._logger.info('detached: %s', device.hex_id)
+            with self._lock:
+                if self._pipeline.active:
+                    self._pipeline.stop()
+
+    def run(self):
+        self._running = True
+        # SIGTERM as Ctrl+C, so select is interrupted instead of restarted
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+        try:
+            self._selector.register(sys.stdin, selectors.EVENT_READ, self._on_stdin)
+            self._buffers[sys.stdin.fileno()] = b''
+        except (PermissionError, ValueError, AttributeError):
+            # stdin closed or not selectable (/dev/null)
+            self._logger.debug('stdin is not available')
+        server = None
+        if self._control_path:
+            if os.path.exists(self._control_path):
+                os.unlink(self._control_path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(self._control_path)
+            server.listen()
+            server.setblocking(False)
+            self._selector.register(server, selectors.EVENT_READ, self._on_accept)
+            self._logger.info('control socket: {blue}%s{reset}', self._control_path)
+
+        with self._lock:
+            self._pipeline.open()
+        if self._monitor is None:
+            with self._lock:
+                if isinstance(self._pipeline, Gateway):
+                    for device_node in dict.fromkeys([self._device_node, *self._gateway_devices]):
+                        self._pipeline.attach(device_node)
+                else:
+                    self._pipeline.start()
+        else:
+            self._monitor.enum_devices()
+            self._monitor.start()
+
+        try:
+            next_supervise = time.monotonic() + self.SUPERVISE_INTERVAL
+            next_stat = time.monotonic() + self._stat_interval if self._stat_interval else float('inf')
+            while self._running:
+                timeout = max(0.0, min(next_supervise, next_stat) - time.monotonic())
+                for key, _ in self._selector.select(timeout=timeout):
+                    key.data(key.fileobj)
+                now = time.monotonic()
+                if now >= next_supervise:
+                    next_supervise = now + self.SUPERVISE_INTERVAL
+                    self._supervise()
+                if now >= next_stat:
+                    next_stat += self._stat_interval
+                    self._log_stats()
+        except KeyboardInterrupt:
+            self._logger.info('interrupted')
+        finally:
+            if self._monitor is not None:
+                self._monitor.stop()
+            with self._lock:
+                self._pipeline.close()
+            for key in list(self._selector.get_map().values()):
+                if key.fileobj is not sys.stdin:
+                    key.fileobj.close()
+            self._selector.close()
+            if server is not None:
+                os.unlink(self._control_path)
+            self._logger.info('finished')
+
+    def _read_lines(self, fd: int, data: bytes) -> list[str]:
+        *lines, self._buffers[fd] = (self._buffers[fd] + data).split(b'\n')
+        return [line.decode(errors='replace') for line in lines]
+
+    def _on_stdin(self, stdin):
+        # no TextIO buffering, read-ahead lines would not wake select
+        fd = stdin.fileno()
+        data = os.read(fd, self.LINE_SIZE)
+        for line in self._read_lines(fd, data):
+            reply = self._command(line)
+            if reply:
+                print(reply, flush=True)
+        if not data:
+            del self._buffers[fd]
+            self._selector.unregister(stdin)
+
+    def _on_accept(self, server: socket.socket):
+        conn, _ = server.accept()
+        conn.setblocking(False)
+        self._buffers[conn.fileno()] = b''
+        self._selector.register(conn, selectors.EVENT_READ, self._on_client)
+
+    def _on_client(self, conn: socket.socket):
+        try:
+            data = conn.recv(self.LINE_SIZE)
+            for line in self._read_lines(conn.fileno(), data):
+                reply = self._command(line)
+                conn.sendall((reply or 'ok').encode() + b'\n')
+        except BlockingIOError:
+            return
+        except OSError as ex:
+            # the client went away, the daemon keeps serving others
+            self._logger.debug('client error: %s', ex)
+            data = b''
+        if not data or len(self._buffers[conn.fileno()]) >= self.LINE_SIZE:
+            del self._buffers[conn.fileno()]
+            self._selector.unregister(conn)
+            conn.close()
+
+    def _command(self, line: str) -> str | None:
+        words = line.split()
+        if not words:
+            return None
+        command, args = words[0].lower(), words[1:]
+        try:
+            with self._lock:
+                match command:
+                    case 'ptt' | 'test':
+                        if not self._pipeline.active:
+                            return 'error: not running'
+                        mode = VocoderMode.from_rate(int(args[0])) if args else self._config.vocoder.mode
+                        if mode is None:
+                            return f'error: unknown rate {args[0]}'
+                        if self._pipeline.streaming:
+                            self._pipeline.stream_stop()
+                        self._pipeline.stream_start(
+                            mode=mode,
+                            test=command == 'test',
+                        )
+                    case 'stop':
+                        if self._pipeline.streaming:
+                            self._pipeline.stream_stop()
+                    case 'stats':
+                        return '\n'.join(self._stat_lines()) or 'no stats'
+                    case 'quit':
+                        self._running = False
+                    case _:
+                        return f'error: unknown command {command}'
+        except ValueError as ex:
+            return f'error: {ex}'
+        return None
+
+    def _stat_lines(self) -> list[str]:
+        lines = [f'{role.value}: {format_stat(stat)}' for role, stat in self._pipeline.get_stats().items()]
+        if isinstance(self._pipeline, Gateway):
+            stream_stats = self._pipeline.get_stream_stats()
+            for device_node, stats in self._pipeline.get_device_stats().items():
+                lines.extend(f'{device_node} {role.value}: {format_stat(stat)}' for role, stat in stats.items())
+                lines.extend(
+                    f'{device_node} stream {stat.rx_stream}: {format_stat(stat)}'
+                    for stat in stream_stats.get(device_node, [])
+                )
+        else:
+            lines.extend(f'stream {stat.rx_stream}: {format_stat(stat)}' for stat in self._pipeline.get_stream_stats())
+        return lines
+
+    def _supervise(self):
+        with self._lock:
+            self._pipeline.supervise()
+
+    def _log_stats(self):
+        with self._lock:
+            lines = self._stat_lines()
+        for line in lines:
+            self._logger.info('%s', line)
+
+
+def main():
+
+    # --- init dirs ---
+
+    cur_dir = Path(sys.argv[0]).resolve().parent
+    os.chdir(cur_dir)
+    root_dir = cur_dir.parent
+    config_dir = root_dir / 'config'
+
+    # --- init logging ---
+
+    init_logging(
+        filename=config_dir / 'log.yml',
+    )
+
+    # --- args ---
+
+    args = parse_args()
+
+    # --- load config ---
+
+    config = load_config(
+        filename=config_dir / 'config.yml',
+    )
+    if args.serial_engine:
+        config = replace(
+            config,
+            serial=replace(config.serial, engine=SerialEngine(args.serial_engine)),
+        )
+    logging.info('using serial engine {blue}%s{reset}', config.serial.engine.value)
+
+    # --- monitor ---
+
+    monitor = None if args.no_monitor else DeviceMonitor(
+        vendor_id=DEVICE_VENDOR_ID,
+        model_id=DEVICE_MODEL_ID,
+    )
+
+    # --- daemon ---
+
+    daemon = Daemon(
+        config=config,
+        monitor=monitor,
+        device_node=args.device,
+        control_path=args.socket,
+        stat_interval=args.stat_interval,
+        gateway=args.gateway,
+    )
+    daemon.run()
+
+
+if __name__ == '__main__':
+    main()
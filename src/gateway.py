@@ -0,0 +1,143 @@
+import logging
+from dataclasses import replace
+
+from codec.jobs import TaskRole
+from codec.modes import VocoderMode
+from config import Config, PcmTransport
+from pipeline import Pipeline
+from processes.base_process import BaseProcessStat
+from processes.decoder_stream import DecoderStreamStat
+
+
+class Gateway:
+    # one serial/encoder/decoder group per attached modem, all mixed by one shared player;
+    # PTT goes through a single modem: tx_device or the first one attached
+    NAME = 'gateway'
+
+    GROUP_ROLES = [TaskRole.SERIAL, TaskRole.ENCODER, TaskRole.DECODER]
+
+    def __init__(
+            self,
+            config: Config,
+            tx_device: str | None = None,
+            player: bool = True,
+    ):
+        self._logger = logging.getLogger(self.NAME)
+        if config.pipeline.transport != PcmTransport.SHM:
+            # groups reach the shared player through rings only
+            self._logger.info('gateway uses shm transport')
+            config = replace(config, pipeline=replace(config.pipeline, transport=PcmTransport.SHM))
+        self._config = config
+        self._tx_device = tx_device
+
+        self._audio = Pipeline(
+            config=config,
+            device_node=None,
+            roles=[TaskRole.PLAYER] if player else [],
+            player_channels=config.gateway.max_devices * config.streams.max_streams,
+        )
+        self._groups: dict[str, Pipeline] = {}
+        self._slots: dict[str, int] = {}
+        self._tx: str | None = None
+
+    @property
+    def devices(self) -> list[str]:
+        return list(self._groups)
+
+    @property
+    def tx_device(self) -> str | None:
+        return self._tx
+
+    @property
+    def active(self) -> bool:
+        return self._tx is not None and self._groups[self._tx].active
+
+    @property
+    def streaming(self) -> bool:
+        return self._tx is not None and self._groups[self._tx].streaming
+
+    def open(self):
+        self._audio.open()
+
+    def attach(
+            self,
+            device_node: str,
+    ) -> bool:
+        if device_node in self._groups:
+            return True
+        free = sorted(set(range(self._config.gateway.max_devices)) - set(self._slots.values()))
+        if not free:
+            self._logger.warning('no free slot for %s', device_node)
+            return False
+        slot = free[0]
+
+        tx = self._tx is None and self._tx_device in (None, device_node)
+        max_streams = self._config.streams.max_streams
+        group = Pipeline(
+            config=self._config,
+            device_node=device_node,
+            roles=self.GROUP_ROLES + ([TaskRole.RECORDER] if tx else []),
+            player_rings=self._audio.player_rings[slot * max_streams:(slot + 1) * max_streams],
+        )
+        self._logger.info('attach {blue}%s{reset}, slot: %d, tx: %s', device_node, slot, 'true' if tx else 'false')
+        group.start()
+
+        self._groups[device_node] = group
+        self._slots[device_node] = slot
+        if tx:
+            self._tx = device_node
+        return True
+
+    def detach(
+            self,
+            device_node: str,
+    ):
+        group = self._groups.pop(device_node, None)
+        if group is None:
+            return
+        self._logger.info('detach {blue}%s{reset}', device_node)
+        group.close()
+        del self._slots[device_node]
+        if device_node == self._tx:
+            # no PTT until another modem (or tx_device) attaches
+            self._tx = None
+
+    def close(self):
+        for device_node in list(self._groups):
+            self.detach(device_node)
+        self._audio.close()
+
+    def supervise(self) -> bool:
+        restarted = self._audio.supervise()
+        for group in self._groups.values():
+            restarted = group.supervise() or restarted
+        return restarted
+
+    def stream_start(
+            self,
+            mode: VocoderMode,
+            test: bool,
+    ):
+        if self._tx is None:
+            raise ValueError('no transmitting device')
+        self._groups[self._tx].stream_start(mode=mode, test=test)
+
+    def stream_stop(self):
+        if self._tx is not None:
+            self._groups[self._tx].stream_stop()
+
+    def get_stats(self) -> dict[TaskRole, BaseProcessStat]:
+        return self._audio.get_stats()
+
+    def get_device_stats(self) -> dict[str, dict[TaskRole, BaseProcessStat]]:
+        return {device_node: group.get_stats() for device_node, group in self._groups.items()}
+
+    def get_stream_stats(self) -> dict[str, list[DecoderStreamStat]]:
+        return {device_node: group.get_stream_stats() for device_node, group in self._groups.items()}
+
+    @property
+    def workers(self) -> list:
+        return [
+            *self._audio.workers,
+            *(worker for group in self._groups.values() for worker in group.workers),
+        ]
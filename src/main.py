@@ -2,21 +2,18 @@
 
 import argparse
 import logging
-import logging.config
 import os
 import sys
+from dataclasses import replace
 from pathlib import Path
 
 from kivy.core.window import Window
 from kivy.metrics import Metrics
 
-from config import load_config
-from monitor import DeviceMonitor
+from config import load_config, SerialEngine
+from monitor import DeviceMonitor, DEVICE_VENDOR_ID, DEVICE_MODEL_ID
 from model import Model
-from utils import load_yaml
-
-DEVICE_VENDOR_ID = 0x1a86
-DEVICE_MODEL_ID = 0x7523
+from utils import init_logging
 
 
 def parse_args():
@@ -37,16 +34,17 @@ def parse_args():
         help='auto start',
         default=False,
     )
+    parser.add_argument(
+        '--serial-engine',
+        dest='serial_engine',
+        help='serial engine (overrides config)',
+        choices=[engine.value for engine in SerialEngine],
+        default=None,
+    )
     args = parser.parse_args()
     return args
 
 
-def init_logging(filename):
-    cfg = load_yaml(filename)
-    logging.config.dictConfig(cfg)
-    logging.info('log config: {blue}%s{reset}', filename)
-
-
 def main():
 
     # --- init dirs ---
@@ -71,6 +69,12 @@ def main():
     config = load_config(
         filename=config_dir / 'config.yml',
     )
+    if args.serial_engine:
+        config = replace(
+            config,
+            serial=replace(config.serial, engine=SerialEngine(args.serial_engine)),
+        )
+    logging.info('using serial engine {blue}%s{reset}', config.serial.engine.value)
 
     # --- apply font_scale ---
 
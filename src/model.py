@@ -1,20 +1,14 @@
 import logging
-from multiprocessing import Process, Queue
-from typing import Type
 
 from kivy.event import EventDispatcher
 from kivy.properties import ObjectProperty, BooleanProperty
 
-from codec.jobs import StopJob, StreamStartJob, StreamStopJob, TaskRole
+from codec.jobs import TaskRole
 from codec.modes import VocoderMode
 from config import Config
 from monitor import Device, DeviceMonitor
-from processes.base_process import BaseProcess, BaseProcessStat
-from processes.decoder_process import DecoderProcess
-from processes.encoder_process import EncoderProcess
-from processes.player_process import PlayerProcess
-from processes.recorder_process import RecorderProcess
-from processes.serial_process import SerialProcess
+from pipeline import Pipeline
+from processes.base_process import BaseProcessStat
 
 
 class Model(EventDispatcher):
@@ -37,8 +31,12 @@ class Model(EventDispatcher):
         self._monitor = monitor
         self._device_node = device_node
 
-        self._stat_queue = Queue()
-        self._queues: dict[TaskRole, Queue] = {}
+        self._pipeline = Pipeline(
+            config=config,
+            device_node=device_node,
+        )
+        # workers start now, START only attaches the modem
+        self._pipeline.open()
 
         self._monitor.bind(
             on_attached=self._on_device_attached,
@@ -60,43 +58,7 @@ class Model(EventDispatcher):
             return
         self._logger.debug('start {blue}%s{reset}', self.device.device_node)
 
-        self._queues = {role: Queue() for role in TaskRole}
-
-        targets = [
-            (
-                TaskRole.SERIAL,
-                SerialProcess,
-            ),
-            (
-                TaskRole.ENCODER,
-                EncoderProcess,
-            ),
-            (
-                TaskRole.DECODER,
-                DecoderProcess,
-            ),
-            (
-                TaskRole.PLAYER,
-                PlayerProcess,
-            ),
-            (
-                TaskRole.RECORDER,
-                RecorderProcess,
-            ),
-        ]
-        for role, cls in reversed(targets):
-            process = Process(
-                target=self._process_wrapper,
-                kwargs=dict(
-                    cls=cls,
-                    config=self._config,
-                    role=role,
-                    device_node=self._device_node,
-                    stat_queue=self._stat_queue,
-                    queues=self._queues,
-                )
-            )
-            process.start()
+        self._pipeline.start()
 
         self.active = True
 
@@ -106,62 +68,36 @@ class Model(EventDispatcher):
             return
         self._logger.debug('stop')
 
-        self._send_queue_stop()
+        self._pipeline.stop()
 
         self.active = False
+        self.streaming = False
+        self.test = None
 
-    @staticmethod
-    def _process_wrapper(
-            cls: Type[BaseProcess],
-            config: Config,
-            role: TaskRole,
-            device_node: str,
-            stat_queue: Queue,
-            queues: dict[TaskRole, Queue],
-    ):
-        p = cls(
-            config=config,
-            role=role,
-            device_node=device_node,
-            stat_queue=stat_queue,
-            queues=queues,
-        )
-        p.run()
-
-    def _send_queue_stop(self):
-        for queue in self._queues.values():
-            queue.put(StopJob())
+    def close(self):
+        if self.active:
+            self.stop()
+        self._pipeline.close()
 
     def stream_start(
             self,
             mode: VocoderMode,
             test: bool,
     ):
-        self._logger.info('start stream %s, test: %s', mode.name, 'true' if test else 'false')
-        self.streaming = True
-        self.test = test
-        job = StreamStartJob(
+        self._pipeline.stream_start(
             mode=mode,
             test=test,
         )
-        for role in [TaskRole.ENCODER, TaskRole.RECORDER]:
-            queue = self._queues[role]
-            queue.put(job)
+        self.streaming = True
+        self.test = test
 
     def stream_stop(self):
+        self._pipeline.stream_stop()
         self.streaming = False
         self.test = None
-        job = StreamStopJob()
-        for role in [TaskRole.RECORDER, TaskRole.ENCODER]:
-            queue = self._queues[role]
-            queue.put(job)
 
     def get_stats(self) -> dict[TaskRole, BaseProcessStat]:
-        stats: dict[TaskRole, BaseProcessStat] = {}
-
-        # --- get last stats ---
-
-        while not self._stat_queue.empty():
-            stat:  BaseProcessStat = self._stat_queue.get(block=False)
-            stats[stat.role] = stat
-        return stats
+        if self._pipeline.supervise():
+            self.streaming = False
+            self.test = None
+        return self._pipeline.get_stats()
@@ -1,9 +1,11 @@
 import logging
 from dataclasses import dataclass
-from typing import Dict
+from typing import Callable, Dict
 
 import pyudev
-from kivy.event import EventDispatcher
+
+DEVICE_VENDOR_ID = 0x1a86
+DEVICE_MODEL_ID = 0x7523
 
 
 @dataclass(frozen=True)
@@ -29,22 +31,21 @@ class Device:
         return f'{self.vendor_id:04x}:{self.model_id:04x}'
 
 
-class DeviceMonitor(EventDispatcher):
+class DeviceMonitor:
+    # no kivy so daemon.py can use it; bind/dispatch follow EventDispatcher
     NAME = 'monitor'
+    EVENTS = ['on_attached', 'on_detached']
 
     def __init__(
             self,
             vendor_id: int,
             model_id: int,
     ):
-        super().__init__()
         self._logger = logging.getLogger(self.NAME)
         self._vendor_id = vendor_id
         self._model_id = model_id
 
-        for s in ['on_attached', 'on_detached']:
-            # noinspection PyUnresolvedReferences
-            self.register_event_type(s)
+        self._handlers: dict[str, list[Callable]] = {event: [] for event in self.EVENTS}
 
         self._context = pyudev.Context()
         self._monitor = pyudev.Monitor.from_netlink(context=self._context)
@@ -57,9 +58,27 @@ class DeviceMonitor(EventDispatcher):
             callback=self._monitor_callback,
         )
 
+    def bind(self, **handlers: Callable):
+        for event, handler in handlers.items():
+            self._handlers[event].append(handler)
+
+    def unbind(self, **handlers: Callable):
+        for event, handler in handlers.items():
+            self._handlers[event].remove(handler)
+
+    def dispatch(self, event: str, device: Device):
+        # last bound first, True stops dispatch
+        for handler in reversed(self._handlers[event]):
+            if handler(self, device):
+                return True
+        return getattr(self, event)(device)
+
     def start(self):
         self._monitor_thread.start()
 
+    def stop(self):
+        self._monitor_thread.stop()
+
     def enum_devices(self):
         devices = self._context.list_devices(
             subsystem='tty',
@@ -69,7 +88,6 @@ class DeviceMonitor(EventDispatcher):
         )
         for dev in devices:
             device = Device.from_dict(dev)
-            # noinspection PyUnresolvedReferences
             self.dispatch('on_attached', device)
 
     def on_attached(self, device: Device):
@@ -83,8 +101,6 @@ class DeviceMonitor(EventDispatcher):
         if device.vendor_id == self._vendor_id and device.model_id == self._model_id:
             match dev.action:
                 case 'add':
-                    # noinspection PyUnresolvedReferences
                     self.dispatch('on_attached', device)
                 case 'remove':
-                    # noinspection PyUnresolvedReferences
                     self.dispatch('on_detached', device)
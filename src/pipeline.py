@@ -0,0 +1,291 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import Queue
+from typing import Type
+
+from codec.jobs import AttachJob, DetachJob, ResetJob, StopJob, StreamStartJob, StreamStopJob, TaskRole
+from codec.modes import VocoderMode
+from codec.ring import SampleRing
+from config import Config, PcmTransport, PipelineMode
+from processes.base_process import BaseProcess, BaseProcessStat
+from processes.decoder_process import DecoderProcess
+from processes.decoder_stream import DecoderStreamStat
+from processes.encoder_process import EncoderProcess
+from processes.player_process import PlayerProcess
+from processes.recorder_process import RecorderProcess
+from processes.serial_process import SerialProcess
+from processes.stats import StatsBlock, StatLayout
+
+
+class Pipeline:
+    # serial/encoder/decoder/player/recorder without UI dependencies;
+    # workers start once (open), START/STOP only attach the modem and reset state
+    NAME = 'pipeline'
+
+    # seconds
+    RING_DURATION = 10
+    JOIN_TIMEOUT = 2.0
+    RESTART_INTERVAL = 5.0
+
+    TARGETS: list[tuple[TaskRole, Type[BaseProcess]]] = [
+        (
+            TaskRole.SERIAL,
+            SerialProcess,
+        ),
+        (
+            TaskRole.ENCODER,
+            EncoderProcess,
+        ),
+        (
+            TaskRole.DECODER,
+            DecoderProcess,
+        ),
+        (
+            TaskRole.PLAYER,
+            PlayerProcess,
+        ),
+        (
+            TaskRole.RECORDER,
+            RecorderProcess,
+        ),
+    ]
+
+    def __init__(
+            self,
+            config: Config,
+            device_node: str | None,
+            roles: list[TaskRole] | None = None,
+            player_channels: int | None = None,
+            player_rings: list[SampleRing] | None = None,
+    ):
+        self._logger = logging.getLogger(self.NAME)
+        self._config = config
+        self._device_node = device_node
+        self._roles = list(TaskRole) if roles is None else roles
+        self._player_channels = player_channels or config.streams.max_streams
+        # rings of a shared player (gateway), closed by their owner
+        self._player_rings = player_rings
+
+        self._inproc = config.pipeline.mode == PipelineMode.INPROC
+        # a stats slot per role and per decoder stream
+        slots = len(TaskRole) + config.streams.max_streams
+        self._stats = StatsBlock(slots) if self._inproc else StatsBlock.shared(slots)
+        self._stat_layouts = {role: StatLayout(cls.STAT) for role, cls in self.TARGETS if cls.STAT}
+        self._stream_stat_layout = StatLayout(DecoderStreamStat)
+        self._queues: dict[TaskRole, Queue] = {}
+        self._rings: dict[TaskRole, list[SampleRing]] = {}
+        self._workers: list[threading.Thread | multiprocessing.Process] = []
+        self._restart_time: float | None = None
+
+        self.active = False
+        self.streaming = False
+        self.test: bool | None = None
+
+    @property
+    def opened(self) -> bool:
+        return bool(self._workers)
+
+    def open(self):
+        if self.opened:
+            return
+        self._logger.debug('open, mode: %s', self._config.pipeline.mode.value)
+
+        if self._config.pipeline.transport == PcmTransport.SHM:
+            capacity = self.RING_DURATION * self._config.vocoder.sound_rate
+            ring_factory = SampleRing if self._inproc else SampleRing.shared
+            self._rings = {
+                TaskRole.ENCODER: [ring_factory(capacity)],
+                TaskRole.PLAYER: self._player_rings or [ring_factory(capacity) for _ in range(self._player_channels)],
+            }
+        self._spawn()
+
+    def _spawn(self):
+        queue_cls = queue.Queue if self._inproc else multiprocessing.Queue
+        self._queues = {role: queue_cls() for role in TaskRole}
+
+        worker_cls = threading.Thread if self._inproc else multiprocessing.Process
+        self._workers = []
+        for role, cls in reversed(self.TARGETS):
+            if role not in self._roles:
+                continue
+            worker = worker_cls(
+                name=role.value,
+                target=self._process_wrapper,
+                kwargs=dict(
+                    cls=cls,
+                    config=self._config,
+                    role=role,
+                    device_node=self._device_node,
+                    stats=self._stats,
+                    queues=self._queues,
+                    rings=self._rings,
+                ),
+                daemon=self._inproc,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _join(self):
+        deadline = time.monotonic() + self.JOIN_TIMEOUT
+        for worker in self._workers:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+            if not worker.is_alive():
+                continue
+            if isinstance(worker, multiprocessing.Process):
+                self._logger.warning('terminate %s', worker.name)
+                worker.terminate()
+                worker.join(timeout=self.JOIN_TIMEOUT)
+            else:
+                self._logger.warning('thread %s is still running', worker.name)
+        self._workers = []
+
+    def supervise(self) -> bool:
+        # one dead worker stops the rest (BaseProcess.run), respawn them all
+        if not self.opened or all(worker.is_alive() for worker in self._workers):
+            return False
+        now = time.monotonic()
+        if self._restart_time is not None and now - self._restart_time < self.RESTART_INTERVAL:
+            return False
+        self._restart_time = now
+        self._logger.warning('worker died, restarting')
+
+        # rings are single-reader: the new readers clear them (EncoderProcess, PlayerProcess)
+        self._send_queue_stop()
+        self._join()
+        self._spawn()
+        self.streaming = False
+        self.test = None
+        if self.active:
+            self._attach()
+        return True
+
+    def _attach(self):
+        job = AttachJob(device_node=self._device_node)
+        for role in [TaskRole.SERIAL, TaskRole.RECORDER]:
+            self._queues[role].put(job)
+
+    def start(self):
+        if self.active:
+            self._logger.warning('already running')
+            return
+        self._logger.debug('start {blue}%s{reset}', self._device_node)
+
+        self.open()
+        self._attach()
+
+        self.active = True
+
+    def stop(self):
+        if not self.active:
+            self._logger.warning('not running')
+            return
+        self._logger.debug('stop')
+
+        if self.streaming:
+            self.stream_stop()
+        for role in [TaskRole.SERIAL, TaskRole.RECORDER]:
+            self._queues[role].put(DetachJob())
+        for role in [TaskRole.ENCODER, TaskRole.DECODER, TaskRole.PLAYER]:
+            if role in self._roles:
+                self._queues[role].put(ResetJob())
+
+        self.active = False
+        self.streaming = False
+        self.test = None
+
+    def close(self):
+        if self.active:
+            self.stop()
+        if self.opened:
+            self._logger.debug('close')
+            self._send_queue_stop()
+            self._join()
+
+        for rings in self._rings.values():
+            if rings is self._player_rings:
+                continue
+            for ring in rings:
+                ring.close(unlink=True)
+        self._rings = {}
+        self._stats.close(unlink=True)
+
+    @property
+    def player_rings(self) -> list[SampleRing]:
+        return self._rings.get(TaskRole.PLAYER, [])
+
+    @property
+    def workers(self) -> list[threading.Thread | multiprocessing.Process]:
+        return self._workers
+
+    @staticmethod
+    def _process_wrapper(
+            cls: Type[BaseProcess],
+            config: Config,
+            role: TaskRole,
+            device_node: str | None,
+            stats: StatsBlock,
+            queues: dict[TaskRole, Queue],
+            rings: dict[TaskRole, list[SampleRing]],
+    ):
+        p = cls(
+            config=config,
+            role=role,
+            device_node=device_node,
+            stats=stats,
+            queues=queues,
+            rings=rings,
+        )
+        p.run()
+
+    def _send_queue_stop(self):
+        for q in self._queues.values():
+            q.put(StopJob())
+
+    def stream_start(
+            self,
+            mode: VocoderMode,
+            test: bool,
+    ):
+        self._logger.info('start stream %s, test: %s', mode.name, 'true' if test else 'false')
+        self.streaming = True
+        self.test = test
+        job = StreamStartJob(
+            mode=mode,
+            test=test,
+        )
+        for role in [TaskRole.ENCODER, TaskRole.RECORDER]:
+            q = self._queues[role]
+            q.put(job)
+
+    def stream_stop(self):
+        self.streaming = False
+        self.test = None
+        job = StreamStopJob()
+        for role in [TaskRole.RECORDER, TaskRole.ENCODER]:
+            q = self._queues[role]
+            q.put(job)
+
+    def get_stats(self) -> dict[TaskRole, BaseProcessStat]:
+        stats: dict[TaskRole, BaseProcessStat] = {}
+
+        # --- get last stats ---
+
+        for role, layout in self._stat_layouts.items():
+            values = self._stats.snapshot(BaseProcess.stat_slot(role), len(layout))
+            if values is not None:
+                stats[role] = layout.decode(role, values)
+        return stats
+
+    def get_stream_stats(self) -> list[DecoderStreamStat]:
+        stats = []
+        for index in range(self._config.streams.max_streams):
+            values = self._stats.snapshot(BaseProcess.stream_stat_slot(index), len(self._stream_stat_layout))
+            if values is None:
+                continue
+            stat = self._stream_stat_layout.decode(TaskRole.DECODER, values)
+            if stat.rx_stream is not None:
+                stats.append(stat)
+        return stats
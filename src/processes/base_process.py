@@ -1,9 +1,12 @@
 import logging
 from dataclasses import dataclass
 from multiprocessing import Queue
+from typing import Type
 
 from codec.jobs import StopJob, TaskRole
+from codec.ring import SampleRing
 from config import Config
+from processes.stats import StatsBlock, StatLayout
 
 
 @dataclass
@@ -12,31 +15,55 @@ class BaseProcessStat:
 
 
 class BaseProcess:
+    STAT: Type[BaseProcessStat] | None = None
+
     def __init__(
             self,
             config: Config,
             role: TaskRole,
-            device_node: str,
-            stat_queue: Queue,
+            device_node: str | None,
+            stats: StatsBlock,
             queues: dict[TaskRole, Queue],
+            rings: dict[TaskRole, list[SampleRing]],
     ):
         self._logger = logging.getLogger(role.value)
         self._config = config
         self._role = role
         self._device_node = device_node
-        self._stat_queue = stat_queue
+        self._stats = stats
+        self._stat_slot = self.stat_slot(role)
+        self._stat_layout = StatLayout(self.STAT) if self.STAT else None
         self._queues = queues
+        # shm rings by reader role; the player has one per decoder stream
+        self._rings = rings
 
         self._stat: BaseProcessStat = None
 
         self._init()
 
+    @staticmethod
+    def stat_slot(role: TaskRole) -> int:
+        return list(TaskRole).index(role)
+
+    @staticmethod
+    def stream_stat_slot(index: int) -> int:
+        return len(TaskRole) + index
+
+    def _read_stat(self, role: TaskRole, layout: StatLayout) -> BaseProcessStat | None:
+        # None - not published yet
+        values = self._stats.snapshot(self.stat_slot(role), len(layout))
+        return None if values is None else layout.decode(role, values)
+
     def _send_stat(self):
         if self._stat:
-            self._stat_queue.put(self._stat)
+            self._publish_stat(self._stat_slot, self._stat_layout, self._stat)
+
+    def _publish_stat(self, slot: int, layout: StatLayout, stat: BaseProcessStat):
+        self._stats.publish(slot, layout.encode(stat))
 
     def run(self):
         self._logger.info('started')
+        self._send_stat()
         try:
             self._run()
         except KeyboardInterrupt:
@@ -1,42 +1,90 @@
+from collections import OrderedDict
 from dataclasses import dataclass
+from queue import Empty
 
 import numpy as np
-from pycodec2 import Codec2
 
-from codec.audio import generate_tone
-from codec.jobs import StopJob, RecvJob, PacketKind, PlayJob, TaskRole
+from codec.audio import generate_noise, generate_tone
+from codec.jobs import StopJob, RecvJob, PacketKind, PlayJob, ResetJob, TaskRole
 from codec.modes import VocoderMode
 from processes.base_process import BaseProcess, BaseProcessStat
-from processes.packet import decode_payload, MAGIC_WORD
+from processes.stats import StatLayout
+from processes.decoder_stream import DecoderStream, DecoderStreamStat
+from processes.framer import Framer
+from processes.packet import decode_payload, decode_stream_frame_body
 from utils import timestamp_now
 
 
 @dataclass
 class DecoderProcessStat(BaseProcessStat):
+    # stream fields mirror the last heard stream, see DecoderStreamStat for each one
     rx_packets: int
     rx_duration: float
     rx_mode: VocoderMode | None
+    rx_mode_switches: int
     rx_current: int | None
     rx_speed: int | None
     rx_delay: float | None
     rx_lost: int | None
+    rx_recovered: int
+    rx_streams: int
+    rx_evictions: int
+    rx_joins: int
+    rx_first_audio: float | None
+    rx_concealed: int
+    rx_comfort_noise: float
+    rx_dropped: int
+    rx_bad: int
+    rx_codec_fps: float | None
+    rx_jitter: float
+    rx_playout_delay: float
+    rx_underruns: int
+    rx_overflow_drops: int
 
 
 class DecoderProcess(BaseProcess):
+    STAT = DecoderProcessStat
 
     def _init(self):
-        self._buffer = bytearray()
+        self._framer = Framer()
+        self._bad_packets = 0
 
         self._stat = DecoderProcessStat(
             role=self._role,
             rx_packets=0,
             rx_duration=0,
             rx_mode=None,
+            rx_mode_switches=0,
             rx_current=None,
             rx_speed=None,
             rx_delay=None,
             rx_lost=None,
+            rx_recovered=0,
+            rx_streams=0,
+            rx_evictions=0,
+            rx_joins=0,
+            rx_first_audio=None,
+            rx_concealed=0,
+            rx_comfort_noise=0.0,
+            rx_dropped=0,
+            rx_bad=0,
+            rx_codec_fps=None,
+            rx_jitter=0,
+            rx_playout_delay=0,
+            rx_underruns=0,
+            rx_overflow_drops=0,
         )
+        self._rng = np.random.default_rng()
+
+        rate_config = self._config.rate
+        modes = [
+            mode for mode in VocoderMode
+            if rate_config.min_mode.rate <= mode.rate <= rate_config.max_mode.rate
+        ] if rate_config.adaptive else []
+        # stream id -> stream, least recently heard first
+        self._slots = [DecoderStream(index, self._config, modes) for index in range(self._config.streams.max_streams)]
+        self._streams: OrderedDict[int, DecoderStream] = OrderedDict()
+        self._stream_stat_layout = StatLayout(DecoderStreamStat)
 
         sound_rate = self._config.vocoder.sound_rate
         self._stream_start_tone = generate_tone(
@@ -64,105 +112,207 @@ class DecoderProcess(BaseProcess):
             amplitude=0.1,
         )
 
-    def _yield_blocks(self):
-        while True:
+    def _open_stream(self, stream_id: int) -> DecoderStream:
+        free = [stream for stream in self._slots if stream.stream_id is None]
+        if free:
+            stream = free[0]
+        else:
+            _, stream = self._streams.popitem(last=False)
+            self._logger.info('stream %s evicted by %s', stream.stream_id, stream_id)
+            self._stat.rx_evictions += 1
+            stream.close()
+            self._send_stream_stat(stream)
+        self._streams[stream_id] = stream
+        return stream
 
-            # --- header ---
+    def _close_stream(self, stream: DecoderStream):
+        del self._streams[stream.stream_id]
+        stream.close()
+        self._send_stream_stat(stream)
 
-            index = self._buffer.find(MAGIC_WORD)
-            if index < 0:
-                # no packet header
-                break
-            index += len(MAGIC_WORD)
+    def _send_stream_stat(self, stream: DecoderStream):
+        stream.update_stat()
+        self._publish_stat(self.stream_stat_slot(stream.index), self._stream_stat_layout, stream.stat)
 
-            # --- payload size ---
+    def _run(self):
+        decoder_queue = self._queues[TaskRole.DECODER]
+        player_queue = self._queues[TaskRole.PLAYER]
+        player_rings = self._rings.get(TaskRole.PLAYER)
 
-            if index + 2 > len(self._buffer):
-                # no enough for payload size
-                break
-            payload_size = self._buffer[index]
-            index += 1
+        def play(stream: DecoderStream, samples: np.ndarray):
+            if player_rings is None:
+                player_queue.put(PlayJob(
+                    samples=samples,
+                    channel=stream.index,
+                ))
+            else:
+                player_rings[stream.index].write(samples)
 
-            # --- payload ---
+        def play_released(stream: DecoderStream, released: list[np.ndarray], now: float):
+            for samples in stream.released(released, now):
+                play(stream, samples)
 
-            if index + payload_size > len(self._buffer):
-                # no enough for payload
-                break
-            payload = self._buffer[index: index + payload_size]
-            index += payload_size
+        def play_frames(stream: DecoderStream, groups: list[list[bytes | None]], test: bool, now: float):
+            for group in groups:
+                bodies = []
+                for body in group:
+                    try:
+                        bodies.append(None if body is None else decode_stream_frame_body(test, body))
+                    except ValueError as ex:
+                        self._logger.warning('bad frame: %s', ex)
+                        self._bad_packets += 1
+                        bodies.append(None)
 
-            self._buffer = self._buffer[index:]
-            yield decode_payload(bytes(payload))
+                if test:
+                    for _, duration, _ in filter(None, bodies):
+                        self._stat.rx_delay = stream.stat.rx_duration - duration
+                        stream.jitter.observe(now, sent=duration)
+                        play(stream, self._stream_test_tone)
+                    continue
 
-    def _run(self):
-        decoder_queue = self._queues[TaskRole.DECODER]
-        player_queue = self._queues[TaskRole.PLAYER]
+                concealed = stream.stat.rx_concealed
+                samples = stream.decode([None if body is None else body[0] for body in bodies])
+                self._stat.rx_concealed += stream.stat.rx_concealed - concealed
+                self._stat.rx_codec_fps = stream.engine.decode_fps(stream.mode)
+                if samples is None:
+                    continue
+                # one push per packet, the jitter estimate counts pushes
+                play_released(stream, stream.jitter.push(samples, now), now)
 
-        vocoder: Codec2 = None
-        last_index: int = None
-        start_time: float = None
+        def switch_mode(stream: DecoderStream, mode: VocoderMode, test: bool, now: float):
+            # frames waiting for parity are decoded in the old mode
+            play_frames(stream, stream.fec.flush(), test, now)
+            stream.switch_mode(mode)
+            self._stat.rx_mode_switches += 1
+            self._logger.info('stream %s vocoder: {blue}%s{reset} bps', stream.stream_id, mode.rate)
+
+        def start_stream(stream_id: int, mode: VocoderMode, now: float, **kwargs) -> DecoderStream:
+            if (stream := self._streams.get(stream_id)) is None:
+                stream = self._open_stream(stream_id)
+            stream.start(stream_id, mode, now, **kwargs)
+            stream.heard(now)
+            self._stat.rx_current = 0
+            self._logger.info('stream %s vocoder: {blue}%s{reset} bps', stream_id, mode.rate)
+            return stream
 
         while True:
-            job = decoder_queue.get(block=True)
+            now = timestamp_now()
+            timeouts = [t for stream in self._streams.values() if (t := stream.jitter.timeout(now)) is not None]
+            try:
+                job = decoder_queue.get(block=True, timeout=min(timeouts) if timeouts else None)
+            except Empty:
+                now = timestamp_now()
+                for stream in self._streams.values():
+                    play_released(stream, stream.jitter.poll(now), now)
+                self._update_stat()
+                self._send_stat()
+                continue
+
             if isinstance(job, StopJob):
                 break
 
+            if isinstance(job, ResetJob):
+                self._framer.reset()
+                for stream in list(self._streams.values()):
+                    self._close_stream(stream)
+                continue
+
             if isinstance(job, RecvJob):
-                self._buffer.extend(job.data)
-                for kind, test, payload in self._yield_blocks():
+                for payload in self._framer.feed(job.data):
+                    try:
+                        kind, test, payload = decode_payload(payload)
+                    except ValueError as ex:
+                        self._logger.warning('bad packet: %s', ex)
+                        self._bad_packets += 1
+                        continue
                     self._stat.rx_packets += 1
+                    now = timestamp_now()
+
+                    stream_id = payload[0]
+                    stream = self._streams.get(stream_id)
+                    if stream is None and kind not in (PacketKind.STREAM_START, PacketKind.STREAM_FRAME):
+                        self._logger.debug('%s outside of stream dropped', kind.name)
+                        continue
 
                     match kind:
                         case PacketKind.STREAM_START:
-                            (self._stat.rx_mode,) = payload
-                            self._stat.rx_duration = 0
-                            self._stat.rx_lost = 0
-                            self._stat.rx_current = 0
-                            vocoder = Codec2(self._stat.rx_mode.rate)
-                            self._logger.info('vocoder: {blue}%s{reset} bps', self._stat.rx_mode.rate)
-                            last_index = 0
-                            start_time = timestamp_now()
-
-                            samples = self._stream_start_tone
+                            _, mode, fec_group, fec_interleave = payload
+                            stream = start_stream(stream_id, mode, now, fec_group=fec_group, fec_interleave=fec_interleave)
+                            play(stream, self._stream_start_tone)
 
                         case PacketKind.STREAM_FRAME:
-                            block, duration, packet_index = payload
-                            self._stat.rx_duration = timestamp_now() - start_time
-                            if test:
-                                self._stat.rx_delay = self._stat.rx_duration - duration
-                                if last_index is not None and packet_index != last_index + 1:
-                                    delta = packet_index - last_index + 1
-                                    if 0 < delta <= 10:
-                                        self._stat.rx_lost = self._stat.rx_lost + delta
-                                last_index = packet_index
-
-                                samples = self._stream_test_tone
+                            _, mode, seq, body, interleave = payload
+                            if stream is None:
+                                # late join: mode from the tag, the FEC group comes with the first parity
+                                stream = start_stream(stream_id, mode, now, fec_interleave=interleave, next_seq=None)
+                                self._stat.rx_joins += 1
+                                self._logger.info('joined stream %s mid-transmission', stream_id)
                             else:
-                                frames = []
-                                while len(block):
-                                    chunk, block = block[:self._stat.rx_mode.encoded_len], block[self._stat.rx_mode.encoded_len:]
-                                    frame: np.ndarray = vocoder.decode(chunk)
-                                    frames.append(frame)
+                                if mode != stream.mode:
+                                    switch_mode(stream, mode, test, now)
+                                stream.heard(now)
+                            play_frames(stream, stream.fec.push_frame(seq, body), test, now)
+
+                        case PacketKind.STREAM_PARITY:
+                            _, _, *parity = payload
+                            stream.heard(now)
+                            play_frames(stream, stream.fec.push_parity(*parity), test, now)
 
-                                samples = np.concatenate(frames)
+                        case PacketKind.STREAM_MODE:
+                            _, mode = payload
+                            stream.heard(now)
+                            switch_mode(stream, mode, test, now)
+
+                        case PacketKind.STREAM_SILENCE:
+                            _, count, level = payload
+                            stream.heard(now)
+                            play_frames(stream, stream.fec.flush(), test, now)
+                            n = count * stream.mode.samples_per_frame
+                            if not test:
+                                noise = generate_noise(n, level, self._rng)
+                                play_released(stream, stream.jitter.push(noise, now), now)
+                            self._stat.rx_comfort_noise += n / self._config.vocoder.sound_rate
 
                         case PacketKind.STREAM_STOP:
-                            duration, = payload
-                            self._stat.rx_duration = timestamp_now() - start_time
+                            _, duration = payload
+                            stream.heard(now)
+                            play_frames(stream, stream.fec.flush(), test, now)
                             if test:
-                                self._stat.rx_delay = self._stat.rx_duration - duration
+                                self._stat.rx_delay = stream.stat.rx_duration - duration
                             else:
                                 pass
 
-                            samples = self._stream_stop_tone
+                            play_released(stream, stream.jitter.flush(now), now)
+                            play(stream, self._stream_stop_tone)
 
                         case _:
                             raise NotImplementedError()
 
-                    player_queue.put(PlayJob(
-                        samples=samples,
-                    ))
+                    self._streams.move_to_end(stream_id)
+                    self._update_stat()
+                    if kind == PacketKind.STREAM_STOP:
+                        self._close_stream(stream)
+                    else:
+                        self._send_stream_stat(stream)
 
-                self._stat.rx_current += len(job.data)
+                self._stat.rx_dropped = self._framer.dropped
+                self._stat.rx_bad = self._framer.bad + self._bad_packets
+                self._stat.rx_current = (self._stat.rx_current or 0) + len(job.data)
                 self._stat.rx_speed = self._stat.rx_current / self._stat.rx_duration if self._stat.rx_duration else None
+                self._update_stat()
                 self._send_stat()
+
+    def _update_stat(self):
+        if self._streams:
+            stream = next(reversed(self._streams.values()))
+            stream.update_stat()
+            self._stat.rx_mode = stream.mode
+            self._stat.rx_duration = stream.stat.rx_duration
+            self._stat.rx_lost = stream.stat.rx_lost
+            self._stat.rx_recovered = stream.stat.rx_recovered
+            self._stat.rx_first_audio = stream.stat.rx_first_audio
+            self._stat.rx_jitter = stream.stat.rx_jitter
+            self._stat.rx_playout_delay = stream.stat.rx_playout_delay
+        self._stat.rx_streams = len(self._streams)
+        self._stat.rx_underruns = sum(stream.jitter.underruns for stream in self._slots)
+        self._stat.rx_overflow_drops = sum(stream.jitter.overflow_drops for stream in self._slots)
@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+from itertools import groupby
+
+import numpy as np
+
+from codec.bitpack import unpack_frames
+from codec.engine import CodecEngine
+from codec.jitter import JitterBuffer
+from codec.jobs import TaskRole
+from codec.modes import VocoderMode
+from codec.plc import Concealer
+from config import Config
+from processes.base_process import BaseProcessStat
+from processes.fec import FecDecoder, deinterleave
+
+
+@dataclass
+class DecoderStreamStat(BaseProcessStat):
+    # None - free slot
+    rx_stream: int | None
+    rx_mode: VocoderMode | None
+    rx_packets: int
+    rx_duration: float
+    rx_lost: int
+    rx_recovered: int
+    rx_concealed: int
+    rx_first_audio: float | None
+    rx_jitter: float
+    rx_playout_delay: float
+
+
+class DecoderStream:
+    # per-stream receive state; one per slot of the stream table, reused by later streams
+
+    def __init__(
+            self,
+            index: int,
+            config: Config,
+            modes: list[VocoderMode],
+    ):
+        self.index = index
+        self._sound_rate = config.vocoder.sound_rate
+
+        self.engine = CodecEngine()
+        for mode in modes:
+            self.engine.vocoder(mode)
+        self.fec = FecDecoder()
+        self.concealer = Concealer(config.vocoder.sound_rate)
+        self.jitter = JitterBuffer(
+            sound_rate=config.vocoder.sound_rate,
+            min_delay=config.jitter.min_delay,
+            max_delay=config.jitter.max_delay,
+        )
+
+        self.stream_id: int | None = None
+        self.mode: VocoderMode | None = None
+        self.start_time: float | None = None
+        self.last_time = 0.0
+        # a lost packet is assumed to hold as many frames as the last one heard
+        self._packet_frames = 1
+
+        self.stat = DecoderStreamStat(
+            role=TaskRole.DECODER,
+            rx_stream=None,
+            rx_mode=None,
+            rx_packets=0,
+            rx_duration=0.0,
+            rx_lost=0,
+            rx_recovered=0,
+            rx_concealed=0,
+            rx_first_audio=None,
+            rx_jitter=0.0,
+            rx_playout_delay=0.0,
+        )
+
+    def start(
+            self,
+            stream_id: int,
+            mode: VocoderMode,
+            now: float,
+            fec_group: int = 0,
+            fec_interleave: bool = False,
+            next_seq: int | None = 0,
+    ):
+        self.stream_id = stream_id
+        self.start_time = now
+        self.last_time = now
+        self._packet_frames = 1
+        self.fec.reset(fec_group, fec_interleave, next_seq)
+        self.concealer.reset()
+        self.jitter.reset()
+        self.switch_mode(mode)
+
+        self.stat.rx_stream = stream_id
+        self.stat.rx_packets = 0
+        self.stat.rx_duration = 0.0
+        self.stat.rx_concealed = 0
+        self.stat.rx_first_audio = None
+
+    def switch_mode(
+            self,
+            mode: VocoderMode,
+    ):
+        self.mode = mode
+        self.engine.vocoder(mode)
+        self.stat.rx_mode = mode
+
+    def close(self):
+        self.stream_id = None
+        self.start_time = None
+        self.fec.reset(0, False)
+        self.concealer.reset()
+        self.jitter.reset()
+        self.stat.rx_stream = None
+
+    def heard(
+            self,
+            now: float,
+    ):
+        self.last_time = now
+        self.stat.rx_packets += 1
+        self.stat.rx_duration = now - self.start_time
+
+    def decode(
+            self,
+            blocks: list[bytes | memoryview | None],
+    ) -> np.ndarray | None:
+        # frame blocks of one FEC release, None - lost packet
+        parts = [None if block is None else list(unpack_frames(block, self.mode)) for block in blocks]
+        if all(part is None for part in parts):
+            parts = [[None] * self._packet_frames for _ in parts]
+        else:
+            self._packet_frames = max(len(part) for part in parts if part is not None)
+
+        frames = deinterleave(parts)
+        if not frames:
+            return None
+        # one array per packet, decoded in place: the jitter buffer keeps it until playout
+        spf = self.mode.samples_per_frame
+        samples = np.empty(len(frames) * spf, dtype=np.int16)
+        start = 0
+        for lost, run in groupby(frames, key=lambda frame: frame is None):
+            run = list(run)
+            out = samples[start:start + len(run) * spf]
+            if lost:
+                out[:] = self.concealer.conceal(len(out))
+                self.stat.rx_concealed += len(run)
+            else:
+                self.engine.decode(self.mode, run, out=out)
+                self.concealer.observe(out)
+            start += len(out)
+        return samples
+
+    def released(
+            self,
+            samples: list[np.ndarray],
+            now: float,
+    ) -> list[np.ndarray]:
+        if samples and self.start_time is not None and self.stat.rx_first_audio is None:
+            self.stat.rx_first_audio = now - self.start_time
+        return samples
+
+    def update_stat(self):
+        self.stat.rx_lost = self.fec.lost
+        self.stat.rx_recovered = self.fec.recovered
+        self.stat.rx_jitter = self.jitter.jitter
+        self.stat.rx_playout_delay = self.jitter.delay
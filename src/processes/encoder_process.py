@@ -1,114 +1,511 @@
+import math
+import random
+from collections import deque
 from dataclasses import dataclass
+from queue import Empty
 
-from pycodec2 import Codec2
+import numpy as np
 
-from codec.jobs import StopJob, PacketKind, SendJob, TaskRole
+from codec.bitpack import pack_frames
+from codec.engine import CodecEngine
+from codec.jobs import StopJob, PacketKind, ResetJob, SendJob, TaskRole, StreamFrameJob
 from codec.modes import VocoderMode
+from codec.reframer import Reframer
+from codec.vad import VoiceDetector
 from processes.base_process import BaseProcess, BaseProcessStat
-from processes.packet import encode_stream_start, encode_stream_frame, encode_stream_stop
-from utils import timestamp_now
+from processes.fec import FecEncoder, interleave
+from processes.packet import (
+    SEQ_MODULO,
+    STREAM_IDS,
+    encode_stream_frame,
+    encode_stream_frame_body,
+    encode_stream_mode,
+    encode_stream_parity,
+    encode_stream_silence,
+    encode_stream_start,
+    encode_stream_stop,
+)
+from processes.packetizer import Packetizer, packet_size
+from processes.rate_controller import RateController
+from processes.serial_process import SerialProcessStat
+from processes.stats import StatLayout
+from utils import timestamp_now, queue_get_non_blocking
 
 
 @dataclass
 class EncoderProcessStat(BaseProcessStat):
     tx_packets: int
+    tx_codec_fps: float | None
+    tx_start_latency: float | None
+    tx_chunks: int | None
+    tx_deadline_flushes: int
+    tx_parity: int
+    tx_mode: VocoderMode | None
+    tx_mode_switches: int
+    tx_mode_time: dict[VocoderMode, float]
+    tx_dtx_frames: int
+    tx_dtx_saved: float
 
 
 class EncoderProcess(BaseProcess):
+    STAT = EncoderProcessStat
 
     def _init(self):
         self._stat = EncoderProcessStat(
             role=self._role,
             tx_packets=0,
+            tx_codec_fps=None,
+            tx_start_latency=None,
+            tx_chunks=None,
+            tx_deadline_flushes=0,
+            tx_parity=0,
+            tx_mode=None,
+            tx_mode_switches=0,
+            tx_mode_time={},
+            tx_dtx_frames=0,
+            tx_dtx_saved=0.0,
         )
+        self._engine = CodecEngine()
+        self._reframer = Reframer()
+
+        fec_config = self._config.fec
+        self._fec = FecEncoder(fec_config.group) if fec_config.group else None
+        # with interleaving, frames are held for the whole FEC group
+        self._interleave = fec_config.interleave and fec_config.group > 1
+
+        packetizer_config = self._config.packetizer
+        self._packetizer = Packetizer(
+            air_rate=self._config.serial.air_rate,
+            modem_buffer=self._config.serial.modem_buffer,
+            sound_rate=self._config.vocoder.sound_rate,
+            latency_budget=packetizer_config.latency_budget,
+            utilization=packetizer_config.utilization,
+            fec_group=fec_config.group,
+        ) if packetizer_config.adaptive else None
+
+        rate_config = self._config.rate
+        self._rate = RateController(
+            min_mode=rate_config.min_mode,
+            max_mode=rate_config.max_mode,
+            air_rate=self._config.serial.air_rate,
+            modem_buffer=self._config.serial.modem_buffer,
+            sound_rate=self._config.vocoder.sound_rate,
+            latency_budget=packetizer_config.latency_budget,
+            utilization=packetizer_config.utilization,
+            hold=rate_config.hold,
+            fec_group=fec_config.group,
+        ) if rate_config.adaptive else None
+        self._serial_layout = StatLayout(SerialProcessStat)
+
+        dtx_config = self._config.dtx
+        self._vad = VoiceDetector(dtx_config.threshold) if dtx_config.enabled else None
+
+    def _packet_chunks(self) -> int:
+        return self._config.vocoder.chunks if self._packetizer is None else self._packetizer.chunks
+
+    def _group_packets(self) -> int:
+        return self._fec.group if self._interleave else 1
+
+    def _dtx_frames(self, mode: VocoderMode, duration: float) -> int:
+        # capped by the one-byte count of STREAM_SILENCE
+        frame_duration = mode.samples_per_frame / self._config.vocoder.sound_rate
+        return min(255, round(duration / frame_duration))
+
+    def _update_link(self) -> VocoderMode | None:
+        if self._packetizer is None and self._rate is None:
+            return None
+        if (stat := self._read_stat(TaskRole.SERIAL, self._serial_layout)) is None:
+            return None
+
+        if self._packetizer is not None:
+            self._packetizer.update(
+                writes=stat.tx_writes,
+                modem_level=stat.tx_modem_level,
+                speed=stat.tx_speed,
+            )
+        if self._rate is not None:
+            return self._rate.update(
+                now=timestamp_now(),
+                writes=stat.tx_writes,
+                modem_level=stat.tx_modem_level,
+                pacing_delay=stat.tx_pacing_delay,
+                speed=stat.tx_speed,
+                capacity=None if self._packetizer is None else self._packetizer.capacity,
+            )
+        return None
 
     def _run(self):
         serial_queue = self._queues[TaskRole.SERIAL]
         encoder_queue = self._queues[TaskRole.ENCODER]
+        encoder_ring, = self._rings.get(TaskRole.ENCODER, [None])
+        if encoder_ring is not None:
+            # restarted by supervise: stale samples are dropped by the reader side of the ring
+            encoder_ring.clear()
 
         buffer = bytearray()
-        vocoder: Codec2 = None
         tx_test = False
         tx_mode: VocoderMode = None
         start_time: float = None
+        ptt_time: float | None = None
         chunks = 0
+        pending_time: float | None = None
+        mode_time: float | None = None
         packet_index = 0
+        seq = 0
+        # random first id, so streams differ across transmitter restarts
+        stream_id = random.randrange(STREAM_IDS)
+        # delayed packets: (due, job)
+        outbox: deque[tuple[float, SendJob]] = deque()
+        # parity goes after the next frame packet, not in one air packet with its group
+        parity: tuple[int, int, int, bytes] | None = None
+        silent = False
+        silence = 0
+
+        def post(job: SendJob, due: float = 0.0):
+            if not outbox and due <= timestamp_now():
+                serial_queue.put(job)
+            else:
+                outbox.append((due, job))
+
+        def release_outbox():
+            now = timestamp_now()
+            while outbox and outbox[0][0] <= now:
+                serial_queue.put(outbox.popleft()[1])
 
         def send_stream_start():
             packet = encode_stream_start(
                 test=tx_test,
+                stream_id=stream_id,
                 mode=tx_mode,
+                fec_group=0 if self._fec is None else self._fec.group,
+                fec_interleave=self._interleave,
             )
-            serial_queue.put(SendJob(
-                kind=kind,
+            post(SendJob(
+                kind=PacketKind.STREAM_START,
                 data=packet,
             ))
 
-        def send_stream_frame():
-            nonlocal packet_index, chunks
+        def send_stream_frame(frames: list[bytes], due: float = 0.0):
+            nonlocal packet_index, seq, parity
 
             packet_index += 1
-            packet = encode_stream_frame(
+            body = encode_stream_frame_body(
                 test=tx_test,
-                data=bytes(buffer),
+                data=pack_frames(b''.join(frames), tx_mode),
                 duration=timestamp_now() - start_time,
                 packet_index=packet_index,
             )
-            serial_queue.put(SendJob(
-                kind=kind,
+            packet = encode_stream_frame(
+                test=tx_test,
+                stream_id=stream_id,
+                mode=tx_mode,
+                seq=seq,
+                body=body,
+                interleave=self._interleave,
+            )
+            post(SendJob(
+                kind=PacketKind.STREAM_FRAME,
+                data=packet,
+            ), due)
+            self._stat.tx_packets += 1
+
+            if parity is not None:
+                send_stream_parity(parity, due)
+                parity = None
+            if self._fec is not None:
+                parity = self._fec.add(seq, body)
+            seq = (seq + 1) % SEQ_MODULO
+
+        def send_stream_parity(group: tuple[int, int, int, bytes], due: float = 0.0):
+            first_seq, count, size_xor, body_xor = group
+            packet = encode_stream_parity(
+                test=tx_test,
+                stream_id=stream_id,
+                mode=tx_mode,
+                first_seq=first_seq,
+                count=count,
+                size_xor=size_xor,
+                body_xor=body_xor,
+            )
+            post(SendJob(
+                kind=PacketKind.STREAM_PARITY,
+                data=packet,
+            ), due)
+            self._stat.tx_packets += 1
+            self._stat.tx_parity += 1
+
+        def send_frames(count: int, packets: int = 1):
+            # spread the group in time, otherwise the modem sends it as one air packet
+            nonlocal chunks, pending_time
+
+            size = tx_mode.encoded_len
+            frames = [bytes(buffer[i * size:(i + 1) * size]) for i in range(count)]
+            now = timestamp_now()
+            period = count / packets * tx_mode.samples_per_frame / self._config.vocoder.sound_rate
+            for i, part in enumerate(interleave(frames, packets)):
+                send_stream_frame(part, now + i * period)
+
+            del buffer[:count * size]
+            chunks -= count
+            pending_time = timestamp_now() if chunks else None
+
+        def send_stream_silence(count: int):
+            packet = encode_stream_silence(
+                test=tx_test,
+                stream_id=stream_id,
+                mode=tx_mode,
+                count=count,
+                level=self._vad.noise_level,
+            )
+            post(SendJob(
+                kind=PacketKind.STREAM_SILENCE,
                 data=packet,
             ))
+            self._stat.tx_packets += 1
+            self._stat.tx_dtx_frames += count
+
+            packet_chunks = self._packet_chunks()
+            fec_group = 0 if self._fec is None else self._fec.group
+            saved = count * packet_size(tx_mode, packet_chunks, tx_test, fec_group) / packet_chunks - len(packet)
+            self._stat.tx_dtx_saved += max(0.0, saved) * 8 / self._config.serial.air_rate
 
-            buffer.clear()
-            chunks = 0
+        def flush_silence():
+            nonlocal silence
+
+            if silence:
+                send_stream_silence(silence)
+                silence = 0
+
+        def flush_frames():
+            # pending silence goes first
+            nonlocal parity
+
+            flush_silence()
+            if chunks:
+                packets = math.ceil(chunks / self._packet_chunks()) if self._interleave else 1
+                send_frames(chunks, packets)
+            if parity is not None:
+                send_stream_parity(parity)
+                parity = None
+            if self._fec is not None and (group := self._fec.flush()) is not None:
+                send_stream_parity(group)
+
+        def encode_speech(samples: np.ndarray):
+            nonlocal ptt_time, chunks, pending_time
+
+            encoded = self._engine.encode(tx_mode, samples)
+            if ptt_time is not None and encoded:
+                self._stat.tx_start_latency = timestamp_now() - ptt_time
+                ptt_time = None
+            buffer.extend(encoded)
+            if not chunks and encoded:
+                pending_time = timestamp_now()
+            chunks += len(encoded) // tx_mode.encoded_len
+
+            packet_chunks = self._packet_chunks()
+            packets = self._group_packets()
+            while chunks >= packet_chunks * packets:
+                send_frames(packet_chunks * packets, packets)
+            self._stat.tx_chunks = packet_chunks
+            self._stat.tx_codec_fps = self._engine.encode_fps(tx_mode)
+
+        def encode(samples: np.ndarray):
+            nonlocal silent, silence
+
+            if self._vad is None:
+                encode_speech(samples)
+                return
+
+            spf = tx_mode.samples_per_frame
+            speech = self._vad.detect(samples.reshape(-1, spf))
+            sid_frames = max(1, self._dtx_frames(tx_mode, self._config.dtx.sid_interval))
+            start = 0
+            for end in range(1, len(speech) + 1):
+                if end < len(speech) and speech[end] == speech[start]:
+                    continue
+                if speech[start]:
+                    flush_silence()
+                    silent = False
+                    encode_speech(samples[start * spf:end * spf])
+                else:
+                    if not silent:
+                        flush_frames()
+                        silent = True
+                    silence += end - start
+                    while silence >= sid_frames:
+                        send_stream_silence(sid_frames)
+                        silence -= sid_frames
+                start = end
+
+        def flush_deadline():
+            if self._packetizer is None or pending_time is None:
+                return
+            if timestamp_now() - pending_time >= self._packetizer.deadline(self._group_packets()):
+                if self._interleave:
+                    flush_frames()
+                else:
+                    send_frames(chunks)
+                self._stat.tx_deadline_flushes += 1
+
+        def account_mode_time():
+            nonlocal mode_time
+
+            now = timestamp_now()
+            if mode_time is not None:
+                self._stat.tx_mode_time[tx_mode] = self._stat.tx_mode_time.get(tx_mode, 0.0) + now - mode_time
+            mode_time = now
+
+        def switch_mode(mode: VocoderMode):
+            nonlocal tx_mode
+
+            # frames of the old mode go in their own packet and close the FEC group
+            flush_frames()
+            account_mode_time()
+
+            tx_mode = mode
+            self._reframer.resize(tx_mode.samples_per_frame)
+            if self._vad is not None:
+                self._vad.reset(self._dtx_frames(tx_mode, self._config.dtx.hangover))
+            if self._packetizer is not None:
+                self._packetizer.reset(tx_mode, tx_test)
+
+            packet = encode_stream_mode(
+                test=tx_test,
+                stream_id=stream_id,
+                mode=tx_mode,
+            )
+            post(SendJob(
+                kind=PacketKind.STREAM_MODE,
+                data=packet,
+            ))
+            self._stat.tx_packets += 1
+            self._stat.tx_mode = tx_mode
+            self._stat.tx_mode_switches += 1
+            self._logger.info('vocoder: {blue}%s{reset} bps', tx_mode.rate)
 
         def send_stream_stop():
             packet = encode_stream_stop(
                 test=tx_test,
+                stream_id=stream_id,
+                mode=tx_mode,
                 duration=timestamp_now() - start_time,
             )
-            serial_queue.put(SendJob(
-                kind=kind,
+            post(SendJob(
+                kind=PacketKind.STREAM_STOP,
                 data=packet,
             ))
 
+        def next_job():
+            now = timestamp_now()
+            timeouts = [outbox[0][0] - now] if outbox else []
+            if self._packetizer is not None and pending_time is not None:
+                timeouts.append(pending_time + self._packetizer.deadline(self._group_packets()) - now)
+            timeout = max(0.0, min(timeouts)) if timeouts else None
+            try:
+                job = encoder_queue.get(block=True, timeout=timeout)
+            except Empty:
+                return None, None
+            if not isinstance(job, StreamFrameJob):
+                return job, None
+
+            frames = [job.frame]
+            while isinstance(job := queue_get_non_blocking(encoder_queue), StreamFrameJob):
+                frames.append(job.frame)
+
+            if encoder_ring is not None:
+                frames = [frame for frame in frames if frame is not None]
+                frames.append(encoder_ring.read())
+            return job, frames
+
         while True:
-            job = encoder_queue.get(block=True)
+            job, frames = next_job()
+
+            if frames:
+                if tx_mode is None or start_time is None:
+                    self._logger.debug('frames outside of stream dropped')
+                else:
+                    if (mode := self._update_link()) is not None:
+                        switch_mode(mode)
+                    for frame in frames:
+                        for samples in self._reframer.feed(frame):
+                            encode(samples)
+
+            flush_deadline()
+            release_outbox()
+
+            if job is None:
+                self._send_stat()
+                continue
+
             if isinstance(job, StopJob):
+                # delayed packets, including a final STREAM_STOP, are not held back on shutdown
+                while outbox:
+                    serial_queue.put(outbox.popleft()[1])
                 break
 
+            if isinstance(job, ResetJob):
+                tx_mode = None
+                start_time = None
+                ptt_time = None
+                mode_time = None
+                buffer.clear()
+                self._reframer.reset()
+                if encoder_ring is not None:
+                    encoder_ring.clear()
+                chunks = 0
+                pending_time = None
+                outbox.clear()
+                parity = None
+                silent = False
+                silence = 0
+                continue
+
             kind = PacketKind.from_job(job)
             match kind:
 
                 case PacketKind.STREAM_START:
+                    stream_id = (stream_id + 1) % STREAM_IDS
                     tx_mode = job.mode
                     tx_test = job.test
-                    vocoder = Codec2(tx_mode.rate)
+                    if self._rate is not None:
+                        tx_mode = self._rate.reset(tx_mode, tx_test, timestamp_now())
+                    buffer.clear()
+                    self._reframer.reset(tx_mode.samples_per_frame)
+                    # keep the ring: the recorder may already be writing this stream's preroll
+                    chunks = 0
+                    pending_time = None
                     packet_index = 0
+                    seq = 0
+                    parity = None
+                    if self._fec is not None:
+                        self._fec.reset()
+                    silent = False
+                    silence = 0
+                    if self._vad is not None:
+                        self._vad.reset(self._dtx_frames(tx_mode, self._config.dtx.hangover))
                     start_time = timestamp_now()
+                    ptt_time = job.timestamp
+                    if self._packetizer is not None:
+                        self._packetizer.reset(tx_mode, tx_test)
+                    mode_time = timestamp_now()
+                    self._stat.tx_mode = tx_mode
 
                     send_stream_start()
                     self._stat.tx_packets += 1
 
-                case PacketKind.STREAM_FRAME:
-
-                    if vocoder is None or tx_mode is None or start_time is None:
-                        self._logger.warning('mode not defined')
-                    else:
-                        encoded: bytes = vocoder.encode(job.frame)
-                        buffer.extend(encoded)
-                        chunks += 1
-                        if chunks >= self._config.vocoder.chunks:
-                            send_stream_frame()
-                            self._stat.tx_packets += 1
-
                 case PacketKind.STREAM_STOP:
+                    if start_time is None:
+                        continue
 
-                    if len(buffer):
-                        send_stream_frame()
-                        self._stat.tx_packets += 1
+                    if (samples := self._reframer.flush()) is not None:
+                        encode(samples)
+                    flush_frames()
 
                     send_stream_stop()
                     self._stat.tx_packets += 1
+                    account_mode_time()
+                    mode_time = None
+                    start_time = None
+                    ptt_time = None
 
             self._send_stat()
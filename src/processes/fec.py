@@ -0,0 +1,202 @@
+import numpy as np
+
+from processes.packet import SEQ_MODULO
+
+# seqs more than half the circle ahead are in the past
+SEQ_WINDOW = SEQ_MODULO // 2
+
+
+def xor_bodies(
+        bodies: list[bytes],
+) -> tuple[int, bytes]:
+    acc = np.zeros(max(len(body) for body in bodies), dtype=np.uint8)
+    size_xor = 0
+    for body in bodies:
+        acc[:len(body)] ^= np.frombuffer(body, dtype=np.uint8)
+        size_xor ^= len(body)
+    return size_xor, acc.tobytes()
+
+
+def interleave(
+        frames: list,
+        packets: int,
+) -> list[list]:
+    # frame i goes to packet i % packets
+    return [frames[j::packets] for j in range(packets)]
+
+
+def deinterleave(
+        parts: list[list | None],
+) -> list:
+    # frames of a lost packet are None, its size is taken as the largest in the group
+    size = max((len(part) for part in parts if part is not None), default=0)
+    parts = [[None] * size if part is None else part for part in parts]
+    frames = []
+    for i in range(size):
+        for part in parts:
+            if i < len(part):
+                frames.append(part[i])
+    return frames
+
+
+class FecEncoder:
+
+    def __init__(
+            self,
+            group: int,
+    ):
+        self.group = group
+        self._bodies: list[bytes] = []
+        self._first_seq = 0
+
+    def reset(self):
+        self._bodies.clear()
+
+    def add(
+            self,
+            seq: int,
+            body: bytes,
+    ) -> tuple[int, int, int, bytes] | None:
+        if not self._bodies:
+            self._first_seq = seq
+        self._bodies.append(body)
+        if len(self._bodies) < self.group:
+            return None
+        return self.flush()
+
+    def flush(self) -> tuple[int, int, int, bytes] | None:
+        if not self._bodies:
+            return None
+        size_xor, body_xor = xor_bodies(self._bodies)
+        parity = (self._first_seq, len(self._bodies), size_xor, body_xor)
+        self._bodies.clear()
+        return parity
+
+
+class FecDecoder:
+    # releases frame packets in seq order, each release is a list of groups of bodies,
+    # None for a lost packet; a gap holds later packets until its parity arrives or is lost
+
+    def __init__(self):
+        self._bodies: dict[int, bytes] = {}
+        self.reset(0, False)
+
+    def reset(
+            self,
+            group: int,
+            interleave: bool,
+            next_seq: int | None = 0,
+    ):
+        # next_seq None - late join, counting from the first packet heard;
+        # group 0 with interleave - late join into an interleaved stream, frames wait for the first parity
+        self.group = group
+        self.interleave = interleave and group > 1
+        self._joining = interleave and not group
+        self.recovered = 0
+        self.lost = 0
+        self._bodies.clear()
+        self._next = next_seq
+        self._resolved: int | None = None
+
+    def _ahead(self, seq: int) -> int:
+        return (seq - self._next) % SEQ_MODULO
+
+    def _pending(self, seq: int) -> bool:
+        return self._ahead(seq) < SEQ_WINDOW
+
+    def push_frame(
+            self,
+            seq: int,
+            body: bytes | memoryview,
+    ) -> list[list[bytes | None]]:
+        if self._joining:
+            self._bodies[seq] = bytes(body)
+            return []
+        if self._next is None:
+            self._next = seq
+        if not self._pending(seq) or seq in self._bodies:
+            # late or duplicate
+            return []
+        self._bodies[seq] = bytes(body)
+        return self._release()
+
+    def push_parity(
+            self,
+            first_seq: int,
+            count: int,
+            size_xor: int,
+            body_xor: bytes | memoryview,
+    ) -> list[list[bytes | None]]:
+        seqs = [(first_seq + i) % SEQ_MODULO for i in range(count)]
+        if self._joining:
+            # play from the next group on, earlier frames are dropped
+            self._joining = False
+            self.group = count
+            self.interleave = count > 1
+            self._next = (first_seq + count) % SEQ_MODULO
+            for seq in [seq for seq in self._bodies if not self._pending(seq)]:
+                del self._bodies[seq]
+            return self._release()
+        if not self.group:
+            # late join: recover from the first parity on
+            self.group = count
+        if self._next is None or not self._pending(seqs[-1]):
+            return []
+
+        missing = [seq for seq in seqs if seq not in self._bodies]
+        if len(missing) == 1 and self._pending(seq := missing[0]):
+            others = [self._bodies[s] for s in seqs if s != seq]
+            acc = np.frombuffer(body_xor, dtype=np.uint8).copy()
+            for body in others:
+                acc[:len(body)] ^= np.frombuffer(body, dtype=np.uint8)
+                size_xor ^= len(body)
+            self._bodies[seq] = acc[:size_xor].tobytes()
+            self.recovered += 1
+
+        self._resolved = (seqs[-1] + 1) % SEQ_MODULO
+        return self._release()
+
+    def flush(self) -> list[list[bytes | None]]:
+        if self._next is None:
+            return []
+        pending = [self._ahead(seq) for seq in self._bodies if self._pending(seq)]
+        if not pending:
+            return []
+        self._resolved = (self._next + max(pending) + 1) % SEQ_MODULO
+        return self._release()
+
+    def _resolved_count(self) -> int:
+        if self._resolved is None:
+            return 0
+        return self._ahead(self._resolved)
+
+    def _release(self) -> list[list[bytes | None]]:
+        groups = []
+        while True:
+            resolved = self._resolved_count()
+            pending = [self._ahead(seq) for seq in self._bodies if self._pending(seq)]
+            # parity follows the first packet of the next group, anything later means it was lost
+            give_up = bool(pending) and max(pending) > self.group
+
+            if self.interleave:
+                size = min(resolved, self.group) if resolved else self.group
+                complete = all((self._next + i) % SEQ_MODULO in self._bodies for i in range(size))
+                if not (resolved or complete or give_up):
+                    break
+            else:
+                size = 1
+                if not (resolved or self._next in self._bodies or give_up):
+                    break
+
+            group = []
+            for _ in range(size):
+                body = self._bodies.get(self._next)
+                if body is None:
+                    self.lost += 1
+                group.append(body)
+                self._bodies.pop((self._next - SEQ_WINDOW) % SEQ_MODULO, None)
+                self._next = (self._next + 1) % SEQ_MODULO
+                if self._next == self._resolved:
+                    self._resolved = None
+            groups.append(group)
+        return groups
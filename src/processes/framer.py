@@ -0,0 +1,91 @@
+from typing import Iterator
+
+from processes.packet import SYNC_WORD, HEADER_SIZE, CRC_SIZE, crc8
+
+
+class Framer:
+    # incremental parser over a fixed buffer: the header search resumes where it stopped,
+    # garbage is dropped at once and a CRC error resumes from the next byte
+
+    CAPACITY = 4 * 1024
+
+    def __init__(
+            self,
+            capacity: int = CAPACITY,
+    ):
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+        self.dropped = 0
+        self.bad = 0
+
+    def reset(self):
+        self._start = 0
+        self._end = 0
+
+    def feed(
+            self,
+            data: bytes,
+    ) -> Iterator[memoryview]:
+        # payloads are memoryviews into the buffer, valid until the next iteration
+        data = memoryview(data)
+        while len(data):
+            capacity = len(self._buffer)
+            if self._end + len(data) > capacity and self._start:
+                self._compact()
+
+            n = min(len(data), capacity - self._end)
+            self._buffer[self._end: self._end + n] = data[:n]
+            self._end += n
+            data = data[n:]
+
+            yield from self._yield_payloads()
+
+    def _compact(self):
+        size = self._end - self._start
+        self._buffer[:size] = self._buffer[self._start: self._end]
+        self._start = 0
+        self._end = size
+
+    def _yield_payloads(self):
+        buffer = self._buffer
+        view = self._view
+        start = self._start
+        end = self._end
+        while True:
+
+            # --- header ---
+
+            index = buffer.find(SYNC_WORD, start, end)
+            if index < 0:
+                # no packet header, keep only possible header prefix
+                keep = max(start, end - len(SYNC_WORD) + 1)
+                self.dropped += keep - start
+                start = keep
+                break
+            self.dropped += index - start
+            start = index
+
+            # --- payload size ---
+
+            if index + HEADER_SIZE > end:
+                # no enough for payload size
+                break
+            payload_end = index + HEADER_SIZE + buffer[index + HEADER_SIZE - 1]
+
+            # --- payload and crc ---
+
+            if payload_end + CRC_SIZE > end:
+                # no enough for payload
+                break
+            if crc8(view[index: payload_end]) != buffer[payload_end]:
+                self.bad += 1
+                self.dropped += 1
+                start = index + 1
+                continue
+
+            start = self._start = payload_end + CRC_SIZE
+            yield view[index + HEADER_SIZE: payload_end]
+        self._start = start
@@ -0,0 +1,44 @@
+import time
+
+
+class TokenBucket:
+    # a token is a free byte in the modem buffer, which drains at the air rate
+
+    def __init__(
+            self,
+            rate: float,  # bytes/s
+            capacity: int,  # bytes
+    ):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._time = time.perf_counter()
+
+    def reset(self):
+        self._tokens = float(self._capacity)
+        self._time = time.perf_counter()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def level(self) -> float:
+        # estimated modem buffer fill, bytes
+        self._refill()
+        return self._capacity - self._tokens
+
+    def _refill(self):
+        now = time.perf_counter()
+        self._tokens = min(self._capacity, self._tokens + (now - self._time) * self._rate)
+        self._time = now
+
+    def delay(self, size: int) -> float:
+        # a block larger than the buffer waits for it to drain completely
+        self._refill()
+        need = min(size, self._capacity) - self._tokens
+        return need / self._rate if need > 0 else 0.0
+
+    def consume(self, size: int):
+        self._refill()
+        self._tokens -= size
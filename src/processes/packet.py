@@ -1,9 +1,17 @@
 import struct
+import zlib
 
 from codec.jobs import PacketKind
 from codec.modes import VocoderMode
 
-MAGIC_WORD = 'PaCkEt'.encode()
+# SYNC_WORD | payload size | payload | low byte of CRC-32 over all of them
+# wire version in the low bits of the second sync byte
+WIRE_VERSION = 6
+SYNC_WORD = bytes((0xA5, 0x50 | WIRE_VERSION))
+HEADER_SIZE = len(SYNC_WORD) + 1
+CRC_SIZE = 1
+PACKET_OVERHEAD = HEADER_SIZE + CRC_SIZE
+MAX_PAYLOAD_SIZE = 255
 
 DURATION_FORMAT = 'f'
 DURATION_SIZE = struct.calcsize(DURATION_FORMAT)
@@ -11,66 +19,197 @@ DURATION_SIZE = struct.calcsize(DURATION_FORMAT)
 INDEX_FORMAT = 'i'
 INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
 
+SEQ_SIZE = 1
+SEQ_MODULO = 256
+
+# stream tag: stream id in the high bits, vocoder mode code in the low bits
+TAG_SIZE = 1
+MODE_BITS = 3
+STREAM_IDS = 1 << (8 - MODE_BITS)
+
+# STREAM_START FEC byte: group size, high bit - interleaving
+FEC_INTERLEAVE = 1 << 7
+
+# flags, tag, first seq, count, size xor
+PARITY_HEADER_SIZE = 5
+# so that a parity packet still fits the payload
+MAX_FRAME_BODY_SIZE = MAX_PAYLOAD_SIZE - PARITY_HEADER_SIZE
+
 
 class Flags:
     TEST = 1 << 7
+    # STREAM_FRAME of an interleaved stream: late joiners must not play frames in packet order
+    INTERLEAVE = 1 << 6
+
+
+def crc8(
+        data: bytes | memoryview,
+):
+    # low byte of CRC-32: zlib runs over the whole buffer in C
+    return zlib.crc32(data) & 0xff
+
+
+def encode_tag(
+        stream_id: int,
+        mode: VocoderMode,
+):
+    return (stream_id % STREAM_IDS) << MODE_BITS | mode.value
+
+
+def decode_tag(
+        tag: int,
+):
+    mode = VocoderMode.from_code(tag & ((1 << MODE_BITS) - 1))
+    if mode is None:
+        raise ValueError(f'unknown vocoder mode: {tag & ((1 << MODE_BITS) - 1)}')
+    return tag >> MODE_BITS, mode
 
 
 def encode_payload(
         payload: bytes | None,
 ):
     payload = payload or []
-    assert len(payload) < 256, 'max 256 payload'
+    assert len(payload) <= MAX_PAYLOAD_SIZE, f'max {MAX_PAYLOAD_SIZE} payload'
     payload_size = len(payload)
     buffer = bytearray()
 
-    buffer.extend(MAGIC_WORD)
+    buffer.extend(SYNC_WORD)
     buffer.append(payload_size)
     buffer.extend(payload)
+    buffer.append(crc8(buffer))
 
     return bytes(buffer)
 
 
 def encode_stream_start(
         test: bool,
+        stream_id: int,
         mode: VocoderMode,
+        fec_group: int = 0,
+        fec_interleave: bool = False,
 ):
     payload = bytearray()
 
     flags = PacketKind.STREAM_START.value | (Flags.TEST if test else 0)
     payload.append(flags)
 
-    payload.append(mode.value)
+    payload.append(encode_tag(stream_id, mode))
+
+    payload.append(fec_group | (FEC_INTERLEAVE if fec_interleave else 0))
 
     return encode_payload(payload)
 
 
-def encode_stream_frame(
+def encode_stream_frame_body(
         test: bool,
         data: bytes,
         duration: float,
         packet_index: int | None,
 ):
-    payload = bytearray()
-
-    flags = PacketKind.STREAM_FRAME.value | (Flags.TEST if test else 0)
-    payload.append(flags)
+    body = bytearray()
 
     if test:
-        payload.extend(struct.pack(DURATION_FORMAT, duration))
-        payload.extend(struct.pack(INDEX_FORMAT, packet_index))
+        body.extend(struct.pack(DURATION_FORMAT, duration))
+        body.extend(struct.pack(INDEX_FORMAT, packet_index))
 
         if (pad_len := len(data) - (DURATION_SIZE + INDEX_SIZE)) > 0:
-            payload.extend([0] * pad_len)
+            body.extend([0] * pad_len)
 
     else:
-        payload.extend(data)
+        body.extend(data)
+
+    return bytes(body)
+
+
+def encode_stream_frame(
+        test: bool,
+        stream_id: int,
+        mode: VocoderMode,
+        seq: int,
+        body: bytes,
+        interleave: bool = False,
+):
+    assert len(body) <= MAX_FRAME_BODY_SIZE, f'max {MAX_FRAME_BODY_SIZE} frame body'
+    payload = bytearray()
+
+    flags = PacketKind.STREAM_FRAME.value | (Flags.TEST if test else 0) | (Flags.INTERLEAVE if interleave else 0)
+    payload.append(flags)
+
+    payload.append(encode_tag(stream_id, mode))
+
+    payload.append(seq % SEQ_MODULO)
+
+    payload.extend(body)
+
+    return encode_payload(payload)
+
+
+def encode_stream_parity(
+        test: bool,
+        stream_id: int,
+        mode: VocoderMode,
+        first_seq: int,
+        count: int,
+        size_xor: int,
+        body_xor: bytes,
+):
+    payload = bytearray()
+
+    flags = PacketKind.STREAM_PARITY.value | (Flags.TEST if test else 0)
+    payload.append(flags)
+
+    payload.append(encode_tag(stream_id, mode))
+
+    payload.append(first_seq % SEQ_MODULO)
+    payload.append(count)
+    payload.append(size_xor)
+
+    payload.extend(body_xor)
+
+    return encode_payload(payload)
+
+
+def encode_stream_mode(
+        test: bool,
+        stream_id: int,
+        mode: VocoderMode,
+):
+    payload = bytearray()
+
+    flags = PacketKind.STREAM_MODE.value | (Flags.TEST if test else 0)
+    payload.append(flags)
+
+    payload.append(encode_tag(stream_id, mode))
+
+    return encode_payload(payload)
+
+
+def encode_stream_silence(
+        test: bool,
+        stream_id: int,
+        mode: VocoderMode,
+        count: int,
+        level: float,
+):
+    # level - dBFS
+    payload = bytearray()
+
+    flags = PacketKind.STREAM_SILENCE.value | (Flags.TEST if test else 0)
+    payload.append(flags)
+
+    payload.append(encode_tag(stream_id, mode))
+
+    payload.append(count)
+
+    payload.append(min(255, max(0, round(-level))))
 
     return encode_payload(payload)
 
 
 def encode_stream_stop(
         test: bool,
+        stream_id: int,
+        mode: VocoderMode,
         duration: float,
 ):
     payload = bytearray()
@@ -78,6 +217,8 @@ def encode_stream_stop(
     flags = PacketKind.STREAM_STOP.value | (Flags.TEST if test else 0)
     payload.append(flags)
 
+    payload.append(encode_tag(stream_id, mode))
+
     if test:
         payload.extend(struct.pack(DURATION_FORMAT, duration))
     else:
@@ -87,7 +228,17 @@ def encode_stream_stop(
 
 
 def decode_payload(
-        payload: bytes,
+        payload: bytes | memoryview,
+):
+    # malformed payloads raise ValueError
+    try:
+        return _decode_payload(payload)
+    except (IndexError, struct.error) as ex:
+        raise ValueError(f'truncated payload: {ex}') from ex
+
+
+def _decode_payload(
+        payload: bytes | memoryview,
 ):
     index = 0
 
@@ -95,40 +246,75 @@ def decode_payload(
 
     flags = payload[index]
     test = bool(Flags.TEST & flags)
-    kind = flags & (Flags.TEST - 1)
+    interleave = bool(Flags.INTERLEAVE & flags)
+    kind = flags & (Flags.INTERLEAVE - 1)
     kind = PacketKind(kind)
     index += 1
 
     match kind:
-        case PacketKind.STREAM_START:
+        case PacketKind.STREAM_START | PacketKind.STREAM_MODE:
 
-            mode = payload[index]
-            mode = VocoderMode.from_code(mode)
+            stream_id, mode = decode_tag(payload[index])
             index += 1
 
-            return kind, test, (mode,)
+            if kind == PacketKind.STREAM_MODE:
+                return kind, test, (stream_id, mode)
+
+            fec = payload[index]
+            fec_group = fec & (FEC_INTERLEAVE - 1)
+            fec_interleave = bool(fec & FEC_INTERLEAVE)
+            index += 1
+
+            return kind, test, (stream_id, mode, fec_group, fec_interleave)
 
         case PacketKind.STREAM_FRAME:
 
-            if test:
-                b = payload[index: index + DURATION_SIZE]
-                duration, = struct.unpack(DURATION_FORMAT, b)
-                index += DURATION_SIZE
+            stream_id, mode = decode_tag(payload[index])
+            index += 1
 
-                b = payload[index: index + INDEX_SIZE]
-                packet_index, = struct.unpack(INDEX_FORMAT, b)
-                index += INDEX_SIZE
+            seq = payload[index]
+            index += 1
 
-                block = None
-            else:
-                block = payload[index:]
-                duration = None
-                packet_index = None
+            body = payload[index:]
+
+            return kind, test, (stream_id, mode, seq, body, interleave)
 
-            return kind, test, (block, duration, packet_index)
+        case PacketKind.STREAM_PARITY:
+
+            stream_id, mode = decode_tag(payload[index])
+            index += 1
+
+            first_seq = payload[index]
+            index += 1
+
+            count = payload[index]
+            index += 1
+
+            size_xor = payload[index]
+            index += 1
+
+            body_xor = payload[index:]
+
+            return kind, test, (stream_id, mode, first_seq, count, size_xor, body_xor)
+
+        case PacketKind.STREAM_SILENCE:
+
+            stream_id, _ = decode_tag(payload[index])
+            index += 1
+
+            count = payload[index]
+            index += 1
+
+            level = -payload[index]
+            index += 1
+
+            return kind, test, (stream_id, count, level)
 
         case PacketKind.STREAM_STOP:
 
+            stream_id, _ = decode_tag(payload[index])
+            index += 1
+
             if test:
                 b = payload[index: index + DURATION_SIZE]
                 duration, = struct.unpack(DURATION_FORMAT, b)
@@ -136,7 +322,34 @@ def decode_payload(
             else:
                 duration = None
 
-            return kind, test, (duration,)
+            return kind, test, (stream_id, duration)
 
         case _:
             raise NotImplementedError()
+
+
+def decode_stream_frame_body(
+        test: bool,
+        body: bytes | memoryview,
+):
+    index = 0
+
+    if test:
+        try:
+            b = body[index: index + DURATION_SIZE]
+            duration, = struct.unpack(DURATION_FORMAT, b)
+            index += DURATION_SIZE
+
+            b = body[index: index + INDEX_SIZE]
+            packet_index, = struct.unpack(INDEX_FORMAT, b)
+            index += INDEX_SIZE
+        except struct.error as ex:
+            raise ValueError(f'truncated frame body: {ex}') from ex
+
+        block = None
+    else:
+        block = body
+        duration = None
+        packet_index = None
+
+    return block, duration, packet_index
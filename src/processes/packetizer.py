@@ -0,0 +1,124 @@
+import math
+
+from codec.modes import VocoderMode
+from processes.packet import (
+    DURATION_SIZE, INDEX_SIZE, MAX_FRAME_BODY_SIZE, PACKET_OVERHEAD, PARITY_HEADER_SIZE, SEQ_SIZE, TAG_SIZE,
+)
+
+# flags, stream tag and seq
+FRAME_HEADER_SIZE = 1 + TAG_SIZE + SEQ_SIZE
+
+
+def max_chunks(
+        mode: VocoderMode,
+) -> int:
+    # frames are bit-packed on air (pack_frames)
+    return MAX_FRAME_BODY_SIZE * 8 // mode.bits
+
+
+def packet_size(
+        mode: VocoderMode,
+        chunks: int,
+        test: bool,
+        fec_group: int = 0,
+) -> float:
+    # air bytes per STREAM_FRAME packet including its share of FEC parity
+    size = math.ceil(chunks * mode.bits / 8)
+    if test:
+        size = max(size, DURATION_SIZE + INDEX_SIZE)
+    size = PACKET_OVERHEAD + FRAME_HEADER_SIZE + size
+    if fec_group:
+        size += (size - FRAME_HEADER_SIZE + PARITY_HEADER_SIZE) / fec_group
+    return size
+
+
+class Packetizer:
+    # the smallest packet whose stream still fits the link capacity estimate;
+    # the estimate shrinks while the modem buffer fills and recovers slowly when it drains
+
+    # modem buffer fill levels: congested above, idle below
+    HIGH_LEVEL = 0.5
+    LOW_LEVEL = 0.1
+    DECREASE = 0.9
+    INCREASE = 1.02
+    MIN_CAPACITY = 0.25
+
+    def __init__(
+            self,
+            air_rate: int,  # bit/s
+            modem_buffer: int,  # bytes
+            sound_rate: int,
+            latency_budget: float,  # seconds
+            utilization: float,
+            fec_group: int,
+    ):
+        self._max_capacity = air_rate / 8 * utilization
+        self._modem_buffer = modem_buffer
+        self._sound_rate = sound_rate
+        self._latency_budget = latency_budget
+        self._fec_group = fec_group
+
+        # bytes/s
+        self.capacity = self._max_capacity
+        self.chunks = 1
+        self._mode: VocoderMode | None = None
+        self._test = False
+        self._writes: int | None = None
+
+    def reset(
+            self,
+            mode: VocoderMode,
+            test: bool,
+    ):
+        # the link estimate survives between streams
+        self._mode = mode
+        self._test = test
+        self._choose()
+
+    def _frame_duration(self) -> float:
+        return self._mode.samples_per_frame / self._sound_rate
+
+    def _packet_size(self, chunks: int) -> float:
+        return packet_size(self._mode, chunks, self._test, self._fec_group)
+
+    def _choose(self):
+        duration = self._frame_duration()
+        limit = max_chunks(self._mode)
+        budget_chunks = min(limit, max(1, int(self._latency_budget / duration)))
+
+        for chunks in range(1, limit + 1):
+            if self._packet_size(chunks) <= self.capacity * chunks * duration:
+                self.chunks = chunks
+                return
+        # the mode does not fit at all, at least keep the latency budget
+        self.chunks = budget_chunks
+
+    def deadline(
+            self,
+            packets: int = 1,
+    ) -> float:
+        # one frame extra, so capture jitter does not split packets
+        duration = self._frame_duration()
+        return max(self._latency_budget, packets * self.chunks * duration) + duration
+
+    def update(
+            self,
+            writes: int,
+            modem_level: float | None,
+            speed: float | None,
+    ):
+        # modem level only changes on writes
+        if writes == self._writes or modem_level is None:
+            return
+        self._writes = writes
+
+        if modem_level > self._modem_buffer * self.HIGH_LEVEL:
+            capacity = min(self.capacity, speed) if speed else self.capacity
+            self.capacity = max(self._max_capacity * self.MIN_CAPACITY, capacity * self.DECREASE)
+        elif modem_level < self._modem_buffer * self.LOW_LEVEL:
+            self.capacity = min(self._max_capacity, self.capacity * self.INCREASE)
+        else:
+            return
+
+        if self._mode is not None:
+            self._choose()
@@ -1,32 +1,77 @@
-from threading import Lock
+from dataclasses import dataclass
+from queue import Empty
 
 import numpy as np
 import pyaudio
 
-from codec.jobs import StopJob, PlayJob, TaskRole
-from processes.base_process import BaseProcess
+from codec.jobs import StopJob, PlayJob, ResetJob, TaskRole
+from codec.ring import SampleRing
+from processes.base_process import BaseProcess, BaseProcessStat
 from utils import ignore_stderr
 
 
+@dataclass
+class PlayerProcessStat(BaseProcessStat):
+    play_buffered: float
+    play_underruns: int
+    play_overruns: int
+
+
 class PlayerProcess(BaseProcess):
+    STAT = PlayerProcessStat
+
+    # seconds
+    BUFFER_DURATION = 10
+    # seconds
+    STAT_INTERVAL = 0.2
+
+    def _init(self):
+        self._stat = PlayerProcessStat(
+            role=self._role,
+            play_buffered=0,
+            play_underruns=0,
+            play_overruns=0,
+        )
 
     def _run(self):
         player_queue = self._queues[TaskRole.PLAYER]
+        sound_rate = self._config.vocoder.sound_rate
 
-        samples: np.ndarray = np.array([], dtype=np.int16)
-        lock = Lock()
+        rings = self._rings.get(TaskRole.PLAYER) or [
+            SampleRing(capacity=self.BUFFER_DURATION * sound_rate)
+            for _ in range(self._config.streams.max_streams)
+        ]
+        for ring in rings:
+            # restarted by supervise: stale samples are dropped by the reader side of the ring
+            ring.clear()
+        out = np.zeros(self._config.vocoder.frames_per_buffer, dtype=np.int16)
+        part = np.zeros_like(out)
+        mix = np.zeros(len(out), dtype=np.int32)
+        # set by ResetJob, the rings are cleared on the reading side
+        reset = False
 
         def stream_callback(_in_data, frame_count, _time_info, _status):
-            nonlocal samples
+            nonlocal out, part, mix, reset
 
-            with lock:
-                frame, samples = samples[:frame_count], samples[frame_count:]
+            if reset:
+                reset = False
+                for ring in rings:
+                    ring.clear()
 
-            # underflow padding
-            if (frame_len := len(frame)) != frame_count:
-                frame = np.pad(frame, (0, frame_count - frame_len), 'constant', constant_values=0)
+            if len(out) != frame_count:
+                out = np.zeros(frame_count, dtype=np.int16)
+                part = np.zeros_like(out)
+                mix = np.zeros(frame_count, dtype=np.int32)
 
-            return frame, pyaudio.paContinue
+            # mix in int32 and saturate, no wraparound
+            mix.fill(0)
+            for ring in rings:
+                if ring.read_into(part):
+                    mix += part
+            np.clip(mix, -2**15, 2**15 - 1, out=mix)
+            out[:] = mix
+
+            return out, pyaudio.paContinue
 
         with ignore_stderr():
             audio = pyaudio.PyAudio()
@@ -34,21 +79,32 @@ class PlayerProcess(BaseProcess):
             stream = audio.open(
                 format=pyaudio.paInt16,
                 channels=1,
-                rate=self._config.vocoder.sound_rate,
+                rate=sound_rate,
                 output=True,
                 stream_callback=stream_callback,
                 frames_per_buffer=self._config.vocoder.frames_per_buffer,
             )
             try:
                 while stream.is_active():
-                    job = player_queue.get(block=True)
+                    try:
+                        job = player_queue.get(block=True, timeout=self.STAT_INTERVAL)
+                    except Empty:
+                        job = None
+
                     if isinstance(job, StopJob):
                         stream.stop_stream()
                         break
 
+                    if isinstance(job, ResetJob):
+                        reset = True
+
                     if isinstance(job, PlayJob):
-                        with lock:
-                            samples = np.concatenate([samples, job.samples])
+                        rings[job.channel].write(job.samples)
+
+                    self._stat.play_buffered = max(ring.available for ring in rings) / sound_rate
+                    self._stat.play_underruns = sum(ring.underruns for ring in rings)
+                    self._stat.play_overruns = sum(ring.overruns for ring in rings)
+                    self._send_stat()
             finally:
                 stream.close()
         finally:
@@ -0,0 +1,107 @@
+from codec.modes import VocoderMode
+from processes.packetizer import max_chunks, packet_size
+
+
+class RateController:
+    # mid-stream vocoder mode: step down on modem backlog, write waits or demand above capacity,
+    # step up when the link is idle and the next mode fits
+
+    # modem buffer fill levels: congested above, idle below
+    HIGH_LEVEL = 0.5
+    LOW_LEVEL = 0.1
+    # seconds
+    MAX_PACING_DELAY = 0.05
+    HEADROOM = 1.1
+    # let the modem drain its backlog after stepping down, seconds
+    DOWN_HOLD = 0.5
+
+    def __init__(
+            self,
+            min_mode: VocoderMode,
+            max_mode: VocoderMode,
+            air_rate: int,  # bit/s
+            modem_buffer: int,  # bytes
+            sound_rate: int,
+            latency_budget: float,  # seconds
+            utilization: float,
+            hold: float,  # seconds
+            fec_group: int,
+    ):
+        self._modes = sorted(
+            [mode for mode in VocoderMode if min_mode.rate <= mode.rate <= max_mode.rate],
+            key=lambda mode: mode.rate,
+        )
+        self._max_capacity = air_rate / 8 * utilization
+        self._modem_buffer = modem_buffer
+        self._sound_rate = sound_rate
+        self._latency_budget = latency_budget
+        self._hold = hold
+        self._fec_group = fec_group
+
+        self.mode: VocoderMode | None = None
+        self._test = False
+        self._switch_time = 0.0
+        self._writes: int | None = None
+
+    def reset(
+            self,
+            mode: VocoderMode,
+            test: bool,
+            now: float,
+    ) -> VocoderMode:
+        self.mode = min(self._modes, key=lambda m: abs(m.rate - mode.rate))
+        self._test = test
+        self._switch_time = now
+        return self.mode
+
+    def demand(
+            self,
+            mode: VocoderMode,
+    ) -> float:
+        # bytes/s with the largest packets within the latency budget
+        duration = mode.samples_per_frame / self._sound_rate
+        chunks = min(max_chunks(mode), max(1, int(self._latency_budget / duration)))
+        return packet_size(mode, chunks, self._test, self._fec_group) / (chunks * duration)
+
+    def update(
+            self,
+            now: float,
+            writes: int,
+            modem_level: float | None,
+            pacing_delay: float | None,
+            speed: float | None,
+            capacity: float | None,
+    ) -> VocoderMode | None:
+        # capacity - packetizer estimate, bytes/s; returns the new mode or None
+        if self.mode is None or writes == self._writes or modem_level is None:
+            return None
+        self._writes = writes
+
+        index = self._modes.index(self.mode)
+        elapsed = now - self._switch_time
+        capacity = capacity or self._max_capacity
+
+        congested = (
+            modem_level > self._modem_buffer * self.HIGH_LEVEL
+            or (pacing_delay or 0) > self.MAX_PACING_DELAY
+            or self.demand(self.mode) > capacity
+        )
+        if congested:
+            if index == 0 or elapsed < self.DOWN_HOLD:
+                return None
+            index -= 1
+
+        else:
+            if index == len(self._modes) - 1 or elapsed < self._hold:
+                return None
+            if modem_level > self._modem_buffer * self.LOW_LEVEL:
+                return None
+            if speed is not None and speed * self.HEADROOM < self.demand(self.mode):
+                return None
+            if self.demand(self._modes[index + 1]) * self.HEADROOM > capacity:
+                return None
+            index += 1
+
+        self.mode = self._modes[index]
+        self._switch_time = now
+        return self.mode
@@ -1,7 +1,11 @@
+import math
+from collections import deque
+from threading import Lock
+
 import numpy as np
 import pyaudio
 
-from codec.jobs import StopJob, TaskRole, StreamFrameJob, StreamStartJob, StreamStopJob
+from codec.jobs import AttachJob, DetachJob, StopJob, TaskRole, StreamFrameJob, StreamStartJob, StreamStopJob
 from processes.base_process import BaseProcess
 from utils import ignore_stderr
 
@@ -11,41 +15,87 @@ class RecorderProcess(BaseProcess):
     def _run(self):
         encoder_queue = self._queues[TaskRole.ENCODER]
         recorder_queue = self._queues[TaskRole.RECORDER]
+        encoder_ring, = self._rings.get(TaskRole.ENCODER, [None])
+        vocoder_config = self._config.vocoder
+
+        # frames captured just before PTT
+        preroll: deque[np.ndarray] = deque(maxlen=math.ceil(
+            self._config.recorder.preroll * vocoder_config.sound_rate / vocoder_config.frames_per_buffer
+        ))
+        gate = Lock()
+        streaming = False
+
+        def send_frame(frame: np.ndarray):
+            if encoder_ring is None:
+                encoder_queue.put(StreamFrameJob(
+                    frame=frame,
+                ))
+            else:
+                # samples go through shm, the queue gets a notification only
+                encoder_ring.write(frame)
+                encoder_queue.put(StreamFrameJob(
+                    frame=None,
+                ))
 
         def stream_callback(in_data, _frame_count, _time_info, _status):
             frame: np.ndarray = np.frombuffer(in_data, dtype=np.int16)
 
-            encoder_queue.put(StreamFrameJob(
-                frame=frame,
-            ))
+            with gate:
+                if streaming:
+                    send_frame(frame)
+                else:
+                    preroll.append(frame)
 
             return frame, pyaudio.paContinue
 
-        while True:
-            job = recorder_queue.get(block=True)
-            if isinstance(job, StopJob):
-                break
-
-            if isinstance(job, StreamStartJob):
-                with ignore_stderr():
-                    audio = pyaudio.PyAudio()
-                try:
-                    stream = audio.open(
-                        format=pyaudio.paInt16,
-                        channels=1,
-                        rate=self._config.vocoder.sound_rate,
-                        input=True,
-                        stream_callback=stream_callback,
-                        frames_per_buffer=self._config.vocoder.frames_per_buffer,
-                    )
-                    try:
-                        while stream.is_active():
-                            job = recorder_queue.get(block=True)
-                            if isinstance(job, (StopJob, StreamStopJob)):
-                                stream.stop_stream()
-                                break
-
-                    finally:
+        # the input stream stays open while the modem is attached, PTT only opens the gate
+        with ignore_stderr():
+            audio = pyaudio.PyAudio()
+        stream = None
+
+        def open_stream():
+            return audio.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=vocoder_config.sound_rate,
+                input=True,
+                stream_callback=stream_callback,
+                frames_per_buffer=vocoder_config.frames_per_buffer,
+            )
+
+        try:
+            while True:
+                job = recorder_queue.get(block=True)
+                if isinstance(job, StopJob):
+                    break
+
+                if isinstance(job, AttachJob):
+                    if stream is None:
+                        stream = open_stream()
+
+                elif isinstance(job, DetachJob):
+                    if stream is not None:
+                        stream.stop_stream()
                         stream.close()
-                finally:
-                    audio.terminate()
+                        stream = None
+                    with gate:
+                        streaming = False
+                        preroll.clear()
+
+                elif isinstance(job, StreamStartJob):
+                    if stream is None:
+                        stream = open_stream()
+                    with gate:
+                        for frame in preroll:
+                            send_frame(frame)
+                        preroll.clear()
+                        streaming = True
+
+                elif isinstance(job, StreamStopJob):
+                    with gate:
+                        streaming = False
+        finally:
+            if stream is not None:
+                stream.stop_stream()
+                stream.close()
+            audio.terminate()
@@ -1,10 +1,13 @@
 import time
 from dataclasses import dataclass
+from threading import Event, Lock, Thread
 
 from serial import Serial
 
-from codec.jobs import RecvJob, StopJob, SendJob, PacketKind, TaskRole
+from codec.jobs import AttachJob, DetachJob, Job, RecvJob, StopJob, SendJob, PacketKind, TaskRole
+from config import SerialEngine
 from processes.base_process import BaseProcess, BaseProcessStat
+from processes.pacing import TokenBucket
 from utils import queue_get_non_blocking, timestamp_now
 
 
@@ -15,11 +18,23 @@ class SerialProcessStat(BaseProcessStat):
     tx_duration: float | None
     tx_current: int | None
     tx_speed: float | None
+    tx_writes: int
+    tx_write_size: float | None
+    tx_queue_wait: float | None
+    tx_queue_wait_max: float | None
+    tx_pacing_delay: float | None
+    tx_overflows: int
+    tx_modem_level: float | None
 
 
 class SerialProcess(BaseProcess):
+    STAT = SerialProcessStat
+
     DELAY = 0.01
 
+    READ_TIMEOUT = 0.5
+    JOIN_TIMEOUT = 1.0
+
     def _init(self):
         self._stat = SerialProcessStat(
             role=self._role,
@@ -28,48 +43,198 @@ class SerialProcess(BaseProcess):
             tx_duration=None,
             tx_current=None,
             tx_speed=None,
+            tx_writes=0,
+            tx_write_size=None,
+            tx_queue_wait=None,
+            tx_queue_wait_max=None,
+            tx_pacing_delay=None,
+            tx_overflows=0,
+            tx_modem_level=None,
         )
+        self._tx_start_time: float = None
+        # the event engine reader thread publishes to the same slot
+        self._stat_lock = Lock()
+        self._tx_jobs = 0
+        self._tx_wait_total = 0.0
+
+        serial_config = self._config.serial
+        self._bucket: TokenBucket | None = TokenBucket(
+            rate=serial_config.air_rate / 8,
+            capacity=serial_config.modem_buffer,
+        ) if serial_config.pacing else None
 
     def _run(self):
         serial_queue = self._queues[TaskRole.SERIAL]
-        decoder_queue = self._queues[TaskRole.DECODER]
 
-        tx_start_time = None
+        while True:
+            job = serial_queue.get(block=True)
+            if isinstance(job, StopJob):
+                break
+            if not isinstance(job, AttachJob):
+                continue
+
+            try:
+                job = self._attach(job.device_node)
+            except OSError as ex:
+                self._logger.error('attach %s: %s', job.device_node, ex)
+                continue
+            if isinstance(job, StopJob):
+                break
+
+    def _attach(self, device_node: str) -> Job:
+        self._logger.debug('attach {blue}%s{reset}', device_node)
+        if self._bucket is not None:
+            self._bucket.reset()
+        try:
+            with Serial(port=device_node, timeout=self.READ_TIMEOUT) as ser:
+                match self._config.serial.engine:
+                    case SerialEngine.POLL:
+                        return self._run_poll(ser)
+                    case SerialEngine.EVENT:
+                        return self._run_event(ser)
+                    case _:
+                        raise NotImplementedError()
+        finally:
+            self._logger.debug('detach {blue}%s{reset}', device_node)
+
+    def _run_poll(self, ser: Serial) -> Job:
+        serial_queue = self._queues[TaskRole.SERIAL]
+
+        while True:
+            time.sleep(self.DELAY)
+
+            while n := ser.in_waiting:
+                self._receive(ser.read(n))
+
+            if job := queue_get_non_blocking(serial_queue):
+                jobs, control = self._drain(job)
+                if jobs:
+                    self._send(ser, jobs)
+                if control:
+                    return control
+
+    def _run_event(self, ser: Serial) -> Job:
+        serial_queue = self._queues[TaskRole.SERIAL]
 
-        with Serial(port=self._device_node) as ser:
+        stop_event = Event()
+        reader = Thread(
+            name=f'{self._role.value}-reader',
+            target=self._reader,
+            args=(ser, stop_event),
+            daemon=True,
+        )
+        reader.start()
+        try:
             while True:
-                time.sleep(self.DELAY)
-
-                while n := ser.in_waiting:
-                    received = ser.read(n)
-                    # self._logger.debug('got {blue}%d{reset} bytes', n)
-                    job = RecvJob(
-                        data=received,
-                    )
-                    decoder_queue.put(job)
-
-                    self._stat.rx_total += len(received)
-                    self._send_stat()
-
-                if job := queue_get_non_blocking(serial_queue):
-                    if isinstance(job, StopJob):
-                        break
-
-                    if isinstance(job, SendJob):
-                        match job.kind:
-                            case PacketKind.STREAM_START:
-                                tx_start_time = timestamp_now()
-                                self._stat.tx_current = 0
-                            case PacketKind.STREAM_FRAME:
-                                pass
-                            case PacketKind.STREAM_STOP:
-                                pass
-
-                        # self._logger.debug('sending {blue}%d{reset} bytes', len(job.data))
-                        ser.write(job.data)
-
-                        self._stat.tx_duration = timestamp_now() - tx_start_time
-                        self._stat.tx_total += len(job.data)
-                        self._stat.tx_current += len(job.data)
-                        self._stat.tx_speed = self._stat.tx_current / self._stat.tx_duration
-                        self._send_stat()
+                job = serial_queue.get(block=True)
+                jobs, control = self._drain(job)
+                if jobs:
+                    self._send(ser, jobs)
+                if control:
+                    return control
+        finally:
+            stop_event.set()
+            ser.cancel_read()
+            reader.join(timeout=self.JOIN_TIMEOUT)
+
+    def _reader(self, ser: Serial, stop_event: Event):
+        try:
+            while not stop_event.is_set():
+                if received := ser.read(ser.in_waiting or 1):
+                    self._receive(received)
+        except Exception as ex:
+            if not stop_event.is_set():
+                # modem is gone, detach and keep the other workers running
+                self._logger.exception('ERROR: %s', ex)
+                self._queues[TaskRole.SERIAL].put(DetachJob())
+
+    def _send_stat(self):
+        with self._stat_lock:
+            super()._send_stat()
+
+    def _receive(self, received: bytes):
+        decoder_queue = self._queues[TaskRole.DECODER]
+
+        # self._logger.debug('got {blue}%d{reset} bytes', len(received))
+        decoder_queue.put(RecvJob(
+            data=received,
+        ))
+
+        self._stat.rx_total += len(received)
+        self._send_stat()
+
+    def _drain(self, job) -> tuple[list[SendJob], Job | None]:
+        # all queued SendJobs in order, plus a stop/detach job if one was queued
+        serial_queue = self._queues[TaskRole.SERIAL]
+
+        jobs: list[SendJob] = []
+        while job is not None:
+            if isinstance(job, (StopJob, DetachJob)):
+                return jobs, job
+            if isinstance(job, SendJob):
+                jobs.append(job)
+            job = queue_get_non_blocking(serial_queue)
+        return jobs, None
+
+    def _send(self, ser: Serial, jobs: list[SendJob]):
+        now = timestamp_now()
+        for job in jobs:
+            match job.kind:
+                case PacketKind.STREAM_START:
+                    self._tx_start_time = now
+                    self._stat.tx_current = 0
+                case PacketKind.STREAM_FRAME | PacketKind.STREAM_MODE | PacketKind.STREAM_PARITY | PacketKind.STREAM_SILENCE:
+                    pass
+                case PacketKind.STREAM_STOP:
+                    pass
+
+        waits = [now - job.timestamp for job in jobs]
+        self._tx_jobs += len(jobs)
+        self._tx_wait_total += sum(waits)
+
+        size = 0
+        for data in self._batches(jobs):
+            # self._logger.debug('sending {blue}%d{reset} bytes', len(data))
+            self._write(ser, data)
+            size += len(data)
+
+        if self._tx_start_time is None:
+            # no STREAM_START seen, e.g. the worker was restarted mid-stream
+            self._tx_start_time = now
+            self._stat.tx_current = 0
+        self._stat.tx_duration = timestamp_now() - self._tx_start_time
+        self._stat.tx_total += size
+        self._stat.tx_current += size
+        self._stat.tx_speed = self._stat.tx_current / self._stat.tx_duration if self._stat.tx_duration else None
+        self._stat.tx_write_size = self._stat.tx_total / self._stat.tx_writes
+        self._stat.tx_queue_wait = self._tx_wait_total / self._tx_jobs
+        self._stat.tx_queue_wait_max = max(self._stat.tx_queue_wait_max or 0, *waits)
+        self._send_stat()
+
+    def _batches(self, jobs: list[SendJob]):
+        # one write, or with pacing batches up to the modem buffer without splitting packets
+        if self._bucket is None:
+            yield b''.join(job.data for job in jobs)
+            return
+
+        batch = bytearray()
+        for job in jobs:
+            if batch and len(batch) + len(job.data) > self._bucket.capacity:
+                yield bytes(batch)
+                batch.clear()
+            batch.extend(job.data)
+        if batch:
+            yield bytes(batch)
+
+    def _write(self, ser: Serial, data: bytes):
+        if self._bucket is not None:
+            delay = self._bucket.delay(len(data))
+            if delay > 0:
+                self._stat.tx_overflows += 1
+                time.sleep(delay)
+            self._bucket.consume(len(data))
+            self._stat.tx_pacing_delay = delay
+            self._stat.tx_modem_level = self._bucket.level
+
+        ser.write(data)
+        self._stat.tx_writes += 1
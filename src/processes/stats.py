@@ -0,0 +1,198 @@
+import math
+import operator
+import struct
+import time
+import types
+import typing
+import zlib
+from dataclasses import fields
+from enum import Enum
+from multiprocessing.shared_memory import SharedMemory
+from typing import Type
+
+from codec.modes import VocoderMode
+
+
+class StatLayout:
+    # stat dataclass as a flat float64 vector: None is NaN, enums are codes,
+    # dict[VocoderMode, float] is one value per mode; plain fields first, then enums, then dicts
+
+    def __init__(self, cls: Type):
+        self.cls = cls
+        plain, enums, dicts = [], [], []
+        for f in fields(cls):
+            if f.name == 'role':
+                continue
+            t = self._base_type(f.type)
+            if t is dict:
+                dicts.append(f.name)
+            elif isinstance(t, type) and issubclass(t, Enum):
+                enums.append((f.name, t))
+            else:
+                plain.append((f.name, t))
+        self._plain = plain
+        self._enums = enums
+        self._dicts = dicts
+        names = [name for name, _ in plain]
+        self._get_plain = operator.attrgetter(*names) if len(names) > 1 else (
+            lambda stat: tuple(getattr(stat, name) for name in names)
+        )
+
+    def __len__(self):
+        return len(self._plain) + len(self._enums) + len(self._dicts) * len(VocoderMode)
+
+    @staticmethod
+    def _base_type(t) -> type:
+        # float | None -> float
+        if isinstance(t, types.UnionType) or typing.get_origin(t) is typing.Union:
+            t, = [arg for arg in typing.get_args(t) if arg is not type(None)]
+        # dict[VocoderMode, float] -> dict
+        return typing.get_origin(t) or t
+
+    def encode(self, stat) -> list[float]:
+        nan = math.nan
+        values = [nan if value is None else value for value in self._get_plain(stat)]
+        for name, _ in self._enums:
+            value = getattr(stat, name)
+            values.append(nan if value is None else value.value)
+        for name in self._dicts:
+            value = getattr(stat, name)
+            values.extend(value.get(mode, nan) for mode in VocoderMode)
+        return values
+
+    def decode(self, role, values: typing.Sequence[float]):
+        if len(values) != len(self):
+            raise ValueError(f'expected {len(self)} values, got {len(values)}')
+        kwargs = {}
+        values = iter(values)
+        for name, t in self._plain:
+            value = next(values)
+            if math.isnan(value):
+                kwargs[name] = None
+            elif t is int:
+                kwargs[name] = int(value)
+            else:
+                kwargs[name] = value
+        for name, t in self._enums:
+            value = next(values)
+            kwargs[name] = None if math.isnan(value) else (
+                VocoderMode.from_code(int(value)) if t is VocoderMode else t(int(value))
+            )
+        for name in self._dicts:
+            kwargs[name] = {
+                mode: value
+                for mode, value in zip(VocoderMode, values)
+                if not math.isnan(value)
+            }
+        return self.cls(role=role, **kwargs)
+
+
+class StatsBlock:
+    # one slot per writer: seqlock counter, crc32 and size of the values, then the values;
+    # plain stores carry no memory barriers, so readers also check the crc of what they copied
+
+    SLOT_SIZE = 32
+    READ_ATTEMPTS = 100
+
+    HEADER = struct.Struct('<qII')
+    SEQ = struct.Struct('<q')
+    STRIDE = HEADER.size + SLOT_SIZE * 8
+
+    def __init__(
+            self,
+            slots: int,
+            shm: SharedMemory | None = None,
+    ):
+        self._slots = slots
+        self._shm = shm
+        self._buf = memoryview(bytearray(self._size(slots))) if shm is None else shm.buf
+        self._structs: dict[int, struct.Struct] = {}
+        self._seqs: dict[int, int] = {}
+        # last consistent snapshot: the writer may be preempted mid-write
+        self._last: dict[int, tuple[float, ...]] = {}
+
+    @staticmethod
+    def _size(slots: int) -> int:
+        return slots * StatsBlock.STRIDE
+
+    @staticmethod
+    def shared(slots: int) -> 'StatsBlock':
+        size = StatsBlock._size(slots)
+        shm = SharedMemory(create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        return StatsBlock(slots, shm)
+
+    def __getstate__(self):
+        if self._shm is None:
+            return self.__dict__
+        return dict(slots=self._slots, name=self._shm.name)
+
+    def __setstate__(self, state):
+        if 'name' in state:
+            self.__init__(state['slots'], SharedMemory(name=state['name']))
+        else:
+            self.__dict__.update(state)
+
+    def close(
+            self,
+            unlink: bool = False,
+    ):
+        if self._shm is None:
+            return
+        self._buf = None
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+        self._shm = None
+
+    def _struct(self, count: int) -> struct.Struct:
+        packer = self._structs.get(count)
+        if packer is None:
+            packer = self._structs[count] = struct.Struct(f'<{count}d')
+        return packer
+
+    def publish(
+            self,
+            slot: int,
+            values: list[float],
+    ):
+        # single writer per slot; the counter continues from what is in the slot (restarted writer)
+        assert len(values) <= self.SLOT_SIZE, f'max {self.SLOT_SIZE} values'
+        packer = self._struct(len(values))
+        offset = slot * self.STRIDE
+        start = offset + self.HEADER.size
+        data = packer.pack(*values)
+        buf = self._buf
+        seq = self._seqs.get(slot)
+        if seq is None:
+            seq = self.SEQ.unpack_from(buf, offset)[0] & ~1
+        self.HEADER.pack_into(buf, offset, seq + 1, zlib.crc32(data), len(data))
+        buf[start:start + len(data)] = data
+        # the even counter goes last and alone
+        self.SEQ.pack_into(buf, offset, seq + 2)
+        self._seqs[slot] = seq + 2
+
+    def snapshot(
+            self,
+            slot: int,
+            count: int,
+    ) -> tuple[float, ...] | None:
+        # None - never published; count - values expected by the reader's layout
+        offset = slot * self.STRIDE
+        start = offset + self.HEADER.size
+        size = count * 8
+        buf = self._buf
+        for _ in range(self.READ_ATTEMPTS):
+            header = self.HEADER.unpack_from(buf, offset)
+            seq, crc = header[:2]
+            if seq == 0:
+                return None
+            if seq & 1 or header[2] != size:
+                time.sleep(0)
+                continue
+            data = bytes(buf[start:start + size])
+            if self.HEADER.unpack_from(buf, offset) == header and zlib.crc32(data) == crc:
+                values = self._struct(count).unpack(data)
+                self._last[slot] = values
+                return values
+        return self._last.get(slot)
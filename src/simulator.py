@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+
+# a pair of simulated E22-xxxT22U modems on ptys, for testing without radios:
+# air rate, modem buffer, packet loss, bit errors and latency are modelled
+#
+# run from src:
+#   ./simulator.py --loss 0.01
+# then in two terminals:
+#   ./daemon.py --no-monitor --device <first pty>
+#   ./daemon.py --no-monitor --device <second pty>
+
+import argparse
+import logging
+import os
+import queue
+import select
+import sys
+import threading
+import time
+import tty
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from utils import init_logging
+
+
+@dataclass(frozen=True)
+class SimulatorConfig:
+    # bit/s
+    air_rate: int = 2_400
+    # bytes, overflow is dropped
+    modem_buffer: int = 1_000
+    loss: float = 0.0
+    ber: float = 0.0
+    # seconds on top of airtime
+    latency: float = 0.0
+    seed: int | None = None
+
+
+@dataclass
+class LinkStat:
+    rx_bytes: int = 0
+    overflows: int = 0
+    packets: int = 0
+    lost: int = 0
+    bit_errors: int = 0
+    delivered: int = 0
+    muted: int = 0
+
+
+class Link:
+    # one direction: tx UART -> modem buffer -> air -> rx UART
+
+    # air sub-packet, bytes
+    PACKET_SIZE = 240
+    AIR_OVERHEAD = 8
+    # UART idle before a partial sub-packet is sent, seconds
+    IDLE_TIME = 0.003
+    POLL_INTERVAL = 0.1
+    READ_SIZE = 4096
+
+    def __init__(
+            self,
+            name: str,
+            config: SimulatorConfig,
+            src: int,
+            dst: int,
+            rng: np.random.Generator,
+            stop_event: threading.Event,
+    ):
+        self.name = name
+        self.stat = LinkStat()
+        # receiver out of range: packets use the air but are not delivered
+        self.muted = False
+        self._config = config
+        self._src = src
+        self._dst = dst
+        self._rng = rng
+        self._stop_event = stop_event
+
+        self._buffer = bytearray()
+        self._last_rx = 0.0
+        self._cond = threading.Condition()
+        self._delivery: queue.Queue[tuple[float, bytes]] = queue.Queue()
+        self._threads = [
+            threading.Thread(name=f'{name}-{target.__name__}', target=target, daemon=True)
+            for target in [self._uart_loop, self._air_loop, self._delivery_loop]
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def join(self):
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _uart_loop(self):
+        while not self._stop_event.is_set():
+            if not select.select([self._src], [], [], self.POLL_INTERVAL)[0]:
+                continue
+            data = os.read(self._src, self.READ_SIZE)
+            with self._cond:
+                free = self._config.modem_buffer - len(self._buffer)
+                self._buffer.extend(data[:free])
+                self.stat.rx_bytes += len(data)
+                self.stat.overflows += max(0, len(data) - free)
+                self._last_rx = time.perf_counter()
+                self._cond.notify()
+
+    def _next_packet(self) -> bytes | None:
+        with self._cond:
+            while not self._stop_event.is_set():
+                if self._buffer:
+                    idle = time.perf_counter() - self._last_rx
+                    if len(self._buffer) >= self.PACKET_SIZE or idle >= self.IDLE_TIME:
+                        packet = bytes(self._buffer[:self.PACKET_SIZE])
+                        del self._buffer[:self.PACKET_SIZE]
+                        return packet
+                    self._cond.wait(self.IDLE_TIME - idle)
+                else:
+                    self._cond.wait(self.POLL_INTERVAL)
+        return None
+
+    def _air_loop(self):
+        while (packet := self._next_packet()) is not None:
+            time.sleep((len(packet) + self.AIR_OVERHEAD) * 8 / self._config.air_rate)
+            self.stat.packets += 1
+
+            if self.muted:
+                self.stat.muted += 1
+                continue
+            if self._rng.random() < self._config.loss:
+                self.stat.lost += 1
+                continue
+            if self._config.ber and (errors := self._rng.binomial(len(packet) * 8, self._config.ber)):
+                bits = np.unpackbits(np.frombuffer(packet, dtype=np.uint8))
+                bits[self._rng.choice(len(bits), size=errors, replace=False)] ^= 1
+                packet = np.packbits(bits).tobytes()
+                self.stat.bit_errors += errors
+
+            self._delivery.put((time.perf_counter() + self._config.latency, packet))
+
+    def _delivery_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                due, packet = self._delivery.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if (delay := due - time.perf_counter()) > 0:
+                time.sleep(delay)
+            os.write(self._dst, packet)
+            self.stat.delivered += len(packet)
+
+
+class ModemSimulator:
+    NAME = 'simulator'
+
+    def __init__(
+            self,
+            config: SimulatorConfig,
+    ):
+        self._logger = logging.getLogger(self.NAME)
+        self._config = config
+        self._stop_event = threading.Event()
+        rng = np.random.default_rng(config.seed)
+
+        self._masters: list[int] = []
+        self._slaves: list[int] = []
+        for _ in range(2):
+            master, slave = os.openpty()
+            # raw, no echo
+            tty.setraw(slave)
+            self._masters.append(master)
+            self._slaves.append(slave)
+
+        a, b = self._masters
+        self.links = [
+            Link('a-b', config, a, b, rng, self._stop_event),
+            Link('b-a', config, b, a, rng, self._stop_event),
+        ]
+
+    @property
+    def device_nodes(self) -> tuple[str, str]:
+        a, b = self._slaves
+        return os.ttyname(a), os.ttyname(b)
+
+    def start(self):
+        self._logger.info('devices: {blue}%s{reset} {blue}%s{reset}', *self.device_nodes)
+        for link in self.links:
+            link.start()
+
+    def stop(self):
+        self._stop_event.set()
+        for link in self.links:
+            link.join()
+        # keep slave fds open, otherwise reading the master returns EIO
+        for fd in self._masters + self._slaves:
+            os.close(fd)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+
+def parse_args():
+    defaults = SimulatorConfig()
+    parser = argparse.ArgumentParser(
+        prog='LoRaDio simulator',
+        description='E22 modem pair on pseudo-terminals',
+    )
+    parser.add_argument('--air-rate', type=int, default=defaults.air_rate, help='air data rate, bit/s')
+    parser.add_argument('--modem-buffer', type=int, default=defaults.modem_buffer, help='modem buffer, bytes')
+    parser.add_argument('--loss', type=float, default=defaults.loss, help='packet loss probability')
+    parser.add_argument('--ber', type=float, default=defaults.ber, help='bit error rate')
+    parser.add_argument('--latency', type=float, default=defaults.latency, help='extra delivery latency, seconds')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--stat-interval', type=float, default=5.0, help='stats log interval, seconds')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    cur_dir = Path(sys.argv[0]).resolve().parent
+    init_logging(
+        filename=cur_dir.parent / 'config' / 'log.yml',
+    )
+
+    args = parse_args()
+    config = SimulatorConfig(
+        air_rate=args.air_rate,
+        modem_buffer=args.modem_buffer,
+        loss=args.loss,
+        ber=args.ber,
+        latency=args.latency,
+        seed=args.seed,
+    )
+
+    simulator = ModemSimulator(config)
+    logger = logging.getLogger(simulator.NAME)
+    with simulator:
+        try:
+            while True:
+                time.sleep(args.stat_interval)
+                for link in simulator.links:
+                    logger.info('%s: %s', link.name, link.stat)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
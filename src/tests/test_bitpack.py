@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from codec.bitpack import pack_frames, unpack_frames
+from codec.modes import VocoderMode
+
+
+def random_frames(mode: VocoderMode, count: int) -> np.ndarray:
+    # codec2 leaves the padding bits of the last byte zero
+    rng = np.random.default_rng(mode.value)
+    bits = rng.integers(0, 2, size=(count, mode.encoded_len * 8), dtype=np.uint8)
+    bits[:, mode.bits:] = 0
+    return np.packbits(bits, axis=1)
+
+
+@pytest.mark.parametrize('mode', list(VocoderMode))
+@pytest.mark.parametrize('count', [1, 2, 7, 30])
+def test_round_trip(mode: VocoderMode, count: int):
+    frames = random_frames(mode, count)
+    block = pack_frames(frames.tobytes(), mode)
+    assert len(block) == (count * mode.bits + 7) // 8
+    assert np.array_equal(unpack_frames(block, mode), frames)
@@ -0,0 +1,125 @@
+from processes.fec import FecDecoder, FecEncoder, deinterleave, interleave
+from processes.packet import SEQ_MODULO
+
+BODIES = [b'first', b'second body', b'3', b'fourth!']
+
+
+def released(groups: list[list]) -> list:
+    return [body for group in groups for body in group]
+
+
+def send(group: int, bodies: list[bytes], first_seq: int = 0):
+    # frame packets and the parity of each group, as the encoder sends them
+    encoder = FecEncoder(group)
+    packets = []
+    for i, body in enumerate(bodies):
+        seq = (first_seq + i) % SEQ_MODULO
+        packets.append(('frame', seq, body))
+        parity = encoder.add(seq, body)
+        if parity is not None:
+            packets.append(('parity', *parity))
+    parity = encoder.flush()
+    if parity is not None:
+        packets.append(('parity', *parity))
+    return packets
+
+
+def receive(decoder: FecDecoder, packets: list) -> list:
+    out = []
+    for kind, *args in packets:
+        if kind == 'frame':
+            out += released(decoder.push_frame(*args))
+        else:
+            out += released(decoder.push_parity(*args))
+    return out + released(decoder.flush())
+
+
+def test_interleave():
+    frames = list(range(7))
+    parts = interleave(frames, 3)
+    assert parts == [[0, 3, 6], [1, 4], [2, 5]]
+    assert deinterleave(parts) == frames
+    # a lost packet counts as the largest in the group
+    assert deinterleave([parts[0], None, parts[2]]) == [0, None, 2, 3, None, 5, 6, None]
+
+
+def test_no_loss():
+    decoder = FecDecoder()
+    decoder.reset(group=2, interleave=False)
+    assert receive(decoder, send(2, BODIES)) == BODIES
+    assert decoder.recovered == 0
+    assert decoder.lost == 0
+
+
+def test_recovery():
+    for lost in range(len(BODIES)):
+        packets = [p for p in send(2, BODIES) if p[:2] != ('frame', lost)]
+        decoder = FecDecoder()
+        decoder.reset(group=2, interleave=False)
+        assert receive(decoder, packets) == BODIES
+        assert decoder.recovered == 1
+        assert decoder.lost == 0
+
+
+def test_recovery_across_seq_wrap():
+    packets = [p for p in send(2, BODIES, first_seq=255) if p[:2] != ('frame', 0)]
+    decoder = FecDecoder()
+    decoder.reset(group=2, interleave=False, next_seq=255)
+    assert receive(decoder, packets) == BODIES
+    assert decoder.recovered == 1
+
+
+def test_two_lost_in_group():
+    packets = [p for p in send(2, BODIES) if p[:2] not in (('frame', 0), ('frame', 1))]
+    decoder = FecDecoder()
+    decoder.reset(group=2, interleave=False)
+    assert receive(decoder, packets) == [None, None, *BODIES[2:]]
+    assert decoder.lost == 2
+
+
+def test_lost_parity():
+    packets = [p for p in send(2, BODIES) if p[:2] not in (('parity', 0), ('frame', 1))]
+    decoder = FecDecoder()
+    decoder.reset(group=2, interleave=False)
+    assert receive(decoder, packets) == [BODIES[0], None, *BODIES[2:]]
+    assert decoder.lost == 1
+
+
+def test_interleaved_groups():
+    decoder = FecDecoder()
+    decoder.reset(group=2, interleave=True)
+    packets = [p for p in send(2, BODIES) if p[:2] != ('frame', 2)]
+    groups = []
+    for kind, *args in packets:
+        push = decoder.push_frame if kind == 'frame' else decoder.push_parity
+        groups += push(*args)
+    assert groups == [BODIES[:2], BODIES[2:]]
+    assert decoder.recovered == 1
+
+
+def test_late_join_interleaved():
+    # interleaved groups of 2, the joiner hears the stream from seq 1
+    bodies = [bytes([i]) * (i + 1) for i in range(6)]
+    packets = send(2, bodies)
+    start = packets.index(('frame', 1, bodies[1]))
+    decoder = FecDecoder()
+    decoder.reset(group=0, interleave=True, next_seq=None)
+    groups = []
+    for kind, *args in packets[start:]:
+        push = decoder.push_frame if kind == 'frame' else decoder.push_parity
+        groups += push(*args)
+    groups += decoder.flush()
+    # the group heard in part is dropped, later groups come whole and in order
+    assert groups == [bodies[2:4], bodies[4:6]]
+    assert decoder.group == 2
+    assert decoder.interleave
+
+
+def test_late_join_recovers_after_parity():
+    bodies = [bytes([i]) * (i + 1) for i in range(6)]
+    packets = [p for p in send(2, bodies) if p[:2] != ('frame', 4)]
+    decoder = FecDecoder()
+    decoder.reset(group=0, interleave=False, next_seq=None)
+    assert receive(decoder, packets[packets.index(('frame', 1, bodies[1])):]) == bodies[1:]
+    assert decoder.group == 2
+    assert decoder.recovered == 1
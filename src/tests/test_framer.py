@@ -0,0 +1,68 @@
+from processes.framer import Framer
+from processes.packet import SYNC_WORD, encode_payload
+
+
+def parse(framer: Framer, data: bytes) -> list[bytes]:
+    return [bytes(payload) for payload in framer.feed(data)]
+
+
+def test_packets():
+    framer = Framer()
+    data = encode_payload(b'abc') + encode_payload(b'') + encode_payload(bytes(range(255)))
+    assert parse(framer, data) == [b'abc', b'', bytes(range(255))]
+    assert framer.dropped == 0
+
+
+def test_resync_over_garbage():
+    framer = Framer()
+    data = b'\x00\xa5garbage' + encode_payload(b'one') + b'\xa5' * 3 + encode_payload(b'two')
+    assert parse(framer, data) == [b'one', b'two']
+    assert framer.dropped == len(b'\x00\xa5garbage') + 3
+
+
+def test_split_feed():
+    framer = Framer()
+    data = encode_payload(b'one') + encode_payload(b'two')
+    payloads = []
+    for i in range(len(data)):
+        payloads += parse(framer, data[i:i + 1])
+    assert payloads == [b'one', b'two']
+
+
+def test_compact():
+    # a small buffer must keep going as packets move through it
+    framer = Framer(capacity=64)
+    packets = [encode_payload(bytes([i]) * 20) for i in range(20)]
+    data = b''.join(packets)
+    payloads = []
+    for i in range(0, len(data), 7):
+        payloads += parse(framer, data[i:i + 7])
+    assert payloads == [bytes([i]) * 20 for i in range(20)]
+
+
+def test_crc_rejection():
+    framer = Framer()
+    bad = bytearray(encode_payload(b'one'))
+    bad[-2] ^= 0x01
+    data = bytes(bad) + encode_payload(b'two')
+    assert parse(framer, data) == [b'two']
+    assert framer.bad == 1
+
+
+def test_crc_rejection_resync():
+    # a corrupted size byte must not swallow the next packet
+    framer = Framer()
+    bad = bytearray(encode_payload(b'one'))
+    bad[len(SYNC_WORD)] = 200
+    data = bytes(bad) + encode_payload(b'two') + bytes(200)
+    assert parse(framer, data) == [b'two']
+    assert framer.bad == 1
+
+
+def test_noise_only():
+    # noise with no header must not fill the buffer
+    framer = Framer(capacity=64)
+    noise = bytes([0x11]) * 1000
+    assert parse(framer, noise) == []
+    assert framer.dropped == len(noise) - len(SYNC_WORD) + 1
+    assert parse(framer, encode_payload(b'one')) == [b'one']
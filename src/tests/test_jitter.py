@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from codec.jitter import JitterBuffer
+
+SOUND_RATE = 8000
+# 40 ms packet
+PACKET = np.zeros(320, dtype=np.int16)
+INTERVAL = len(PACKET) / SOUND_RATE
+
+
+def jitter_buffer() -> JitterBuffer:
+    return JitterBuffer(sound_rate=SOUND_RATE, min_delay=0.06, max_delay=0.5)
+
+
+def test_steady_arrivals_keep_min_delay():
+    buffer = jitter_buffer()
+    for i in range(50):
+        buffer.push(PACKET, now=i * INTERVAL)
+    assert buffer.jitter < 1e-9
+    assert buffer.delay == 0.06
+
+
+def test_delay_follows_jitter():
+    buffer = jitter_buffer()
+    rng = np.random.default_rng(1)
+    for i in range(200):
+        buffer.observe(now=i * INTERVAL + rng.uniform(0, 0.05), duration=INTERVAL)
+    assert buffer.delay > 0.06
+    assert buffer.delay == min(0.5, buffer.JITTER_FACTOR * buffer.jitter)
+
+    for i in range(200):
+        buffer.observe(now=i * INTERVAL + rng.uniform(0, 1.0), duration=INTERVAL)
+    assert buffer.delay == 0.5
+
+
+def test_first_packet_waits_for_delay():
+    buffer = jitter_buffer()
+    assert buffer.push(PACKET, now=0.0) == []
+    assert buffer.timeout(0.0) == buffer.delay
+    assert buffer.poll(0.05) == []
+    assert len(buffer.poll(0.06)) == 1
+    assert buffer.timeout(0.06) is None
+    # playing: later packets go out at once
+    assert len(buffer.push(PACKET, now=0.07)) == 1
+
+
+def test_underrun_builds_delay_again():
+    buffer = jitter_buffer()
+    buffer.push(PACKET, now=0.0)
+    buffer.poll(0.06)
+    # the player ran dry before the next packet
+    assert buffer.push(PACKET, now=1.0) == []
+    assert buffer.underruns == 1
+    assert buffer.level(1.0) == 0.0
+
+
+def test_overflow_drop():
+    buffer = jitter_buffer()
+    buffer.push(PACKET, now=0.0)
+    buffer.poll(0.06)
+    released = 1
+    while buffer.level(0.06) + INTERVAL <= 0.5:
+        assert len(buffer.push(PACKET, now=0.06)) == 1
+        released += 1
+    assert buffer.push(PACKET, now=0.06) == []
+    assert buffer.overflow_drops == 1
+    assert buffer.level(0.06) == pytest.approx(released * INTERVAL)
@@ -0,0 +1,82 @@
+import pytest
+
+from codec.jobs import PacketKind
+from codec.modes import VocoderMode
+from processes.packet import (
+    CRC_SIZE,
+    HEADER_SIZE,
+    SEQ_MODULO,
+    STREAM_IDS,
+    SYNC_WORD,
+    crc8,
+    decode_payload,
+    decode_tag,
+    encode_payload,
+    encode_stream_frame,
+    encode_stream_mode,
+    encode_stream_start,
+    encode_stream_stop,
+    encode_tag,
+)
+
+
+def test_crc8():
+    # CRC-32 check value 0xcbf43926
+    assert crc8(b'123456789') == 0x26
+    assert crc8(b'') == 0
+
+
+def test_encode_payload():
+    packet = encode_payload(b'abc')
+    assert packet[:len(SYNC_WORD)] == SYNC_WORD
+    assert packet[HEADER_SIZE - 1] == 3
+    assert packet[HEADER_SIZE:-CRC_SIZE] == b'abc'
+    assert packet[-1] == crc8(packet[:-1])
+
+
+def decode(packet: bytes):
+    return decode_payload(packet[HEADER_SIZE:-CRC_SIZE])
+
+
+@pytest.mark.parametrize('mode', list(VocoderMode))
+def test_tag(mode: VocoderMode):
+    for stream_id in (0, 1, STREAM_IDS - 1):
+        tag = encode_tag(stream_id, mode)
+        assert 0 <= tag < 256
+        assert decode_tag(tag) == (stream_id, mode)
+    # ids wrap around
+    assert decode_tag(encode_tag(STREAM_IDS + 3, mode)) == (3, mode)
+
+
+def test_tag_unknown_mode():
+    with pytest.raises(ValueError):
+        decode_tag(0)
+
+
+def test_stream_start():
+    packet = encode_stream_start(test=False, stream_id=5, mode=VocoderMode.MODE_700, fec_group=3, fec_interleave=True)
+    assert decode(packet) == (PacketKind.STREAM_START, False, (5, VocoderMode.MODE_700, 3, True))
+
+
+def test_stream_frame():
+    packet = encode_stream_frame(test=False, stream_id=7, mode=VocoderMode.MODE_1600, seq=SEQ_MODULO + 2, body=b'body')
+    kind, test, (stream_id, mode, seq, body, interleave) = decode(packet)
+    assert (kind, test, stream_id, mode, seq, bytes(body), interleave) == (
+        PacketKind.STREAM_FRAME, False, 7, VocoderMode.MODE_1600, 2, b'body', False,
+    )
+    packet = encode_stream_frame(test=True, stream_id=7, mode=VocoderMode.MODE_1600, seq=0, body=b'', interleave=True)
+    kind, test, (*_, interleave) = decode(packet)
+    assert (kind, test, interleave) == (PacketKind.STREAM_FRAME, True, True)
+
+
+def test_stream_mode_and_stop():
+    packet = encode_stream_mode(test=True, stream_id=2, mode=VocoderMode.MODE_3200)
+    assert decode(packet) == (PacketKind.STREAM_MODE, True, (2, VocoderMode.MODE_3200))
+    packet = encode_stream_stop(test=False, stream_id=2, mode=VocoderMode.MODE_3200, duration=1.0)
+    assert decode(packet) == (PacketKind.STREAM_STOP, False, (2, None))
+
+
+def test_truncated():
+    packet = encode_stream_frame(test=False, stream_id=1, mode=VocoderMode.MODE_1600, seq=0, body=b'')
+    with pytest.raises(ValueError):
+        decode_payload(packet[HEADER_SIZE:HEADER_SIZE + 2])
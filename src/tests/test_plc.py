@@ -0,0 +1,53 @@
+import numpy as np
+
+from codec.plc import Concealer
+
+SOUND_RATE = 8000
+
+
+def tone(period: int, n: int) -> np.ndarray:
+    t = np.arange(n)
+    return (8000 * np.sin(2 * np.pi * t / period)).astype(np.int16)
+
+
+def test_silence_before_speech():
+    concealer = Concealer(SOUND_RATE)
+    samples = concealer.conceal(160)
+    assert samples.dtype == np.int16
+    assert not samples.any()
+
+
+def test_continues_tone():
+    concealer = Concealer(SOUND_RATE)
+    # 100 Hz
+    signal = tone(80, 480)
+    concealer.observe(signal[:320])
+    samples = concealer.conceal(160).astype(np.float64)
+    expected = signal[320:].astype(np.float64)
+    assert np.corrcoef(samples, expected)[0, 1] > 0.95
+
+
+def test_fade_out():
+    concealer = Concealer(SOUND_RATE)
+    concealer.observe(tone(80, 320))
+    fade = round(Concealer.FADE * SOUND_RATE)
+    # consecutive calls continue the same fade
+    first = concealer.conceal(fade // 2)
+    second = concealer.conceal(fade)
+    assert np.abs(first).max() > np.abs(second[:fade // 2]).max()
+    assert not second[fade // 2:].any()
+
+
+def test_observe_restarts_fade():
+    concealer = Concealer(SOUND_RATE)
+    concealer.observe(tone(80, 320))
+    concealer.conceal(2 * round(Concealer.FADE * SOUND_RATE))
+    concealer.observe(tone(80, 320))
+    assert np.abs(concealer.conceal(80)).max() > 7000
+
+
+def test_reset():
+    concealer = Concealer(SOUND_RATE)
+    concealer.observe(tone(80, 320))
+    concealer.reset()
+    assert not concealer.conceal(160).any()
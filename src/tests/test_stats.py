@@ -0,0 +1,138 @@
+import multiprocessing
+import pickle
+from dataclasses import dataclass, field
+
+import pytest
+
+from codec.jobs import TaskRole
+from codec.modes import VocoderMode
+from processes.stats import StatLayout, StatsBlock
+
+STRESS_VALUES = 16
+
+
+@dataclass
+class Stat:
+    role: TaskRole
+    packets: int = 0
+    latency: float | None = None
+    mode: VocoderMode | None = None
+    durations: dict[VocoderMode, float] = field(default_factory=dict)
+
+
+def test_layout_round_trip():
+    layout = StatLayout(Stat)
+    stat = Stat(
+        role=TaskRole.ENCODER,
+        packets=12,
+        latency=0.25,
+        mode=VocoderMode.MODE_1600,
+        durations={VocoderMode.MODE_700: 1.5, VocoderMode.MODE_3200: 2.0},
+    )
+    values = layout.encode(stat)
+    assert len(values) == len(layout)
+    decoded = layout.decode(TaskRole.ENCODER, values)
+    assert decoded == stat
+    assert type(decoded.packets) is int
+
+
+def test_layout_length():
+    layout = StatLayout(Stat)
+    with pytest.raises(ValueError):
+        layout.decode(TaskRole.DECODER, ())
+
+
+def test_layout_none():
+    layout = StatLayout(Stat)
+    stat = Stat(role=TaskRole.DECODER)
+    assert layout.decode(TaskRole.DECODER, layout.encode(stat)) == stat
+
+
+def test_block_publish_snapshot():
+    block = StatsBlock(slots=3)
+    assert block.snapshot(1, 3) is None
+    block.publish(1, [1.0, 2.0, 3.0])
+    assert block.snapshot(1, 3) == (1.0, 2.0, 3.0)
+    block.publish(1, [4.0, 5.0, 6.0])
+    assert block.snapshot(1, 3) == (4.0, 5.0, 6.0)
+    assert block.snapshot(0, 3) is None
+    assert block.snapshot(2, 3) is None
+
+
+def test_block_size_mismatch():
+    block = StatsBlock(slots=1)
+    block.publish(0, [1.0, 2.0])
+    assert block.snapshot(0, 2) == (1.0, 2.0)
+    # values of another layout are never returned
+    block.publish(0, [3.0])
+    assert block.snapshot(0, 2) == (1.0, 2.0)
+    block.publish(0, [])
+    assert block.snapshot(0, 2) == (1.0, 2.0)
+
+
+def test_block_too_many_values():
+    block = StatsBlock(slots=1)
+    with pytest.raises(AssertionError):
+        block.publish(0, [0.0] * (StatsBlock.SLOT_SIZE + 1))
+
+
+def test_block_torn_write():
+    block = StatsBlock(slots=1)
+    block.publish(0, [1.0, 2.0])
+    assert block.snapshot(0, 2) == (1.0, 2.0)
+    # a writer preempted mid-write leaves an odd counter: readers keep the last snapshot
+    seq, crc, size = StatsBlock.HEADER.unpack_from(block._buf, 0)
+    StatsBlock.HEADER.pack_into(block._buf, 0, seq + 1, crc, size)
+    assert block.snapshot(0, 2) == (1.0, 2.0)
+    # and values that do not match the crc are not taken either
+    StatsBlock.HEADER.pack_into(block._buf, 0, seq + 2, crc ^ 1, size)
+    assert block.snapshot(0, 2) == (1.0, 2.0)
+
+
+def test_block_restarted_writer():
+    block = StatsBlock.shared(slots=2)
+    try:
+        block.publish(0, [1.0])
+        # a restarted writer continues the counter of the slot
+        writer = pickle.loads(pickle.dumps(block))
+        try:
+            writer.publish(0, [2.0])
+            assert block.snapshot(0, 1) == (2.0,)
+            seq, _, _ = StatsBlock.HEADER.unpack_from(block._buf, 0)
+            assert seq == 4
+        finally:
+            writer.close()
+    finally:
+        block.close(unlink=True)
+
+
+def write(block: StatsBlock, count: int):
+    for i in range(1, count + 1):
+        block.publish(0, [float(i)] * STRESS_VALUES)
+    block.close()
+
+
+def test_block_cross_process():
+    block = StatsBlock.shared(slots=1)
+    writer = multiprocessing.Process(target=write, args=(block, 200_000))
+    try:
+        writer.start()
+        last = 0.0
+        reads = 0
+        while writer.is_alive() or reads == 0:
+            values = block.snapshot(0, STRESS_VALUES)
+            if values is None:
+                continue
+            # every read is one whole publish, never older than the previous read
+            assert len(values) == STRESS_VALUES
+            assert len(set(values)) == 1
+            assert values[0] >= last
+            last = values[0]
+            reads += 1
+        writer.join()
+        assert writer.exitcode == 0
+        assert block.snapshot(0, STRESS_VALUES) == (200_000.0,) * STRESS_VALUES
+    finally:
+        if writer.is_alive():
+            writer.kill()
+        block.close(unlink=True)
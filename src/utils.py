@@ -1,4 +1,5 @@
 import logging
+import logging.config
 import os
 import sys
 import time
@@ -15,6 +16,12 @@ def load_yaml(filename: str | Path):
         return yaml.safe_load(file)
 
 
+def init_logging(filename: str | Path):
+    cfg = load_yaml(filename)
+    logging.config.dictConfig(cfg)
+    logging.info('log config: {blue}%s{reset}', filename)
+
+
 def rate_limit(interval: float):
 
     def decorator(f):